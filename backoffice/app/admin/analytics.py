@@ -0,0 +1,57 @@
+import re
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..analytics import funnel_by_boutique, funnel_by_month, snapshot_computed_at
+from ..auth import get_current_admin
+from ..dependencies import get_read_db
+
+router = APIRouter()
+
+_MOIS_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+
+def _parse_mois(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    if not _MOIS_RE.match(value):
+        raise HTTPException(status_code=400, detail="Mois invalide (format AAAA-MM)")
+    return value
+
+
+# Lecture seule de funnel_snapshots (calculée en tâche de fond, voir app.analytics)
+
+@router.get("/admin/api/funnel_par_mois")
+def api_funnel_par_mois(
+    boutique_id: Optional[int] = None,
+    mois_from: Optional[str] = None,
+    mois_to: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    admin: models.User = Depends(get_current_admin),
+):
+    """Cohortes par mois de création : devis, acceptés, BC validés, taux et panier moyen."""
+    rows = funnel_by_month(db, boutique_id, _parse_mois(mois_from), _parse_mois(mois_to))
+    return {
+        "labels": [r["mois"] for r in rows],
+        "rows": rows,
+        "computed_at": snapshot_computed_at(db),
+    }
+
+
+@router.get("/admin/api/funnel_par_boutique")
+def api_funnel_par_boutique(
+    mois_from: Optional[str] = None,
+    mois_to: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    admin: models.User = Depends(get_current_admin),
+):
+    """Entonnoir et pertes par boutique sur la période (mois de création des devis)."""
+    rows = funnel_by_boutique(db, _parse_mois(mois_from), _parse_mois(mois_to))
+    return {
+        "labels": [r["boutique_nom"] for r in rows],
+        "rows": rows,
+        "computed_at": snapshot_computed_at(db),
+    }
@@ -0,0 +1,196 @@
+"""
+File de validation des bons de commande, toutes boutiques confondues.
+
+Une seule requête sur l'index (statut, date_creation, id) : filtre par statut,
+tri par ancienneté, pagination keyset (le curseur `after` encode la date et l'id
+du dernier BC affiché ; pas d'OFFSET qui relit les pages précédentes).
+
+SQLite stocke les dates en texte : `server_default=func.now()` écrit
+"AAAA-MM-JJ HH:MM:SS" alors qu'un datetime lié en paramètre devient
+"AAAA-MM-JJ HH:MM:SS.000000". Le curseur porte donc la valeur brute de la colonne,
+comparée telle quelle (sinon les BC créés dans la même seconde sont sautés).
+"""
+import base64
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import String, and_, func, or_, type_coerce
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..auth import get_current_admin
+from ..dependencies import get_read_db
+from ..timeline import latest_event_public, latest_events
+from .common import template_response
+
+router = APIRouter()
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def _date_key(db: Session):
+    """Colonne de tri du curseur : texte brut sous SQLite, DateTime ailleurs."""
+    if db.get_bind().dialect.name == "sqlite":
+        return type_coerce(models.BonCommande.date_creation, String)
+    return models.BonCommande.date_creation
+
+
+def _encode_cursor(date_key: Any, bon_id: int) -> str:
+    date_part = date_key.isoformat() if isinstance(date_key, datetime) else str(date_key)
+    raw = f"{date_part}|{bon_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(db: Session, token: Optional[str]) -> Optional[Tuple[Any, int]]:
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        date_part, id_part = raw.rsplit("|", 1)
+        # Validation du format dans tous les cas ; valeur brute conservée sous SQLite
+        parsed = datetime.fromisoformat(date_part)
+        date_key = date_part if db.get_bind().dialect.name == "sqlite" else parsed
+        return date_key, int(id_part)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+
+def _parse_statut(statut: str) -> models.StatutBonCommande:
+    try:
+        return models.StatutBonCommande(statut)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Statut de bon de commande invalide")
+
+
+def counts_by_statut(db: Session) -> Dict[str, int]:
+    counts = {s.value: 0 for s in models.StatutBonCommande}
+    for statut, n in db.query(models.BonCommande.statut, func.count()).group_by(models.BonCommande.statut):
+        counts[statut.value] = n
+    return counts
+
+
+def load_queue(
+    db: Session,
+    statut: str = models.StatutBonCommande.EN_ATTENTE_VALIDATION.value,
+    order: str = "oldest",
+    after: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT,
+) -> Dict[str, Any]:
+    statut_enum = _parse_statut(statut)
+    newest_first = order == "newest"
+    limit = max(1, min(limit, MAX_LIMIT))
+    cursor = _decode_cursor(db, after)
+
+    BC = models.BonCommande
+    date_key = _date_key(db)
+    q = (
+        db.query(
+            BC.id,
+            BC.devis_id,
+            BC.date_creation,
+            BC.montant_boutique_ttc,
+            BC.commentaire_boutique,
+            BC.commentaire_admin,
+            models.Devis.numero_boutique,
+            models.Boutique.id.label("boutique_id"),
+            models.Boutique.nom,
+            date_key.label("date_key"),
+        )
+        .join(models.Devis, BC.devis_id == models.Devis.id)
+        .join(models.Boutique, models.Devis.boutique_id == models.Boutique.id)
+        .filter(BC.statut == statut_enum)
+    )
+    if cursor is not None:
+        c_date, c_id = cursor
+        if newest_first:
+            q = q.filter(or_(date_key < c_date, and_(date_key == c_date, BC.id < c_id)))
+        else:
+            q = q.filter(or_(date_key > c_date, and_(date_key == c_date, BC.id > c_id)))
+    if newest_first:
+        q = q.order_by(BC.date_creation.desc(), BC.id.desc())
+    else:
+        q = q.order_by(BC.date_creation.asc(), BC.id.asc())
+
+    rows = q.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    now = datetime.utcnow()
+    items = [
+        {
+            "id": bon_id,
+            "devis_id": devis_id,
+            "reference": f"{boutique_nom}-{numero}",
+            "boutique_id": boutique_id,
+            "boutique_nom": boutique_nom,
+            "date_creation": date_creation.isoformat() if date_creation else None,
+            "age_jours": (now - date_creation).days if date_creation else None,
+            "montant_boutique_ttc": montant,
+            "commentaire_boutique": commentaire_boutique,
+            "commentaire_admin": commentaire_admin,
+        }
+        for (
+            bon_id,
+            devis_id,
+            date_creation,
+            montant,
+            commentaire_boutique,
+            commentaire_admin,
+            numero,
+            boutique_id,
+            boutique_nom,
+            _date_key,
+        ) in rows
+    ]
+    activity = latest_events(db, [item["id"] for item in items])
+    for item in items:
+        item["derniere_activite"] = latest_event_public(activity.get(item["id"]))
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = _encode_cursor(last.date_key, last.id)
+
+    return {
+        "statut": statut_enum.value,
+        "order": "newest" if newest_first else "oldest",
+        "counts": counts_by_statut(db),
+        "items": items,
+        "next": next_cursor,
+    }
+
+
+@router.get("/admin/api/bons-commande/queue")
+def api_bc_queue(
+    statut: str = models.StatutBonCommande.EN_ATTENTE_VALIDATION.value,
+    order: str = "oldest",
+    after: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT,
+    db: Session = Depends(get_read_db),
+    admin: models.User = Depends(get_current_admin),
+):
+    return load_queue(db, statut=statut, order=order, after=after, limit=limit)
+
+
+@router.get("/admin/bons-commande")
+def admin_bc_queue(
+    request: Request,
+    statut: str = models.StatutBonCommande.EN_ATTENTE_VALIDATION.value,
+    order: str = "oldest",
+    after: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    admin: models.User = Depends(get_current_admin),
+):
+    queue = load_queue(db, statut=statut, order=order, after=after)
+    return template_response(
+        "admin_bc_queue.html",
+        request,
+        {
+            "admin": admin,
+            "queue": queue,
+            "first_page": after is None,
+            "page": "bc_queue",
+        },
+    )
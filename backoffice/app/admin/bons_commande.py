@@ -1,14 +1,19 @@
-from typing import Literal, Optional
+from datetime import datetime
+from typing import Dict, List, Literal, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, Query, Request
 from fastapi.responses import RedirectResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
 from .. import models
+from ..archive_models import BonCommandeArchive
 from ..auth import get_current_admin
-from ..dependencies import get_db
-from ..utils.mailer import send_admin_bc_notification, send_boutique_bc_notification
+from ..dependencies import get_db, get_read_db
+from ..events import publish_bc_event, publish_bc_event_for
+from ..notifications import send_now
+from ..timeline import create_events_bulk, latest_event_public, latest_events, list_archived_events, list_events
+from ..utils.mailer import send_email
 from .common import templates, template_response
 
 
@@ -26,6 +31,7 @@ def admin_update_bon_commande(
     request: Request,
     statut: str = Form(...),
     commentaire_admin: str = Form(""),
+    next_url: str = Form("", alias="next"),
     background_tasks: BackgroundTasks = None,
     db: Session = Depends(get_db),
     admin: models.User = Depends(get_current_admin),
@@ -51,60 +57,49 @@ def admin_update_bon_commande(
     new_comment = bon.commentaire_admin or ""
     changed = (new_statut != old_statut) or (new_comment != old_comment)
 
+    # Type d'événement du nouveau statut (historique + notifications)
+    statut_event = {
+        models.StatutBonCommande.EN_ATTENTE_VALIDATION: "BC_REMIS_EN_ATTENTE",
+        models.StatutBonCommande.A_MODIFIER: "BC_RENVOYE",
+        models.StatutBonCommande.REFUSE: "BC_REFUSE",
+        models.StatutBonCommande.VALIDE: "BC_VALIDE",
+    }.get(bon.statut)
+    # Commentaire seul : mise à jour admin
+    event_type = statut_event if (statut_event and new_statut != old_statut) else "BC_MAJ_ADMIN"
+
+    ev = None
     if changed and create_event:
         try:
-            create_event(
+            ev = create_event(
                 db,
                 bon_commande_id=bon.id,
                 actor_type="ADMIN",
                 actor_id=getattr(admin, "id", None),
-                event_type="BC_MAJ_ADMIN",
+                event_type=event_type,
                 message=new_comment or f"Statut: {new_statut}",
             )
         except Exception:
             pass
 
     db.commit()
+    publish_bc_event(bon, ev)
 
-    if changed and background_tasks:
+    # Sinon : email inclus dans le prochain récapitulatif (voir app.notifications)
+    if changed and background_tasks and send_now(event_type):
         ref = f"{bon.devis.boutique.nom}-{bon.devis.numero_boutique}"
         to_email = bon.devis.boutique.email
 
-        if "A_MODIFIER" in new_statut:
-            subject_b = f"Bon de commande à corriger — {ref}"
-            html_b = f"""
-            <p>Votre bon de commande a été renvoyé pour <b>modification</b>.</p>
-            <p><b>Référence :</b> {ref}</p>
-            <p><b>Commentaire de l’atelier :</b></p>
-            <div style="white-space:pre-wrap;border:1px solid #eee;padding:12px;border-radius:8px;">
-                {new_comment or "—"}
-            </div>
-            """
-            text_b = f"Votre BC {ref} a été renvoyé pour correction.\nCommentaire de l’atelier : {new_comment or '—'}"
-            background_tasks.add_task(send_boutique_bc_notification, to_email, subject_b, html_b, text_b)
-
-        elif "REFUSE" in new_statut:
-            subject_b = f"Bon de commande refusé — {ref}"
-            html_b = f"""
-            <p>Votre bon de commande a été <b>refusé</b>.</p>
-            <p><b>Référence :</b> {ref}</p>
-            <p><b>Commentaire de l’atelier :</b></p>
-            <div style="white-space:pre-wrap;border:1px solid #eee;padding:12px;border-radius:8px;">
-                {new_comment or "—"}
-            </div>
-            """
-            text_b = f"Votre BC {ref} a été refusé.\nCommentaire de l’atelier : {new_comment or '—'}"
-            background_tasks.add_task(send_boutique_bc_notification, to_email, subject_b, html_b, text_b)
-
-        elif "VALIDE" in new_statut:
-            subject_b = f"Bon de commande validé — {ref}"
-            html_b = f"""
-            <p>Votre bon de commande a été <b>validé</b>.</p>
-            <p><b>Référence :</b> {ref}</p>
-            """
-            text_b = f"Votre BC {ref} a été validé."
-            background_tasks.add_task(send_boutique_bc_notification, to_email, subject_b, html_b, text_b)
-
+        template = {
+            models.StatutBonCommande.A_MODIFIER: "bc_renvoye",
+            models.StatutBonCommande.REFUSE: "bc_refuse",
+            models.StatutBonCommande.VALIDE: "bc_valide",
+        }.get(bon.statut)
+        if template:
+            background_tasks.add_task(send_email, to_email, template, ref=ref, commentaire=new_comment)
+
+    # Retour à la page d'origine (file de validation) ; chemins admin internes uniquement
+    if next_url.startswith("/admin/") and not next_url.startswith("//"):
+        return RedirectResponse(url=next_url, status_code=302)
     return RedirectResponse(
         url=f"/admin/boutiques/{bon.devis.boutique_id}",
         status_code=302,
@@ -132,9 +127,10 @@ def renvoyer_bc(
     bon.statut = models.StatutBonCommande.A_MODIFIER
     bon.commentaire_admin = commentaire_admin.strip() or None
 
+    ev = None
     if create_event:
         try:
-            create_event(
+            ev = create_event(
                 db,
                 bon_commande_id=bon.id,
                 actor_type="ADMIN",
@@ -146,31 +142,18 @@ def renvoyer_bc(
             pass
 
     db.commit()
+    publish_bc_event(bon, ev)
 
-    ref = f"{bon.devis.boutique.nom}-{bon.devis.numero_boutique}"
-
-    subject_b = f"Bon de commande à modifier — {ref}"
-    html_b = f"""
-    <p>Votre bon de commande nécessite une modification.</p>
-    <p><b>Référence :</b> {ref}</p>
-    <p><b>Commentaire de l'admin :</b></p>
-    <div style="white-space:pre-wrap;border:1px solid #eee;padding:12px;border-radius:8px;">
-        {bon.commentaire_admin or "—"}
-    </div>
-    <p>Merci de corriger puis de revalider le bon de commande depuis votre espace.</p>
-    """
-    text_b = (
-        f"Votre bon de commande {ref} nécessite une modification.\n"
-        f"Commentaire admin : {bon.commentaire_admin or '—'}"
-    )
+    if send_now("BC_RENVOYE"):
+        ref = f"{bon.devis.boutique.nom}-{bon.devis.numero_boutique}"
 
-    background_tasks.add_task(
-        send_boutique_bc_notification,
-        bon.devis.boutique.email,
-        subject_b,
-        html_b,
-        text_b,
-    )
+        background_tasks.add_task(
+            send_email,
+            bon.devis.boutique.email,
+            "bc_renvoye",
+            ref=ref,
+            commentaire=bon.commentaire_admin,
+        )
 
     _ = admin
     return {"ok": True}
@@ -211,71 +194,186 @@ def decision_bc(
 
     bon.commentaire_admin = payload.commentaire.strip() if payload.commentaire else None
 
+    ev = None
+    ev_type = "BC_VALIDE" if bon.statut == models.StatutBonCommande.VALIDE else "BC_REFUSE"
     if create_event:
         try:
-            create_event(
+            ev = create_event(
                 db,
                 bon_commande_id=bon.id,
                 actor_type="ADMIN",
                 actor_id=getattr(admin, "id", None),
-                event_type="BC_VALIDE" if bon.statut == models.StatutBonCommande.VALIDE else "BC_REFUSE",
+                event_type=ev_type,
                 message=bon.commentaire_admin,
             )
         except Exception:
             pass
 
     db.commit()
+    publish_bc_event(bon, ev)
 
-    ref = f"{bon.devis.boutique.nom}-{bon.devis.numero_boutique}"
+    if send_now(ev_type):
+        ref = f"{bon.devis.boutique.nom}-{bon.devis.numero_boutique}"
 
-    subject = f"Bon de commande {decision.lower()} — {ref}"
-    html = f"""
-    <p>Votre bon de commande <b>{ref}</b> a été <b>{decision.lower()}</b>.</p>
-    <p><b>Commentaire admin :</b></p>
-    <div style="white-space:pre-wrap;border:1px solid #eee;padding:12px;border-radius:8px;">
-        {bon.commentaire_admin or "—"}
-    </div>
-    """
-    text = f"Bon de commande {ref} {decision.lower()}.\nCommentaire admin : {bon.commentaire_admin or '—'}"
-
-    background_tasks.add_task(
-        send_boutique_bc_notification,
-        bon.devis.boutique.email,
-        subject,
-        html,
-        text,
-    )
+        background_tasks.add_task(
+            send_email,
+            bon.devis.boutique.email,
+            "bc_valide" if ev_type == "BC_VALIDE" else "bc_refuse",
+            ref=ref,
+            commentaire=bon.commentaire_admin,
+        )
 
     _ = admin
     return {"ok": True}
 
+class BulkDecisionPayload(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=500)
+    decision: Literal["VALIDE", "ACCEPTE", "REFUSE", "A_MODIFIER"]
+    commentaire: Optional[str] = None
+
+
+_BULK_EVENT_TYPES = {
+    models.StatutBonCommande.VALIDE: "BC_VALIDE",
+    models.StatutBonCommande.REFUSE: "BC_REFUSE",
+    models.StatutBonCommande.A_MODIFIER: "BC_RENVOYE",
+}
+
+_BULK_LIBELLES = {
+    models.StatutBonCommande.VALIDE: "validé",
+    models.StatutBonCommande.REFUSE: "refusé",
+    models.StatutBonCommande.A_MODIFIER: "à modifier",
+}
+
+
+@router.post("/admin/bons-commande/bulk-decision")
+def bulk_decision_bc(
+    payload: BulkDecisionPayload,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    admin: models.User = Depends(get_current_admin),
+):
+    """
+    Décision (validation / refus / renvoi pour correction) sur plusieurs BC en une requête.
+
+    - contrôle des statuts en une seule requête ; tout ou rien : si un BC est
+      introuvable ou n'est plus EN_ATTENTE_VALIDATION, rien n'est modifié
+    - un UPDATE ... WHERE id IN (...) + un INSERT multi-lignes d'événements, un seul commit
+    - un email par boutique récapitulant ses bons de commande
+    """
+    ids = sorted(set(payload.ids))
+    decision = "VALIDE" if payload.decision == "ACCEPTE" else payload.decision
+    new_statut = models.StatutBonCommande(decision)
+    commentaire = payload.commentaire.strip() if payload.commentaire and payload.commentaire.strip() else None
+
+    rows = (
+        db.query(
+            models.BonCommande.id,
+            models.BonCommande.statut,
+            models.Devis.id,
+            models.Devis.numero_boutique,
+            models.Boutique.id,
+            models.Boutique.nom,
+            models.Boutique.email,
+        )
+        .join(models.Devis, models.BonCommande.devis_id == models.Devis.id)
+        .join(models.Boutique, models.Devis.boutique_id == models.Boutique.id)
+        .filter(models.BonCommande.id.in_(ids))
+        .all()
+    )
+
+    found = {r[0] for r in rows}
+    introuvables = [i for i in ids if i not in found]
+    statut_invalide = [r[0] for r in rows if r[1] != models.StatutBonCommande.EN_ATTENTE_VALIDATION]
+    if introuvables or statut_invalide:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Certains bons de commande ne sont pas en attente de validation.",
+                "introuvables": introuvables,
+                "statut_invalide": sorted(statut_invalide),
+            },
+        )
+
+    updated = (
+        db.query(models.BonCommande)
+        .filter(
+            models.BonCommande.id.in_(ids),
+            models.BonCommande.statut == models.StatutBonCommande.EN_ATTENTE_VALIDATION,
+        )
+        .update(
+            {
+                models.BonCommande.statut: new_statut,
+                models.BonCommande.commentaire_admin: commentaire,
+                models.BonCommande.updated_at: datetime.utcnow(),
+            },
+            synchronize_session=False,
+        )
+    )
+    if updated != len(ids):
+        # Un BC a changé de statut entre le contrôle et la mise à jour
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Bons de commande modifiés entre-temps, réessayez.")
+
+    events = create_events_bulk(
+        db,
+        [
+            {
+                "bon_commande_id": bon_id,
+                "actor_type": "ADMIN",
+                "actor_id": getattr(admin, "id", None),
+                "event_type": _BULK_EVENT_TYPES[new_statut],
+                "message": commentaire,
+            }
+            for bon_id in ids
+        ],
+    )
+    db.commit()
+
+    by_bon = {r[0]: r for r in rows}
+    par_boutique: Dict[int, dict] = {}
+    for ev in events:
+        bon_id, _, devis_id, numero, boutique_id, boutique_nom, boutique_email = by_bon[ev.bon_commande_id]
+        publish_bc_event_for(boutique_id, ev, new_statut, devis_id, numero)
+        entry = par_boutique.setdefault(boutique_id, {"nom": boutique_nom, "email": boutique_email, "refs": []})
+        entry["refs"].append(f"{boutique_nom}-{numero}")
+
+    libelle = _BULK_LIBELLES[new_statut]
+    # Sinon : emails inclus dans le prochain récapitulatif (voir app.notifications)
+    if send_now(_BULK_EVENT_TYPES[new_statut]):
+        for entry in par_boutique.values():
+            refs = sorted(entry["refs"])
+            background_tasks.add_task(
+                send_email,
+                entry["email"],
+                "bc_groupe",
+                libelle=libelle,
+                refs=refs,
+                commentaire=commentaire,
+            )
+
+    return {"ok": True, "count": len(ids), "ids": ids, "statut": new_statut.value}
+
+
 @router.get("/admin/bons-commande/{bon_id}/timeline")
 def admin_bc_timeline(
     bon_id: int,
     request: Request,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin: models.User = Depends(get_current_admin),
 ):
     bon = db.query(models.BonCommande).get(bon_id)
-    if not bon:
-        raise HTTPException(status_code=404, detail="Bon de commande introuvable")
+    if bon:
+        events = list_events(db, bon.id)
+    else:
+        # Bon de commande archivé (app.archive) : historique en lecture seule
+        bon = db.get(BonCommandeArchive, bon_id)
+        if not bon:
+            raise HTTPException(status_code=404, detail="Bon de commande introuvable")
+        events = list_archived_events(db, bon.id)
 
     boutique = bon.devis.boutique
     ref = f"{boutique.nom}-{bon.devis.numero_boutique}"
 
-    events = []
-    try:
-        from ..timeline_models import BonCommandeEvent 
-
-        events = (
-            db.query(BonCommandeEvent)
-            .filter(BonCommandeEvent.bon_commande_id == bon.id)
-            .order_by(BonCommandeEvent.created_at.asc(), BonCommandeEvent.id.asc())
-            .all()
-        )
-    except Exception:
-        events = []
-
     return template_response(
         "admin_bon_commande_timeline.html",
         request,
@@ -289,3 +387,20 @@ def admin_bc_timeline(
         },
     )
 
+
+
+# Nombre maximal d'ids par appel de /admin/api/bons-commande/latest-events
+LATEST_EVENTS_MAX_IDS = 1000
+
+
+@router.get("/admin/api/bons-commande/latest-events")
+def admin_bc_latest_events(
+    ids: List[int] = Query(...),
+    db: Session = Depends(get_read_db),
+    admin: models.User = Depends(get_current_admin),
+):
+    """Dernier événement (et nombre d'événements) de chaque BC demandé, en une requête."""
+    if len(ids) > LATEST_EVENTS_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"{LATEST_EVENTS_MAX_IDS} bons de commande maximum")
+    latest = latest_events(db, ids)
+    return {str(bon_id): latest_event_public(latest.get(bon_id)) for bon_id in dict.fromkeys(ids)}
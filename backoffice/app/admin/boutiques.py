@@ -8,11 +8,16 @@ import io
 from fastapi import APIRouter, BackgroundTasks, Depends, Form, Request
 from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from pydantic import BaseModel, EmailStr
+from sqlalchemy import Integer, case, func, or_, type_coerce
 from sqlalchemy.orm import Session
 
 from .. import models
 from ..auth import get_current_admin, get_password_hash
-from ..dependencies import get_db
+from ..dependencies import get_db, get_read_db
+from ..archive import merge_newest_first
+from ..archive_models import BonCommandeArchive, DevisArchive
+from ..money import format_eur, from_cents, to_cents
+from ..timeline import latest_events
 from ..utils.mailer import send_boutique_password_email
 from .common import templates, template_response, template_response
 
@@ -74,19 +79,75 @@ def _csv_stream(rows_iter, header):
 
 # ========= Boutiques =========
 
+BOUTIQUES_PER_PAGE = 50
+
+# Tri de la liste : clé d'URL -> colonne (boutiques ou boutique_stats)
+_BOUTIQUES_SORTS = {
+    "nom": models.Boutique.nom,
+    "statut": models.Boutique.statut,
+    "date_creation": models.Boutique.date_creation,
+    "nb_devis": models.BoutiqueStats.nb_devis,
+    "nb_acceptes": models.BoutiqueStats.nb_acceptes,
+    "ca": models.BoutiqueStats.ca,
+    "nb_bc_en_attente": models.BoutiqueStats.nb_bc_en_attente,
+    "derniere_activite": models.BoutiqueStats.derniere_activite,
+}
+
+
 @router.get("/admin/boutiques")
 def admin_boutiques(
     request: Request,
-    db: Session = Depends(get_db),
+    q: str = "",
+    sort: str = "nom",
+    order: str = "asc",
+    page: int = 1,
+    db: Session = Depends(get_read_db),
     admin: models.User = Depends(get_current_admin),
 ):
-    boutiques = db.query(models.Boutique).order_by(models.Boutique.nom).all()
+    if sort not in _BOUTIQUES_SORTS:
+        sort = "nom"
+    order = "desc" if order == "desc" else "asc"
+    page = max(1, page)
+
+    query = db.query(models.Boutique, models.BoutiqueStats).outerjoin(
+        models.BoutiqueStats, models.BoutiqueStats.boutique_id == models.Boutique.id
+    )
+    q = q.strip()
+    if q:
+        pattern = f"%{q}%"
+        query = query.filter(
+            or_(
+                models.Boutique.nom.ilike(pattern),
+                models.Boutique.email.ilike(pattern),
+                models.Boutique.gerant.ilike(pattern),
+            )
+        )
+
+    total = query.order_by(None).count()
+    nb_pages = max(1, (total + BOUTIQUES_PER_PAGE - 1) // BOUTIQUES_PER_PAGE)
+    page = min(page, nb_pages)
+
+    column = _BOUTIQUES_SORTS[sort]
+    direction = column.desc() if order == "desc" else column.asc()
+    rows = (
+        query.order_by(direction.nulls_last(), models.Boutique.id)
+        .offset((page - 1) * BOUTIQUES_PER_PAGE)
+        .limit(BOUTIQUES_PER_PAGE)
+        .all()
+    )
+
     return template_response(
         "admin_boutiques_list.html",
         request,
         {
             "admin": admin,
-            "boutiques": boutiques,
+            "rows": rows,
+            "q": q,
+            "sort": sort,
+            "order": order,
+            "page_num": page,
+            "nb_pages": nb_pages,
+            "total": total,
             "page": "boutiques",
             "sous_page": "boutiques",
         },
@@ -175,7 +236,7 @@ def boutique_detail(
     bc_statut: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin: models.User = Depends(get_current_admin),
 ):
     boutique = db.query(models.Boutique).get(boutique_id)
@@ -184,22 +245,40 @@ def boutique_detail(
 
     d_from, d_to, dt_from, dt_to_excl = _build_date_range(date_from, date_to)
 
-    devis_q = db.query(models.Devis).filter(models.Devis.boutique_id == boutique.id)
-    if devis_statut and devis_statut != "ALL":
-        try:
-            devis_q = devis_q.filter(models.Devis.statut == models.StatutDevis(devis_statut))
-        except Exception:
-            pass
-    if dt_from:
-        devis_q = devis_q.filter(models.Devis.date_creation >= dt_from)
-    if dt_to_excl:
-        devis_q = devis_q.filter(models.Devis.date_creation < dt_to_excl)
-
-    devis = devis_q.order_by(models.Devis.date_creation.desc()).all()
-
-    total_ca = sum(d.prix_total for d in devis)
-    nb_devis = len(devis)
-    nb_acceptes = len([d for d in devis if d.statut == models.StatutDevis.ACCEPTE])
+    def _devis_filters(Devis):
+        conditions = [Devis.boutique_id == boutique.id]
+        if devis_statut and devis_statut != "ALL":
+            try:
+                conditions.append(Devis.statut == models.StatutDevis(devis_statut))
+            except Exception:
+                pass
+        if dt_from:
+            conditions.append(Devis.date_creation >= dt_from)
+        if dt_to_excl:
+            conditions.append(Devis.date_creation < dt_to_excl)
+        return conditions
+
+    devis = (
+        db.query(models.Devis)
+        .filter(*_devis_filters(models.Devis))
+        .order_by(models.Devis.date_creation.desc())
+        .all()
+    )
+
+    # Devis archivés (app.archive) : absents de la liste, comptés comme dans boutique_stats
+    nb_archives, ca_archives_cents, acceptes_archives = (
+        db.query(
+            func.count(DevisArchive.id),
+            func.coalesce(func.sum(type_coerce(DevisArchive.prix_total, Integer)), 0),
+            func.coalesce(func.sum(case((DevisArchive.statut == models.StatutDevis.ACCEPTE, 1), else_=0)), 0),
+        )
+        .filter(*_devis_filters(DevisArchive))
+        .one()
+    )
+
+    total_ca = from_cents(sum(to_cents(d.prix_total) for d in devis) + ca_archives_cents)
+    nb_devis = len(devis) + nb_archives
+    nb_acceptes = len([d for d in devis if d.statut == models.StatutDevis.ACCEPTE]) + acceptes_archives
     taux_acceptation = (nb_acceptes / nb_devis * 100) if nb_devis else 0
 
     devis_statuts = [s.value for s in models.StatutDevis]
@@ -223,6 +302,8 @@ def boutique_detail(
     devis_with_bc_filtered = [
         d for d in devis if d.bon_commande and _bc_matches(d.bon_commande)
     ]
+    # Dernière activité de chaque BC affiché : une requête (fenêtre) au lieu d'une par ligne
+    bc_activity = latest_events(db, [d.bon_commande.id for d in devis_with_bc_filtered])
 
     return template_response(
         "admin_boutique_detail.html",
@@ -232,9 +313,11 @@ def boutique_detail(
             "boutique": boutique,
             "devis": devis,
             "devis_with_bc": devis_with_bc_filtered,
+            "bc_activity": bc_activity,
             "total_ca": total_ca,
             "nb_devis": nb_devis,
             "nb_acceptes": nb_acceptes,
+            "nb_archives": nb_archives,
             "taux_acceptation": taux_acceptation,
             "filters": {
                 "devis_statut": devis_statut or "ALL",
@@ -260,7 +343,8 @@ def export_devis_csv(
     devis_statut: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
-    db: Session = Depends(get_db),
+    include_archived: bool = False,
+    db: Session = Depends(get_read_db),
     admin: models.User = Depends(get_current_admin),
 ):
     import re
@@ -277,29 +361,36 @@ def export_devis_csv(
 
     _, _, dt_from, dt_to_excl = _build_date_range(date_from, date_to)
 
-    devis_q = db.query(models.Devis).filter(models.Devis.boutique_id == boutique.id)
+    def devis_query(Devis):
+        devis_q = db.query(Devis).filter(Devis.boutique_id == boutique.id)
 
-    if devis_statut and devis_statut != "ALL":
-        try:
-            devis_q = devis_q.filter(
-                models.Devis.statut == models.StatutDevis(devis_statut)
-            )
-        except Exception:
-            pass
+        if devis_statut and devis_statut != "ALL":
+            try:
+                devis_q = devis_q.filter(
+                    Devis.statut == models.StatutDevis(devis_statut)
+                )
+            except Exception:
+                pass
+
+        if dt_from:
+            devis_q = devis_q.filter(Devis.date_creation >= dt_from)
+        if dt_to_excl:
+            devis_q = devis_q.filter(Devis.date_creation < dt_to_excl)
 
-    if dt_from:
-        devis_q = devis_q.filter(models.Devis.date_creation >= dt_from)
-    if dt_to_excl:
-        devis_q = devis_q.filter(models.Devis.date_creation < dt_to_excl)
+        return devis_q.order_by(Devis.date_creation.desc()).yield_per(500)
 
-    devis_q = devis_q.order_by(models.Devis.date_creation.desc())
+    # Archives (app.archive) fusionnées par date décroissante
+    sources = [devis_query(models.Devis)]
+    if include_archived:
+        sources.append(devis_query(DevisArchive))
+    devis_q = merge_newest_first(sources, key=lambda d: d.date_creation)
 
     def rows():
-        for d in devis_q.yield_per(500):
+        for d in devis_q:
             ref = f"{boutique.nom}-#{d.numero_boutique}"
             dt = d.date_creation.strftime("%Y-%m-%d %H:%M") if d.date_creation else ""
             statut = d.statut.value if getattr(d.statut, "value", None) else str(d.statut)
-            yield [dt, ref, statut, f"{d.prix_total:.2f}", str(d.id)]
+            yield [dt, ref, statut, format_eur(d.prix_total), str(d.id)]
 
     filename = _safe_filename(
         f"devis_{boutique.nom}_{date_from or 'all'}_{date_to or 'all'}.csv"
@@ -326,7 +417,8 @@ def export_bons_commande_csv(
     bc_statut: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
-    db: Session = Depends(get_db),
+    include_archived: bool = False,
+    db: Session = Depends(get_read_db),
     admin: models.User = Depends(get_current_admin),
 ):
     import re
@@ -343,27 +435,33 @@ def export_bons_commande_csv(
 
     _, _, dt_from, dt_to_excl = _build_date_range(date_from, date_to)
 
-    q = (
-        db.query(models.BonCommande, models.Devis)
-        .join(models.Devis, models.BonCommande.devis_id == models.Devis.id)
-        .filter(models.Devis.boutique_id == boutique.id)
-    )
+    def bc_query(BonCommande, Devis):
+        q = (
+            db.query(BonCommande, Devis)
+            .join(Devis, BonCommande.devis_id == Devis.id)
+            .filter(Devis.boutique_id == boutique.id)
+        )
+
+        if bc_statut and bc_statut != "ALL":
+            try:
+                q = q.filter(BonCommande.statut == models.StatutBonCommande(bc_statut))
+            except Exception:
+                pass
 
-    if bc_statut and bc_statut != "ALL":
-        try:
-            q = q.filter(models.BonCommande.statut == models.StatutBonCommande(bc_statut))
-        except Exception:
-            pass
+        if dt_from:
+            q = q.filter(BonCommande.date_creation >= dt_from)
+        if dt_to_excl:
+            q = q.filter(BonCommande.date_creation < dt_to_excl)
 
-    if dt_from:
-        q = q.filter(models.BonCommande.date_creation >= dt_from)
-    if dt_to_excl:
-        q = q.filter(models.BonCommande.date_creation < dt_to_excl)
+        return q.order_by(BonCommande.date_creation.desc()).yield_per(500)
 
-    q = q.order_by(models.BonCommande.date_creation.desc())
+    sources = [bc_query(models.BonCommande, models.Devis)]
+    if include_archived:
+        sources.append(bc_query(BonCommandeArchive, DevisArchive))
+    q = merge_newest_first(sources, key=lambda row: row[0].date_creation)
 
     def rows():
-        for bc, d in q.yield_per(500):
+        for bc, d in q:
             ref = f"{boutique.nom}-#{d.numero_boutique}"
             dt = bc.date_creation.strftime("%Y-%m-%d %H:%M") if bc.date_creation else ""
             statut = bc.statut.value if getattr(bc.statut, "value", None) else str(bc.statut)
@@ -375,8 +473,8 @@ def export_bons_commande_csv(
                 dt,
                 ref,
                 statut,
-                f"{(bc.montant_boutique_ht or 0):.2f}",
-                f"{(bc.montant_boutique_ttc or 0):.2f}",
+                format_eur(bc.montant_boutique_ht),
+                format_eur(bc.montant_boutique_ttc),
                 "1" if getattr(bc, "has_tva", False) else "0",
                 commentaire_admin,
                 commentaire_boutique,
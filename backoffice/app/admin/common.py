@@ -1,14 +1,9 @@
-from fastapi.templating import Jinja2Templates
 from fastapi import Request
 from typing import Dict, Any
 
-# Centralized templates instance for admin HTML pages.
-# Keep directory consistent with existing project structure.
-templates = Jinja2Templates(directory="app/templates")
-
-# Ajouter get_csrf_token comme fonction globale dans les templates
+# Centralized templates instance for admin HTML pages (shared with app.auth).
+from app.templating import templates
 from app.csrf import get_or_create_csrf_token
-templates.env.globals['get_csrf_token'] = get_or_create_csrf_token
 
 
 def template_response(template_name: str, request: Request, context: Dict[str, Any]):
@@ -5,8 +5,19 @@ from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from .. import models
-from ..auth import get_current_admin
-from ..dependencies import get_db
+from ..analytics import analytics_stats
+from ..archive import archive_stats
+from ..backup import backup_stats
+from ..auth import admin_identity_cache_stats, get_current_admin
+from ..bc_durations import duration_report
+from ..database import engine, read_engine
+from ..dependencies import get_read_db
+from ..events import broker
+from ..mail_templates import render_stats
+from ..notifications import digest_stats
+from ..utils.mailer import sender as mail_sender
+from ..password_hashing import hasher
+from ..rate_limit import get_login_limiter
 from .common import templates, template_response
 
 router = APIRouter()
@@ -38,7 +49,7 @@ def admin_dashboard(
     bc_statut: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin: models.User = Depends(get_current_admin),
 ):
     def _parse_date(s: Optional[str]) -> Optional[date]:
@@ -106,6 +117,9 @@ def admin_dashboard(
 
     total_bc = bc_q.count() or 0
 
+    # Délais de traitement des BC (table bc_status_durations, sans filtre)
+    bc_durees = duration_report(db)["global"]
+
     return template_response(
         "admin_dashboard.html",
         request,
@@ -115,6 +129,7 @@ def admin_dashboard(
             "total_devis": total_devis,
             "total_bc": total_bc,
             "devis_par_statut": devis_par_statut,
+            "bc_durees": bc_durees,
             "devis_statuts": [s.value for s in models.StatutDevis],
             "bc_statuts": [s.value for s in models.StatutBonCommande],
             "filters": {
@@ -133,7 +148,7 @@ def admin_dashboard(
 @router.get("/admin/api/devis_par_statut")
 def api_devis_par_statut(
     request: Request,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin: models.User = Depends(get_current_admin),
 ):
     devis_statut = request.query_params.get("devis_statut")
@@ -182,7 +197,7 @@ def api_devis_par_statut(
 @router.get("/admin/api/ca_par_boutique")
 def api_ca_par_boutique(
     request: Request,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin: models.User = Depends(get_current_admin),
 ):
     devis_statut = request.query_params.get("devis_statut")
@@ -238,3 +253,33 @@ def api_ca_par_boutique(
         "labels": [r[0] for r in rows],
         "data": [float(r[1]) for r in rows],
     }
+
+
+@router.get("/admin/api/bc_durees")
+def api_bc_durees(
+    db: Session = Depends(get_read_db),
+    admin: models.User = Depends(get_current_admin),
+):
+    """p50 / p95 (secondes) : soumission -> validation et séjours en A_MODIFIER, global et par boutique."""
+    return duration_report(db)
+
+
+# ========= Métriques techniques =========
+
+@router.get("/admin/api/metrics")
+def api_metrics(
+    admin: models.User = Depends(get_current_admin),
+):
+    return {
+        "password_hasher": hasher.stats(),
+        "login_rate_limit": get_login_limiter().stats(),
+        "admin_identity_cache": admin_identity_cache_stats(),
+        "sse": broker.stats(),
+        "notification_digest": digest_stats(),
+        "mail": mail_sender.stats(),
+        "mail_templates": render_stats(),
+        "analytics": analytics_stats(),
+        "archive": archive_stats(),
+        "backup": backup_stats(),
+        "db_pools": {"writer": engine.pool.status(), "reader": read_engine.pool.status()},
+    }
@@ -9,8 +9,11 @@ from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from .. import models
+from ..archive import merge_newest_first
+from ..archive_models import BonCommandeArchive, DevisArchive
 from ..auth import get_current_admin
-from ..dependencies import get_db
+from ..dependencies import get_read_db
+from ..money import format_eur
 
 router = APIRouter()
 
@@ -79,34 +82,42 @@ def export_devis_global_csv(
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
     boutique_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    include_archived: bool = False,
+    db: Session = Depends(get_read_db),
     admin: models.User = Depends(get_current_admin),
 ):
     dt_from, dt_to_excl = _build_date_range(date_from, date_to)
 
-    q = (
-        db.query(models.Devis, models.Boutique)
-        .join(models.Boutique, models.Devis.boutique_id == models.Boutique.id)
-    )
+    def devis_query(Devis):
+        q = (
+            db.query(Devis, models.Boutique)
+            .join(models.Boutique, Devis.boutique_id == models.Boutique.id)
+        )
+
+        if boutique_id:
+            q = q.filter(models.Boutique.id == boutique_id)
 
-    if boutique_id:
-        q = q.filter(models.Boutique.id == boutique_id)
+        if devis_statut and devis_statut != "ALL":
+            try:
+                q = q.filter(Devis.statut == models.StatutDevis(devis_statut))
+            except Exception:
+                pass
 
-    if devis_statut and devis_statut != "ALL":
-        try:
-            q = q.filter(models.Devis.statut == models.StatutDevis(devis_statut))
-        except Exception:
-            pass
+        if dt_from:
+            q = q.filter(Devis.date_creation >= dt_from)
+        if dt_to_excl:
+            q = q.filter(Devis.date_creation < dt_to_excl)
 
-    if dt_from:
-        q = q.filter(models.Devis.date_creation >= dt_from)
-    if dt_to_excl:
-        q = q.filter(models.Devis.date_creation < dt_to_excl)
+        return q.order_by(Devis.date_creation.desc()).yield_per(500)
 
-    q = q.order_by(models.Devis.date_creation.desc())
+    # Archives (app.archive) fusionnées par date décroissante
+    sources = [devis_query(models.Devis)]
+    if include_archived:
+        sources.append(devis_query(DevisArchive))
+    q = merge_newest_first(sources, key=lambda row: row[0].date_creation)
 
     def rows():
-        for d, b in q.yield_per(500):
+        for d, b in q:
             ref = f"{b.nom}-#{d.numero_boutique}"
             dt = d.date_creation.strftime("%Y-%m-%d %H:%M") if d.date_creation else ""
             statut = d.statut.value if getattr(d.statut, "value", None) else str(d.statut)
@@ -116,7 +127,7 @@ def export_devis_global_csv(
                 b.nom,
                 ref,
                 statut,
-                f"{d.prix_total:.2f}",
+                format_eur(d.prix_total),
                 str(d.id),
             ]
 
@@ -151,35 +162,42 @@ def export_bc_global_csv(
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
     boutique_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    include_archived: bool = False,
+    db: Session = Depends(get_read_db),
     admin: models.User = Depends(get_current_admin),
 ):
     dt_from, dt_to_excl = _build_date_range(date_from, date_to)
 
-    q = (
-        db.query(models.BonCommande, models.Devis, models.Boutique)
-        .join(models.Devis, models.BonCommande.devis_id == models.Devis.id)
-        .join(models.Boutique, models.Devis.boutique_id == models.Boutique.id)
-    )
+    def bc_query(BonCommande, Devis):
+        q = (
+            db.query(BonCommande, Devis, models.Boutique)
+            .join(Devis, BonCommande.devis_id == Devis.id)
+            .join(models.Boutique, Devis.boutique_id == models.Boutique.id)
+        )
+
+        if boutique_id:
+            q = q.filter(models.Boutique.id == boutique_id)
 
-    if boutique_id:
-        q = q.filter(models.Boutique.id == boutique_id)
+        if bc_statut and bc_statut != "ALL":
+            try:
+                q = q.filter(BonCommande.statut == models.StatutBonCommande(bc_statut))
+            except Exception:
+                pass
 
-    if bc_statut and bc_statut != "ALL":
-        try:
-            q = q.filter(models.BonCommande.statut == models.StatutBonCommande(bc_statut))
-        except Exception:
-            pass
+        if dt_from:
+            q = q.filter(BonCommande.date_creation >= dt_from)
+        if dt_to_excl:
+            q = q.filter(BonCommande.date_creation < dt_to_excl)
 
-    if dt_from:
-        q = q.filter(models.BonCommande.date_creation >= dt_from)
-    if dt_to_excl:
-        q = q.filter(models.BonCommande.date_creation < dt_to_excl)
+        return q.order_by(BonCommande.date_creation.desc()).yield_per(500)
 
-    q = q.order_by(models.BonCommande.date_creation.desc())
+    sources = [bc_query(models.BonCommande, models.Devis)]
+    if include_archived:
+        sources.append(bc_query(BonCommandeArchive, DevisArchive))
+    q = merge_newest_first(sources, key=lambda row: row[0].date_creation)
 
     def rows():
-        for bc, d, b in q.yield_per(500):
+        for bc, d, b in q:
             ref = f"{b.nom}-#{d.numero_boutique}"
             dt = bc.date_creation.strftime("%Y-%m-%d %H:%M") if bc.date_creation else ""
             statut = bc.statut.value if getattr(bc.statut, "value", None) else str(bc.statut)
@@ -193,8 +211,8 @@ def export_bc_global_csv(
                 b.nom,
                 ref,
                 statut,
-                f"{(bc.montant_boutique_ht or 0):.2f}",
-                f"{(bc.montant_boutique_ttc or 0):.2f}",
+                format_eur(bc.montant_boutique_ht),
+                format_eur(bc.montant_boutique_ttc),
                 "1" if getattr(bc, "has_tva", False) else "0",
                 com_admin,
                 com_bout,
@@ -1,13 +1,19 @@
 import secrets
 import os
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, Form, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, Request
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 
 from .. import models
-from ..auth import get_password_hash, verify_password, get_current_admin
-from ..utils.mailer import _send, wrap_email
+from ..auth import (
+    get_current_admin,
+    get_current_admin_user,
+    get_password_hash,
+    invalidate_admin_identity,
+    verify_password,
+)
+from ..utils.mailer import send_email
 from ..dependencies import get_db
 from .common import templates, template_response
 
@@ -52,6 +58,7 @@ def reset_password_page(request: Request):
 @router.post("/admin/reset-password-request")
 def reset_password_request(
     request: Request,
+    background_tasks: BackgroundTasks,
     email: str = Form(...),
     db: Session = Depends(get_db),
 ):
@@ -82,32 +89,8 @@ def reset_password_request(
     base_url = BASE_URL.rstrip("/") if BASE_URL else str(request.base_url).rstrip("/")
     reset_link = f"{base_url}/admin/reset-password-confirm?token={token}"
     
-    # Envoyer l'email
-    subject = "Réinitialisation de votre mot de passe admin"
-    text = f"""Bonjour {admin.nom},
-
-Vous avez demandé une réinitialisation de votre mot de passe admin.
-
-Lien de réinitialisation (valable 2 heures) :
-{reset_link}
-
-Si vous n'êtes pas à l'origine de cette demande, ignorez cet email.
-
-Cordialement,
-Constance Cellier
-"""
-    html = wrap_email(
-        "Réinitialisation de mot de passe admin",
-        f"""
-        <p>Bonjour <b>{admin.nom}</b>,</p>
-        <p>Vous avez demandé une réinitialisation de votre mot de passe admin.</p>
-        <p><b>Lien de réinitialisation</b> (valable 2 heures) :</p>
-        <p><a href="{reset_link}" style="color:#2563eb;text-decoration:underline;">{reset_link}</a></p>
-        <p>Si vous n'êtes pas à l'origine de cette demande, ignorez cet email.</p>
-        """
-    )
-    
-    _send(admin.email, subject, text, html)
+    # Envoyer l'email (rendu et envoi après la réponse)
+    background_tasks.add_task(send_email, admin.email, "admin_password_reset", nom=admin.nom, reset_link=reset_link)
     
     return RedirectResponse(url="/admin/reset-password?success=1", status_code=302)
 
@@ -183,6 +166,7 @@ def reset_password_confirm(
     
     admin.mot_de_passe = get_password_hash(nouveau_mot_de_passe)
     db.commit()
+    invalidate_admin_identity(admin.id)
     
     # Supprimer le token utilisé
     del RESET_TOKENS[token]
@@ -232,7 +216,7 @@ def change_password(
     nouveau_mot_de_passe: str = Form(...),
     confirmer_mot_de_passe: str = Form(...),
     db: Session = Depends(get_db),
-    admin: models.User = Depends(get_current_admin),
+    admin: models.User = Depends(get_current_admin_user),
 ):
     """Traitement du changement de mot de passe."""
     # Vérifier le mot de passe actuel
@@ -265,5 +249,6 @@ def change_password(
     # Mettre à jour le mot de passe
     admin.mot_de_passe = get_password_hash(nouveau_mot_de_passe)
     db.commit()
+    invalidate_admin_identity(admin.id)
     
     return RedirectResponse(url="/admin/change-password?success=1", status_code=302)
@@ -1,17 +1,23 @@
 from fastapi import APIRouter
 
 from .dashboard import router as dashboard_router
+from .analytics import router as analytics_router
 from .boutiques import router as boutiques_router
 from .produits import router as produits_router
 from .bons_commande import router as bons_commande_router
+from .bc_queue import router as bc_queue_router
 from .exports import router as exports_router
 from .password import router as password_router
+from .search import router as search_router
 
 router = APIRouter()
 
 router.include_router(dashboard_router)
+router.include_router(analytics_router)
 router.include_router(boutiques_router)
 router.include_router(produits_router)
 router.include_router(bons_commande_router)
+router.include_router(bc_queue_router)
 router.include_router(exports_router)
-router.include_router(password_router)
\ No newline at end of file
+router.include_router(password_router)
+router.include_router(search_router)
\ No newline at end of file
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..auth import get_current_admin
+from ..dependencies import get_db
+from ..search import search
+
+router = APIRouter()
+
+
+@router.get("/admin/api/search")
+def api_search(
+    q: str = "",
+    page: int = 1,
+    per_page: int = 20,
+    db: Session = Depends(get_db),
+    admin: models.User = Depends(get_current_admin),
+):
+    """Recherche boutiques / devis / commentaires BC, classée par pertinence (voir app.search)."""
+    return search(db, q, page=page, per_page=per_page)
@@ -0,0 +1,212 @@
+"""
+Entonnoir de conversion devis -> accepté -> BC validé, par mois de création et par boutique.
+
+Les agrégats (jointure devis / bons_commandes sur toute la base) sont calculés par une
+tâche de fond (lifespan, toutes les ANALYTICS_REFRESH_SECONDS) dans la table
+`funnel_snapshots` : une ligne par (mois de création du devis, boutique). Les endpoints
+graphiques de l'admin (app.admin.analytics) ne lisent que cette table.
+
+Les devis archivés (app.archive) sont inclus : l'historique reste complet.
+
+Le remplacement est atomique (DELETE + INSERT ... SELECT dans une transaction) : un
+lecteur voit l'ancien ou le nouvel instantané, jamais un mélange.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case, delete, func, insert, literal, select, union_all
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import models
+from .archive_models import BonCommandeArchive, DevisArchive
+from .config import ANALYTICS_REFRESH_SECONDS
+from .database import engine as default_engine
+
+_stats: Dict[str, Any] = {"runs": 0, "failures": 0, "last_run_at": None, "last_duration_ms": None, "rows": 0}
+
+
+def _mois(column, dialect: str):
+    """date -> 'AAAA-MM' (SQLite : strftime, PostgreSQL : to_char)."""
+    if dialect == "sqlite":
+        return func.strftime("%Y-%m", column)
+    return func.to_char(column, "YYYY-MM")
+
+
+def _devis_rows(Devis, BC, dialect: str):
+    return (
+        select(
+            _mois(Devis.date_creation, dialect).label("mois"),
+            Devis.boutique_id.label("boutique_id"),
+            Devis.statut.label("statut"),
+            Devis.prix_total.label("prix_total"),
+            BC.id.label("bc_id"),
+            BC.statut.label("bc_statut"),
+        )
+        .select_from(Devis)
+        .outerjoin(BC, BC.devis_id == Devis.id)
+    )
+
+
+def _snapshot_select(dialect: str, computed_at: datetime):
+    # Devis actifs et archivés (app.archive) : l'entonnoir porte sur tout l'historique
+    rows = union_all(
+        _devis_rows(models.Devis, models.BonCommande, dialect),
+        _devis_rows(DevisArchive, BonCommandeArchive, dialect),
+    ).subquery()
+    accepte = rows.c.statut == models.StatutDevis.ACCEPTE.value
+    return select(
+        rows.c.mois,
+        rows.c.boutique_id,
+        func.count(),
+        func.count(case((accepte, 1))),
+        func.count(rows.c.bc_id),
+        func.count(case((rows.c.bc_statut == models.StatutBonCommande.VALIDE.value, 1))),
+        func.coalesce(func.sum(rows.c.prix_total), 0),
+        func.coalesce(func.sum(case((accepte, rows.c.prix_total), else_=0)), 0),
+        literal(computed_at, models.FunnelSnapshot.computed_at.type),
+    ).group_by(rows.c.mois, rows.c.boutique_id)
+
+
+def refresh_funnel_snapshots(bind: Optional[Engine] = None) -> int:
+    """Recalcule tout l'instantané ; renvoie le nombre de lignes (mois x boutique)."""
+    bind = bind or default_engine
+    table = models.FunnelSnapshot.__table__
+    started = time.monotonic()
+    computed_at = datetime.utcnow()
+    try:
+        with bind.begin() as conn:
+            conn.execute(delete(table))
+            conn.execute(
+                insert(table).from_select(
+                    [
+                        "mois",
+                        "boutique_id",
+                        "nb_devis",
+                        "nb_acceptes",
+                        "nb_bc",
+                        "nb_bc_valides",
+                        "montant_devis",
+                        "montant_acceptes",
+                        "computed_at",
+                    ],
+                    _snapshot_select(conn.dialect.name, computed_at),
+                )
+            )
+            rows = conn.execute(select(func.count()).select_from(table)).scalar() or 0
+    except Exception:
+        _stats["failures"] += 1
+        raise
+    _stats.update(
+        runs=_stats["runs"] + 1,
+        last_run_at=computed_at.isoformat(),
+        last_duration_ms=round((time.monotonic() - started) * 1000, 1),
+        rows=rows,
+    )
+    return rows
+
+
+async def analytics_loop() -> None:
+    """Tâche de fond (lifespan) : un premier calcul au démarrage, puis à intervalle fixe."""
+    while True:
+        try:
+            await run_in_threadpool(refresh_funnel_snapshots)
+        except Exception as e:
+            print(f"[ANALYTICS] refresh failed: {e!r}")
+        await asyncio.sleep(ANALYTICS_REFRESH_SECONDS)
+
+
+def analytics_enabled() -> bool:
+    return ANALYTICS_REFRESH_SECONDS > 0
+
+
+def analytics_stats() -> Dict[str, Any]:
+    return {"refresh_seconds": ANALYTICS_REFRESH_SECONDS, **_stats}
+
+
+# ========= Lecture des instantanés =========
+
+def _ratio(num: float, den: float) -> Optional[float]:
+    return round(num / den * 100, 1) if den else None
+
+
+def _funnel_values(nb_devis, nb_acceptes, nb_bc, nb_bc_valides, montant_devis, montant_acceptes) -> Dict[str, Any]:
+    nb_devis, nb_acceptes = nb_devis or 0, nb_acceptes or 0
+    nb_bc, nb_bc_valides = nb_bc or 0, nb_bc_valides or 0
+    return {
+        "nb_devis": nb_devis,
+        "nb_acceptes": nb_acceptes,
+        "nb_bc": nb_bc,
+        "nb_bc_valides": nb_bc_valides,
+        "taux_acceptation": _ratio(nb_acceptes, nb_devis),
+        "taux_validation": _ratio(nb_bc_valides, nb_acceptes),
+        "taux_global": _ratio(nb_bc_valides, nb_devis),
+        # Pertes à chaque étape de l'entonnoir
+        "perte_acceptation": nb_devis - nb_acceptes,
+        "perte_validation": nb_acceptes - nb_bc_valides,
+        "panier_moyen_devis": round(float(montant_devis or 0) / nb_devis, 2) if nb_devis else None,
+        "panier_moyen_acceptes": round(float(montant_acceptes or 0) / nb_acceptes, 2) if nb_acceptes else None,
+    }
+
+
+def _sums():
+    F = models.FunnelSnapshot
+    return (
+        func.sum(F.nb_devis),
+        func.sum(F.nb_acceptes),
+        func.sum(F.nb_bc),
+        func.sum(F.nb_bc_valides),
+        func.sum(F.montant_devis),
+        func.sum(F.montant_acceptes),
+    )
+
+
+def _filtered(query, boutique_id: Optional[int], mois_from: Optional[str], mois_to: Optional[str]):
+    F = models.FunnelSnapshot
+    if boutique_id is not None:
+        query = query.filter(F.boutique_id == boutique_id)
+    if mois_from:
+        query = query.filter(F.mois >= mois_from)
+    if mois_to:
+        query = query.filter(F.mois <= mois_to)
+    return query
+
+
+def snapshot_computed_at(db: Session) -> Optional[str]:
+    value = db.query(func.max(models.FunnelSnapshot.computed_at)).scalar()
+    return value.isoformat() if value else None
+
+
+def funnel_by_month(
+    db: Session,
+    boutique_id: Optional[int] = None,
+    mois_from: Optional[str] = None,
+    mois_to: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Cohortes mensuelles (mois de création des devis), toutes boutiques ou une seule."""
+    F = models.FunnelSnapshot
+    q = _filtered(db.query(F.mois, *_sums()), boutique_id, mois_from, mois_to)
+    return [{"mois": mois, **_funnel_values(*sums)} for mois, *sums in q.group_by(F.mois).order_by(F.mois)]
+
+
+def funnel_by_boutique(
+    db: Session,
+    mois_from: Optional[str] = None,
+    mois_to: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    F = models.FunnelSnapshot
+    q = _filtered(
+        db.query(F.boutique_id, models.Boutique.nom, *_sums()).join(
+            models.Boutique, models.Boutique.id == F.boutique_id
+        ),
+        None,
+        mois_from,
+        mois_to,
+    )
+    rows = q.group_by(F.boutique_id, models.Boutique.nom).order_by(models.Boutique.nom)
+    return [{"boutique_id": b_id, "boutique_nom": nom, **_funnel_values(*sums)} for b_id, nom, *sums in rows]
@@ -0,0 +1,165 @@
+"""
+Archivage des devis clos dans les tables `*_archive` (voir app.archive_models).
+
+Devis archivables, dernière modification (devis et BC) plus ancienne que
+ARCHIVE_AFTER_DAYS jours :
+- devis REFUSE sans bon de commande ;
+- devis dont le bon de commande est VALIDE ou REFUSE.
+
+Chaque lot (ARCHIVE_BATCH_SIZE devis) est déplacé dans une transaction :
+INSERT ... SELECT vers l'archive puis DELETE, des dépendances vers le devis
+(événements, durées par statut, bon de commande, lignes, mesures, devis).
+Les tables actives, et donc leurs index, ne contiennent plus que le travail en cours.
+
+Lectures de repli : fiche et PDF (app.boutique.loaders), timeline admin, exports
+CSV avec `include_archived`. Les compteurs (boutique_stats), l'entonnoir
+(funnel_snapshots) et les durées par statut incluent les archives ; la recherche
+plein texte ne porte que sur les tables actives.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import and_, delete, insert, literal, or_, select
+from sqlalchemy.engine import Connection, Engine
+from starlette.concurrency import run_in_threadpool
+
+from . import models
+from .archive_models import (
+    bc_status_durations_archive,
+    bon_commande_events_archive,
+    bons_commandes_archive,
+    devis_archive,
+    devis_mesures_archive,
+    lignes_devis_archive,
+)
+from .config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_INTERVAL_SECONDS
+from .database import engine as default_engine
+from .timeline_models import BonCommandeEvent
+
+_stats: Dict[str, Any] = {"runs": 0, "failures": 0, "last_run_at": None, "last_duration_ms": None, "archived_devis": 0}
+
+
+def _candidates(conn: Connection, cutoff: datetime, limit: int) -> List[int]:
+    D, BC = models.Devis, models.BonCommande
+    q = (
+        select(D.id)
+        .outerjoin(BC, BC.devis_id == D.id)
+        .where(D.updated_at < cutoff)
+        .where(
+            or_(
+                and_(BC.id.is_(None), D.statut == models.StatutDevis.REFUSE),
+                and_(
+                    BC.statut.in_([models.StatutBonCommande.VALIDE, models.StatutBonCommande.REFUSE]),
+                    BC.updated_at < cutoff,
+                ),
+            )
+        )
+        .order_by(D.id)
+        .limit(limit)
+    )
+    return list(conn.execute(q).scalars())
+
+
+def _move(conn: Connection, source, archive, key, ids: List[int], archived_at: Optional[datetime] = None) -> int:
+    if not ids:
+        return 0
+    names = [c.name for c in source.columns]
+    columns = list(source.columns)
+    if archived_at is not None:
+        names.append("archived_at")
+        columns.append(literal(archived_at, archive.c.archived_at.type))
+    conn.execute(insert(archive).from_select(names, select(*columns).where(key.in_(ids))))
+    return conn.execute(delete(source).where(key.in_(ids))).rowcount
+
+
+def archive_devis(conn: Connection, devis_ids: List[int], archived_at: Optional[datetime] = None) -> int:
+    """Déplace ces devis (et leurs dépendances) vers les archives ; renvoie le nombre de devis."""
+    if not devis_ids:
+        return 0
+    archived_at = archived_at or datetime.utcnow()
+    bc = models.BonCommande.__table__
+    bc_ids = list(conn.execute(select(bc.c.id).where(bc.c.devis_id.in_(devis_ids))).scalars())
+
+    events = BonCommandeEvent.__table__
+    durations = models.BcStatusDuration.__table__
+    lignes = models.LigneDevis.__table__
+    mesures = models.DevisMesure.__table__
+    devis = models.Devis.__table__
+
+    # Dépendances d'abord (clés étrangères actives)
+    _move(conn, events, bon_commande_events_archive, events.c.bon_commande_id, bc_ids)
+    _move(conn, durations, bc_status_durations_archive, durations.c.bon_commande_id, bc_ids)
+    _move(conn, bc, bons_commandes_archive, bc.c.devis_id, devis_ids)
+    _move(conn, lignes, lignes_devis_archive, lignes.c.devis_id, devis_ids)
+    _move(conn, mesures, devis_mesures_archive, mesures.c.devis_id, devis_ids)
+    return _move(conn, devis, devis_archive, devis.c.id, devis_ids, archived_at=archived_at)
+
+
+def run_archival(
+    bind: Optional[Engine] = None,
+    after_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> int:
+    """Archive tous les devis éligibles, lot par lot ; renvoie le nombre de devis archivés."""
+    bind = bind or default_engine
+    after_days = ARCHIVE_AFTER_DAYS if after_days is None else after_days
+    batch_size = max(1, batch_size or ARCHIVE_BATCH_SIZE)
+    if after_days <= 0:
+        return 0
+
+    started = time.monotonic()
+    now = datetime.utcnow()
+    cutoff = now - timedelta(days=after_days)
+    total = 0
+    try:
+        while True:
+            with bind.begin() as conn:
+                ids = _candidates(conn, cutoff, batch_size)
+                # Date du lot, pas du début du passage : la synchro boutique s'en sert de curseur
+                total += archive_devis(conn, ids, archived_at=datetime.utcnow())
+            if len(ids) < batch_size:
+                break
+    except Exception:
+        _stats["failures"] += 1
+        raise
+    finally:
+        _stats["archived_devis"] += total
+    _stats.update(
+        runs=_stats["runs"] + 1,
+        last_run_at=now.isoformat(),
+        last_duration_ms=round((time.monotonic() - started) * 1000, 1),
+    )
+    return total
+
+
+def archive_enabled() -> bool:
+    return ARCHIVE_AFTER_DAYS > 0
+
+
+async def archive_loop() -> None:
+    """Tâche de fond (lifespan) : un passage au démarrage puis toutes les ARCHIVE_INTERVAL_SECONDS."""
+    while True:
+        try:
+            await run_in_threadpool(run_archival)
+        except Exception as e:
+            print(f"[ARCHIVE] archival failed: {e!r}")
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+
+def archive_stats() -> Dict[str, Any]:
+    return {
+        "after_days": ARCHIVE_AFTER_DAYS,
+        "interval_seconds": ARCHIVE_INTERVAL_SECONDS,
+        "batch_size": ARCHIVE_BATCH_SIZE,
+        **_stats,
+    }
+
+
+def merge_newest_first(sources: Iterable[Iterable[Any]], key: Callable[[Any], Any]) -> Iterator[Any]:
+    """Fusionne des flux déjà triés par date décroissante (tables actives + archives, exports)."""
+    return heapq.merge(*sources, key=key, reverse=True)
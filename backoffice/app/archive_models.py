@@ -0,0 +1,108 @@
+"""
+Tables d'archive (`*_archive`) des devis clos et de leurs dépendances (voir app.archive).
+
+Mêmes colonnes que les tables actives, sans clés étrangères ni index de travail :
+uniquement les index des lectures de repli (fiche, PDF, timeline, exports). Les classes
+ORM portent les mêmes noms d'attributs que les modèles actifs (relations en lecture
+seule), pour que les mappers / PDF acceptent indifféremment un devis actif ou archivé.
+"""
+from sqlalchemy import Column, DateTime, Index, Table
+from sqlalchemy.orm import foreign, relationship
+
+from . import models
+from .database import Base
+from .timeline_models import BonCommandeEvent
+
+
+def _archive_table(source: Table, name: str, *extra) -> Table:
+    columns = [
+        Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable, autoincrement=False)
+        for c in source.columns
+    ]
+    return Table(name, Base.metadata, *columns, *extra)
+
+
+devis_archive = _archive_table(
+    models.Devis.__table__,
+    "devis_archive",
+    Column("archived_at", DateTime, nullable=False),
+    Index("ix_devis_archive_boutique_date", "boutique_id", "date_creation"),
+    Index("ix_devis_archive_boutique_archived_at", "boutique_id", "archived_at"),
+)
+lignes_devis_archive = _archive_table(
+    models.LigneDevis.__table__,
+    "lignes_devis_archive",
+    Index("ix_lignes_devis_archive_devis_id", "devis_id"),
+)
+devis_mesures_archive = _archive_table(
+    models.DevisMesure.__table__,
+    "devis_mesures_archive",
+    Index("ix_devis_mesures_archive_devis_id", "devis_id"),
+)
+bons_commandes_archive = _archive_table(
+    models.BonCommande.__table__,
+    "bons_commandes_archive",
+    Index("ix_bons_commandes_archive_devis_id", "devis_id", unique=True),
+    Index("ix_bons_commandes_archive_date", "date_creation"),
+)
+bon_commande_events_archive = _archive_table(
+    BonCommandeEvent.__table__,
+    "bon_commande_events_archive",
+    Index("ix_bon_commande_events_archive_bc_created", "bon_commande_id", "created_at", "id"),
+)
+bc_status_durations_archive = _archive_table(
+    models.BcStatusDuration.__table__,
+    "bc_status_durations_archive",
+    Index("ix_bc_status_durations_archive_bc", "bon_commande_id"),
+)
+
+
+class DevisArchive(Base):
+    __table__ = devis_archive
+
+    boutique = relationship(
+        models.Boutique, primaryjoin=lambda: foreign(devis_archive.c.boutique_id) == models.Boutique.id, viewonly=True
+    )
+    dentelle = relationship(
+        models.Dentelle, primaryjoin=lambda: foreign(devis_archive.c.dentelle_id) == models.Dentelle.id, viewonly=True
+    )
+    lignes = relationship(
+        "LigneDevisArchive",
+        primaryjoin=lambda: DevisArchive.id == foreign(LigneDevisArchive.devis_id),
+        order_by=lambda: LigneDevisArchive.id,
+        viewonly=True,
+    )
+    mesures = relationship(
+        "DevisMesureArchive",
+        primaryjoin=lambda: DevisArchive.id == foreign(DevisMesureArchive.devis_id),
+        order_by=lambda: DevisMesureArchive.id,
+        viewonly=True,
+    )
+    bon_commande = relationship(
+        "BonCommandeArchive",
+        primaryjoin=lambda: DevisArchive.id == foreign(BonCommandeArchive.devis_id),
+        uselist=False,
+        viewonly=True,
+    )
+
+
+class LigneDevisArchive(Base):
+    __table__ = lignes_devis_archive
+
+
+class DevisMesureArchive(Base):
+    __table__ = devis_mesures_archive
+
+
+class BonCommandeArchive(Base):
+    __table__ = bons_commandes_archive
+
+    devis = relationship(
+        DevisArchive,
+        primaryjoin=lambda: foreign(BonCommandeArchive.devis_id) == DevisArchive.id,
+        viewonly=True,
+    )
+
+
+class BonCommandeEventArchive(Base):
+    __table__ = bon_commande_events_archive
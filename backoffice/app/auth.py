@@ -1,26 +1,21 @@
+from dataclasses import dataclass
+
 from fastapi import APIRouter, Depends, Form, Request, HTTPException
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 
+from .cache import TTLCache
+from .config import ADMIN_IDENTITY_CACHE_TTL_SECONDS
 from .database import SessionLocal
+from .dependencies import get_db
 from . import models
+from .password_hashing import hasher, pwd_context  # noqa: F401
+from .rate_limit import TooManyLoginAttempts, get_login_limiter, login_keys
 
 from app.csrf import get_or_create_csrf_token, rotate_csrf_token
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
-
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
-
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 
 def get_password_hash(password: str) -> str:
@@ -29,12 +24,22 @@ def get_password_hash(password: str) -> str:
     Utilisé pour :
     - création boutique (mot de passe temporaire)
     - reset / changement de mot de passe boutique
+
+    Le calcul tourne dans le pool dédié (voir password_hashing).
     """
-    return pwd_context.hash(password)
+    return hasher.hash(password)
 
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return hasher.verify(plain, hashed)
+
+
+def verify_and_update_password(plain: str, hashed: str) -> tuple[bool, str | None]:
+    """
+    Vérifie le mot de passe et renvoie un nouveau hash si le coût configuré
+    (PASSWORD_HASH_ROUNDS) a changé depuis le stockage ; None sinon.
+    """
+    return hasher.verify_and_update(plain, hashed)
 
 
 @router.get("/admin/login")
@@ -42,7 +47,11 @@ def admin_login_page(request: Request):
     csrf_token = get_or_create_csrf_token(request)
 
     error = request.query_params.get("error")
-    error_msg = "Email ou mot de passe incorrect." if error else None
+    error_msg = None
+    if error == "rate_limited":
+        error_msg = "Trop de tentatives de connexion. Réessayez dans quelques minutes."
+    elif error:
+        error_msg = "Email ou mot de passe incorrect."
 
     success = request.query_params.get("success")
     success_msg = None
@@ -67,15 +76,34 @@ def admin_login(
     mot_de_passe: str = Form(...),
     db: Session = Depends(get_db),
 ):
+    limiter = get_login_limiter()
+    keys = login_keys(request, email)
+    try:
+        limiter.check(keys)
+    except TooManyLoginAttempts:
+        return RedirectResponse(url="/admin/login?error=rate_limited", status_code=302)
+
     user = (
         db.query(models.User)
         .filter_by(email=email, type=models.UserType.ADMIN)
         .first()
     )
 
-    if not user or not verify_password(mot_de_passe, user.mot_de_passe):
+    if not user:
+        limiter.record_failure(keys)
+        return RedirectResponse(url="/admin/login?error=1", status_code=302)
+
+    valid, new_hash = verify_and_update_password(mot_de_passe, user.mot_de_passe)
+    if not valid:
+        limiter.record_failure(keys)
         return RedirectResponse(url="/admin/login?error=1", status_code=302)
 
+    limiter.record_success(keys)
+
+    if new_hash:
+        user.mot_de_passe = new_hash
+        db.commit()
+
     # Anti session fixation + prêt pour MFA
     request.session.clear()
     request.session["admin_id"] = user.id
@@ -87,34 +115,88 @@ def admin_login(
 @router.post("/admin/logout")
 def admin_logout(request: Request):
     """Déconnexion de l'admin : efface la session."""
+    admin_id = request.session.get("admin_id")
+    if admin_id:
+        invalidate_admin_identity(admin_id)
     request.session.clear()
     return RedirectResponse(url="/admin/login", status_code=302)
 
 
-def get_current_admin(request: Request, db: Session = Depends(get_db)) -> models.User:
+@dataclass(frozen=True)
+class AdminIdentity:
+    """
+    Vue en lecture seule de l'admin connecté (mise en cache par process).
+    Pour modifier le compte (mot de passe...), utiliser get_current_admin_user.
+    """
+    id: int
+    nom: str
+    email: str
+    type: models.UserType
+
+
+# admin_id -> AdminIdentity : évite un SELECT users à chaque page / appel API admin
+_admin_identity_cache: TTLCache[AdminIdentity] = TTLCache(
+    maxsize=256,
+    ttl=ADMIN_IDENTITY_CACHE_TTL_SECONDS,
+)
+
+
+def invalidate_admin_identity(admin_id: int) -> None:
+    _admin_identity_cache.pop(admin_id)
+
+
+def admin_identity_cache_stats() -> dict:
+    return _admin_identity_cache.stats()
+
+
+def _redirect_to_login() -> HTTPException:
+    # Utiliser HTTPException avec status 307 pour la redirection
+    return HTTPException(
+        status_code=307,
+        detail="Redirection vers login",
+        headers={"Location": "/admin/login"},
+    )
+
+
+def get_current_admin(request: Request) -> AdminIdentity:
     """Vérifie qu'un admin est connecté, sinon redirige vers /admin/login."""
     admin_id = request.session.get("admin_id")
     if not admin_id:
-        # Utiliser HTTPException avec status 307 pour la redirection
-        raise HTTPException(
-            status_code=307,
-            detail="Redirection vers login",
-            headers={"Location": "/admin/login"},
-        )
+        raise _redirect_to_login()
 
-    admin = (
-        db.query(models.User)
-        .filter_by(id=admin_id, type=models.UserType.ADMIN)
-        .first()
-    )
-    if not admin:
-        raise HTTPException(
-            status_code=307,
-            detail="Redirection vers login",
-            headers={"Location": "/admin/login"},
+    if ADMIN_IDENTITY_CACHE_TTL_SECONDS > 0:
+        cached = _admin_identity_cache.get(admin_id)
+        if cached is not None:
+            return cached
+
+    db = SessionLocal()
+    try:
+        admin = (
+            db.query(models.User)
+            .filter_by(id=admin_id, type=models.UserType.ADMIN)
+            .first()
         )
+        if not admin:
+            raise _redirect_to_login()
+        identity = AdminIdentity(id=admin.id, nom=admin.nom, email=admin.email, type=admin.type)
+    finally:
+        db.close()
 
-    return admin
+    if ADMIN_IDENTITY_CACHE_TTL_SECONDS > 0:
+        _admin_identity_cache.set(admin_id, identity)
+    return identity
+
+
+def get_current_admin_user(
+    admin: AdminIdentity = Depends(get_current_admin),
+    db: Session = Depends(get_db),
+) -> models.User:
+    """Admin connecté sous forme d'objet ORM attaché à la session de la requête."""
+    user = db.get(models.User, admin.id)
+    if not user:
+        invalidate_admin_identity(admin.id)
+        raise _redirect_to_login()
+    return user
 
 
 def require_admin(request: Request):
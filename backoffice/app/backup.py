@@ -0,0 +1,246 @@
+"""
+Sauvegardes à chaud de la base SQLite (API de sauvegarde en ligne de SQLite).
+
+Chaque sauvegarde :
+1. copie la base vers un fichier temporaire par lots de BACKUP_PAGES_PER_STEP pages,
+   avec une pause de BACKUP_STEP_SLEEP_MS entre deux lots : le verrou de lecture n'est
+   tenu que pendant un lot, les requêtes ne voient pas de pic de latence ;
+2. vérifie la copie (PRAGMA quick_check) ;
+3. la compresse (gzip) dans BACKUP_DIR sous un nom horodaté, par renommage atomique ;
+4. ne garde que les BACKUP_RETENTION sauvegardes les plus récentes.
+
+Une écriture par une autre connexion pendant la copie fait repartir SQLite du début.
+Après BACKUP_MAX_RESTARTS reprises, la copie est terminée en un seul lot : en WAL,
+c'est une simple transaction de lecture, qui ne bloque pas les écritures.
+
+Tâche de fond (lifespan) si BACKUP_INTERVAL_SECONDS > 0 ; sauvegarde, liste et
+restauration à la demande : scripts/backup.py.
+"""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.engine import make_url
+from starlette.concurrency import run_in_threadpool
+
+from .config import (
+    BACKUP_DIR,
+    BACKUP_INTERVAL_SECONDS,
+    BACKUP_MAX_RESTARTS,
+    BACKUP_PAGES_PER_STEP,
+    BACKUP_RETENTION,
+    BACKUP_STEP_SLEEP_MS,
+    SQLITE_BUSY_TIMEOUT_SECONDS,
+)
+from .database import DATABASE_URL
+
+SUFFIX = ".db.gz"
+_CHUNK = 1024 * 1024
+
+_stats: Dict[str, Any] = {
+    "runs": 0,
+    "failures": 0,
+    "last_run_at": None,
+    "last_duration_ms": None,
+    "last_file": None,
+    "last_size": None,
+    "restarts": 0,
+}
+
+
+class BackupError(Exception):
+    pass
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def database_path(url: str = DATABASE_URL) -> Optional[str]:
+    """Chemin du fichier SQLite, ou None (autre base, base en mémoire)."""
+    if not url.startswith("sqlite"):
+        return None
+    database = make_url(url).database
+    if not database or database == ":memory:":
+        return None
+    return os.path.abspath(database)
+
+
+def backup_dir(db_path: Optional[str] = None) -> str:
+    """BACKUP_DIR, ou par défaut `backups/` à côté de la base (même volume docker)."""
+    if BACKUP_DIR:
+        return os.path.abspath(BACKUP_DIR)
+    return os.path.join(os.path.dirname(db_path or database_path() or "."), "backups")
+
+
+def backup_enabled() -> bool:
+    return BACKUP_INTERVAL_SECONDS > 0 and database_path() is not None
+
+
+def _copy(source: sqlite3.Connection, target: sqlite3.Connection) -> int:
+    """Copie par lots ; renvoie le nombre de reprises (base modifiée pendant la copie).
+
+    La pause entre deux lots est faite dans `progress` : le paramètre `sleep` de
+    `Connection.backup` ne sert que si SQLite répond BUSY/LOCKED, jamais en WAL.
+    """
+    state = {"remaining": None, "restarts": 0}
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > BACKUP_MAX_RESTARTS:
+                raise _TooManyRestarts()
+        state["remaining"] = remaining
+        if remaining > 0 and BACKUP_STEP_SLEEP_MS > 0:
+            time.sleep(BACKUP_STEP_SLEEP_MS / 1000)
+
+    try:
+        source.backup(target, pages=max(1, BACKUP_PAGES_PER_STEP), progress=progress)
+    except _TooManyRestarts:
+        source.backup(target, pages=-1)
+    return state["restarts"]
+
+
+def _check(path: str) -> None:
+    conn = sqlite3.connect(path)
+    try:
+        result = conn.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        conn.close()
+    if result != "ok":
+        raise BackupError(f"Sauvegarde corrompue ({path}) : {result}")
+
+
+def _gzip(source: str, target: str) -> None:
+    with open(source, "rb") as src, gzip.open(target, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, _CHUNK)
+
+
+def list_backups(directory: Optional[str] = None) -> List[str]:
+    """Sauvegardes de BACKUP_DIR, de la plus récente à la plus ancienne (chemins complets)."""
+    directory = directory or backup_dir()
+    if not os.path.isdir(directory):
+        return []
+    names = [n for n in os.listdir(directory) if n.endswith(SUFFIX)]
+    # Noms horodatés (AAAAMMJJTHHMMSSZ) : l'ordre alphabétique est l'ordre chronologique
+    return [os.path.join(directory, n) for n in sorted(names, reverse=True)]
+
+
+def prune_backups(directory: Optional[str] = None, keep: Optional[int] = None) -> List[str]:
+    """Supprime les sauvegardes au-delà des `keep` plus récentes ; renvoie les fichiers supprimés."""
+    keep = BACKUP_RETENTION if keep is None else keep
+    if keep <= 0:
+        return []
+    removed = list_backups(directory)[keep:]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def run_backup(db_path: Optional[str] = None, directory: Optional[str] = None) -> str:
+    """Sauvegarde compressée de la base ; renvoie le chemin du fichier créé."""
+    db_path = db_path or database_path()
+    if db_path is None:
+        raise BackupError("Sauvegarde disponible uniquement pour une base SQLite sur disque")
+    directory = directory or backup_dir(db_path)
+    os.makedirs(directory, exist_ok=True)
+
+    started = time.monotonic()
+    now = datetime.utcnow()
+    base = os.path.splitext(os.path.basename(db_path))[0]
+    final = os.path.join(directory, f"{base}-{now.strftime('%Y%m%dT%H%M%SZ')}{SUFFIX}")
+    tmp_db = final + ".tmp.db"
+    tmp_gz = final + ".tmp"
+    try:
+        source = sqlite3.connect(db_path, timeout=SQLITE_BUSY_TIMEOUT_SECONDS)
+        target = sqlite3.connect(tmp_db)
+        try:
+            restarts = _copy(source, target)
+        finally:
+            target.close()
+            source.close()
+        _check(tmp_db)
+        _gzip(tmp_db, tmp_gz)
+        os.replace(tmp_gz, final)
+    except Exception:
+        _stats["failures"] += 1
+        raise
+    finally:
+        for path in (tmp_db, tmp_gz):
+            if os.path.exists(path):
+                os.remove(path)
+    prune_backups(directory)
+    _stats.update(
+        runs=_stats["runs"] + 1,
+        last_run_at=now.isoformat(),
+        last_duration_ms=round((time.monotonic() - started) * 1000, 1),
+        last_file=os.path.basename(final),
+        last_size=os.path.getsize(final),
+        restarts=_stats["restarts"] + restarts,
+    )
+    return final
+
+
+def restore_backup(backup_path: str, db_path: Optional[str] = None) -> Optional[str]:
+    """Remplace la base par une sauvegarde (application arrêtée).
+
+    La base courante est conservée à côté (`*.avant-restauration-<date>`) ;
+    renvoie ce chemin, ou None s'il n'y avait pas de base.
+    """
+    db_path = db_path or database_path()
+    if db_path is None:
+        raise BackupError("Restauration disponible uniquement pour une base SQLite sur disque")
+    if not os.path.isfile(backup_path):
+        raise BackupError(f"Sauvegarde introuvable : {backup_path}")
+
+    tmp_db = db_path + ".restauration.tmp"
+    try:
+        with gzip.open(backup_path, "rb") as src, open(tmp_db, "wb") as dst:
+            shutil.copyfileobj(src, dst, _CHUNK)
+        _check(tmp_db)
+    except Exception:
+        if os.path.exists(tmp_db):
+            os.remove(tmp_db)
+        raise
+
+    previous = None
+    if os.path.exists(db_path):
+        # Checkpoint : le fichier conservé contient aussi les pages encore dans le WAL
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+        previous = f"{db_path}.avant-restauration-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}"
+        os.replace(db_path, previous)
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    os.replace(tmp_db, db_path)
+    return previous
+
+
+async def backup_loop() -> None:
+    """Tâche de fond (lifespan) : une sauvegarde toutes les BACKUP_INTERVAL_SECONDS."""
+    while True:
+        await asyncio.sleep(BACKUP_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(run_backup)
+        except Exception as e:
+            print(f"[BACKUP] backup failed: {e!r}")
+
+
+def backup_stats() -> Dict[str, Any]:
+    return {
+        "interval_seconds": BACKUP_INTERVAL_SECONDS,
+        "retention": BACKUP_RETENTION,
+        "pages_per_step": BACKUP_PAGES_PER_STEP,
+        **_stats,
+    }
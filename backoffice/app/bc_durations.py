@@ -0,0 +1,220 @@
+"""
+Durées passées par les bons de commande dans chaque statut (`bc_status_durations`).
+
+Une ligne par séjour d'un BC dans un statut : `debut` = événement qui y fait entrer,
+`fin` / `duree_secondes` = événement suivant qui en fait sortir (NULL tant que le BC
+y est encore). Les événements de transition :
+BC_SOUMIS / BC_REVALIDE / BC_REMIS_EN_ATTENTE (retour en attente par l'atelier)
+-> EN_ATTENTE_VALIDATION, BC_RENVOYE -> A_MODIFIER,
+BC_VALIDE -> VALIDE, BC_REFUSE -> REFUSE (BC_MAJ_ADMIN ne change pas de statut).
+
+- Alimentation incrémentale : `record_transitions`, appelé par timeline.create_event
+  et create_events_bulk (ferme le séjour ouvert, ouvre le suivant).
+- Reconstruction complète depuis `bon_commande_events` (LAG / LEAD) :
+  `rebuild_status_durations`, migration 009_bc_status_durations.
+- Rapports p50 / p95 (global et par boutique) : `duration_report`, fonctions de
+  fenêtre sur cette table (et son archive), sans relire l'historique des événements.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import DateTime, Integer, String, delete, insert, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from . import models
+
+EVENT_STATUTS: Dict[str, str] = {
+    "BC_SOUMIS": models.StatutBonCommande.EN_ATTENTE_VALIDATION.value,
+    "BC_REVALIDE": models.StatutBonCommande.EN_ATTENTE_VALIDATION.value,
+    "BC_REMIS_EN_ATTENTE": models.StatutBonCommande.EN_ATTENTE_VALIDATION.value,
+    "BC_RENVOYE": models.StatutBonCommande.A_MODIFIER.value,
+    "BC_VALIDE": models.StatutBonCommande.VALIDE.value,
+    "BC_REFUSE": models.StatutBonCommande.REFUSE.value,
+}
+
+
+def _seconds(debut: datetime, fin: datetime) -> int:
+    return max(0, int((fin - debut).total_seconds()))
+
+
+def record_transitions(db: Session, transitions: Iterable[Tuple[int, str, datetime]]) -> None:
+    """(bon_commande_id, event_type, date) -> ferme le séjour ouvert et ouvre le suivant.
+
+    Deux requêtes quel que soit le nombre de BC (séjours ouverts, boutiques) ;
+    un événement qui ne change pas le statut courant est ignoré.
+    """
+    transitions = [(bc_id, EVENT_STATUTS[t], at) for bc_id, t, at in transitions if t in EVENT_STATUTS]
+    if not transitions:
+        return
+    # Sessions sans autoflush : les séjours ouverts/fermés plus tôt dans la transaction
+    # doivent être visibles de la requête ci-dessous
+    db.flush()
+    Duration = models.BcStatusDuration
+    ids = {bc_id for bc_id, _, _ in transitions}
+
+    ouverts: Dict[int, models.BcStatusDuration] = {
+        d.bon_commande_id: d
+        for d in db.query(Duration).filter(Duration.bon_commande_id.in_(ids), Duration.fin.is_(None))
+    }
+    boutiques: Dict[int, int] = dict(
+        db.query(models.BonCommande.id, models.Devis.boutique_id)
+        .join(models.Devis, models.BonCommande.devis_id == models.Devis.id)
+        .filter(models.BonCommande.id.in_(ids))
+        .all()
+    )
+
+    for bc_id, statut, at in transitions:
+        ouvert = ouverts.get(bc_id)
+        if ouvert is not None:
+            if ouvert.statut == statut:
+                continue
+            ouvert.fin = at
+            ouvert.duree_secondes = _seconds(ouvert.debut, at)
+        suivant = Duration(
+            bon_commande_id=bc_id,
+            boutique_id=ouvert.boutique_id if ouvert is not None else boutiques.get(bc_id),
+            statut=statut,
+            debut=at,
+        )
+        db.add(suivant)
+        ouverts[bc_id] = suivant
+
+
+def _case_statut() -> str:
+    whens = " ".join(f"WHEN '{t}' THEN '{s}'" for t, s in EVENT_STATUTS.items())
+    return f"CASE e.event_type {whens} END"
+
+
+def _in_types() -> str:
+    return ", ".join(f"'{t}'" for t in EVENT_STATUTS)
+
+
+# Séjours reconstruits depuis l'historique :
+# - BC antérieurs à l'historique (pas de BC_SOUMIS) : entrée en attente à date_creation ;
+# - LAG écarte les événements qui ne changent pas de statut, LEAD donne la sortie.
+_REBUILD_SQL = f"""
+WITH transitions AS (
+    SELECT e.bon_commande_id, d.boutique_id, {_case_statut()} AS statut, e.created_at AS debut, e.id AS ordre
+    FROM bon_commande_events e
+    JOIN bons_commandes bc ON bc.id = e.bon_commande_id
+    JOIN devis d ON d.id = bc.devis_id
+    WHERE e.event_type IN ({_in_types()})
+    UNION ALL
+    SELECT bc.id, d.boutique_id, 'EN_ATTENTE_VALIDATION', bc.date_creation, 0
+    FROM bons_commandes bc
+    JOIN devis d ON d.id = bc.devis_id
+    WHERE NOT EXISTS (
+        SELECT 1 FROM bon_commande_events e
+        WHERE e.bon_commande_id = bc.id AND e.event_type = 'BC_SOUMIS'
+    )
+),
+avec_precedent AS (
+    SELECT t.*, LAG(statut) OVER (PARTITION BY bon_commande_id ORDER BY debut, ordre) AS precedent
+    FROM transitions t
+),
+changements AS (
+    SELECT * FROM avec_precedent WHERE precedent IS NULL OR precedent <> statut
+)
+SELECT bon_commande_id, boutique_id, statut, debut,
+       LEAD(debut) OVER (PARTITION BY bon_commande_id ORDER BY debut, ordre) AS fin
+FROM changements
+"""
+
+
+def rebuild_status_durations(conn: Connection) -> int:
+    """Recalcule toute la table depuis `bon_commande_events` ; renvoie le nombre de séjours."""
+    rows = conn.execute(
+        text(_REBUILD_SQL).columns(
+            bon_commande_id=Integer, boutique_id=Integer, statut=String, debut=DateTime, fin=DateTime
+        )
+    ).all()
+    table = models.BcStatusDuration.__table__
+    conn.execute(delete(table))
+    values: List[Dict[str, Any]] = [
+        {
+            "bon_commande_id": bc_id,
+            "boutique_id": boutique_id,
+            "statut": statut,
+            "debut": debut,
+            "fin": fin,
+            "duree_secondes": _seconds(debut, fin) if debut and fin else None,
+        }
+        for bc_id, boutique_id, statut, debut, fin in rows
+    ]
+    if values:
+        conn.execute(insert(table), values)
+    return len(values)
+
+
+# Séjours actifs et archivés (app.archive).
+# Échantillons : délai soumission -> validation (somme des séjours précédant VALIDE)
+# et chaque séjour terminé en A_MODIFIER. Percentiles au rang le plus proche :
+# rang = ceil(p * n / 100), en arithmétique entière.
+_REPORT_SQL = """
+WITH sejours AS (
+    SELECT id, bon_commande_id, boutique_id, statut, debut, duree_secondes FROM bc_status_durations
+    UNION ALL
+    SELECT id, bon_commande_id, boutique_id, statut, debut, duree_secondes FROM bc_status_durations_archive
+),
+cumul AS (
+    SELECT boutique_id, statut,
+           SUM(duree_secondes) OVER (
+               PARTITION BY bon_commande_id ORDER BY debut, id
+               ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+           ) AS avant
+    FROM sejours
+),
+echantillons AS (
+    SELECT 'validation' AS mesure, boutique_id, avant AS duree
+    FROM cumul WHERE statut = 'VALIDE' AND avant IS NOT NULL
+    UNION ALL
+    SELECT 'a_modifier', boutique_id, duree_secondes
+    FROM sejours WHERE statut = 'A_MODIFIER' AND duree_secondes IS NOT NULL
+),
+portees AS (
+    SELECT mesure, boutique_id, duree FROM echantillons
+    UNION ALL
+    SELECT mesure, NULL, duree FROM echantillons
+),
+rangs AS (
+    SELECT mesure, boutique_id, duree,
+           ROW_NUMBER() OVER (PARTITION BY mesure, boutique_id ORDER BY duree) AS rang,
+           COUNT(*) OVER (PARTITION BY mesure, boutique_id) AS n
+    FROM portees
+)
+SELECT mesure, boutique_id, n,
+       MAX(CASE WHEN rang = (50 * n + 99) / 100 THEN duree END) AS p50,
+       MAX(CASE WHEN rang = (95 * n + 99) / 100 THEN duree END) AS p95
+FROM rangs
+GROUP BY mesure, boutique_id, n
+"""
+
+MESURES = ("validation", "a_modifier")
+
+
+def _empty() -> Dict[str, Optional[int]]:
+    return {"n": 0, "p50": None, "p95": None}
+
+
+def duration_report(db: Session) -> Dict[str, Any]:
+    """p50 / p95 (secondes) du délai de validation et du temps en A_MODIFIER, global et par boutique."""
+    global_: Dict[str, Dict[str, Optional[int]]] = {m: _empty() for m in MESURES}
+    par_boutique: Dict[int, Dict[str, Dict[str, Optional[int]]]] = {}
+    for mesure, boutique_id, n, p50, p95 in db.execute(text(_REPORT_SQL)):
+        valeurs = {"n": n, "p50": p50, "p95": p95}
+        if boutique_id is None:
+            global_[mesure] = valeurs
+        else:
+            par_boutique.setdefault(boutique_id, {m: _empty() for m in MESURES})[mesure] = valeurs
+
+    noms = dict(
+        db.query(models.Boutique.id, models.Boutique.nom).filter(models.Boutique.id.in_(par_boutique)).all()
+    ) if par_boutique else {}
+    boutiques = [
+        {"boutique_id": b_id, "boutique_nom": noms.get(b_id), **mesures}
+        for b_id, mesures in sorted(par_boutique.items(), key=lambda kv: (noms.get(kv[0]) or "").lower())
+    ]
+    return {"global": global_, "boutiques": boutiques}
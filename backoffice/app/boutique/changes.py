@@ -0,0 +1,149 @@
+"""Incremental sync for the boutique front (GET /api/boutique/changes).
+
+The client keeps an opaque `next` token and sends it back as `since`; only devis
+and bons de commande whose `updated_at` is newer are returned.
+
+`updated_at` is stamped in Python when the row is flushed, not when it is
+committed: a writer waiting for the SQLite lock can commit a row stamped up to
+SQLITE_BUSY_TIMEOUT_SECONDS in the past. The token is therefore taken that far
+back, plus a margin for the rest of the transaction (SYNC_OVERLAP), and such a
+row is returned on the next call rather than missed. Recent rows come back more
+than once, so items must be applied idempotently (upsert by id), which is what
+the front already does with full lists.
+
+Devis archived since the token (app.archive) are reported by id, with their
+bon de commande, in `archived_devis` / `archived_bons_commande`: the front drops
+them from its lists (detail and PDF still read them from the archive).
+"""
+from __future__ import annotations
+
+import base64
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session, contains_eager
+
+from .. import models
+from ..archive_models import BonCommandeArchive, DevisArchive
+from ..config import SQLITE_BUSY_TIMEOUT_SECONDS
+from ..timeline import latest_events
+from .mappers import build_bon_commande_public, build_devis_public
+from .schemas import BoutiquePublic, ChangesPublic
+
+SYNC_OVERLAP = timedelta(seconds=SQLITE_BUSY_TIMEOUT_SECONDS + 5)
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 1000
+
+
+def encode_token(dt: datetime) -> str:
+    return base64.urlsafe_b64encode(dt.isoformat().encode()).decode().rstrip("=")
+
+
+def decode_token(token: Optional[str]) -> Optional[datetime]:
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        return datetime.fromisoformat(raw)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Jeton de synchronisation invalide")
+
+
+def _devis_since(db: Session, boutique_id: int, since: Optional[datetime], limit: int) -> List[models.Devis]:
+    q = db.query(models.Devis).filter(models.Devis.boutique_id == boutique_id)
+    if since is not None:
+        q = q.filter(models.Devis.updated_at > since)
+    return q.order_by(models.Devis.updated_at, models.Devis.id).limit(limit).all()
+
+
+def _bons_since(
+    db: Session,
+    boutique_id: int,
+    since: Optional[datetime],
+    limit: int,
+) -> List[models.BonCommande]:
+    q = (
+        db.query(models.BonCommande)
+        .join(models.Devis, models.BonCommande.devis_id == models.Devis.id)
+        .options(contains_eager(models.BonCommande.devis))
+        .filter(models.Devis.boutique_id == boutique_id)
+    )
+    if since is not None:
+        q = q.filter(models.BonCommande.updated_at > since)
+    return q.order_by(models.BonCommande.updated_at, models.BonCommande.id).limit(limit).all()
+
+
+def _archived_since(
+    db: Session,
+    boutique_id: int,
+    since: Optional[datetime],
+    limit: int,
+) -> List[Tuple[int, Optional[int], datetime]]:
+    """(devis id, bon de commande id or None, archived_at) archived after `since`."""
+    if since is None:
+        return []  # Full sync: archived rows are simply not listed
+    return (
+        db.query(DevisArchive.id, BonCommandeArchive.id, DevisArchive.archived_at)
+        .outerjoin(BonCommandeArchive, BonCommandeArchive.devis_id == DevisArchive.id)
+        .filter(DevisArchive.boutique_id == boutique_id, DevisArchive.archived_at > since)
+        .order_by(DevisArchive.archived_at, DevisArchive.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def _next_since(
+    now: datetime,
+    since: Optional[datetime],
+    batches: List[Tuple[List[datetime], int]],
+) -> Tuple[datetime, bool]:
+    """Watermark for the next call; stops at the oldest truncated batch if any."""
+
+    truncated = [stamps[-1] for stamps, limit in batches if len(stamps) >= limit]
+    if truncated:
+        # Same updated_at may straddle the cut: restart just before it (duplicates are fine)
+        return min(truncated) - timedelta(microseconds=1), True
+
+    next_since = now - SYNC_OVERLAP
+    if since is not None and next_since < since:
+        next_since = since
+    return next_since, False
+
+
+def collect_changes(
+    db: Session,
+    boutique: models.Boutique,
+    since_token: Optional[str],
+    limit: int = DEFAULT_LIMIT,
+) -> ChangesPublic:
+    since = decode_token(since_token)
+    limit = max(1, min(limit, MAX_LIMIT))
+    now = datetime.utcnow()
+
+    devis = _devis_since(db, boutique.id, since, limit)
+    bons = _bons_since(db, boutique.id, since, limit)
+    archived = _archived_since(db, boutique.id, since, limit)
+    next_since, has_more = _next_since(
+        now,
+        since,
+        [
+            ([d.updated_at for d in devis], limit),
+            ([bc.updated_at for bc in bons], limit),
+            ([archived_at for _, _, archived_at in archived], limit),
+        ],
+    )
+
+    activity = latest_events(db, [bc.id for bc in bons])
+
+    boutique_changed = since is None or (boutique.updated_at is not None and boutique.updated_at > since)
+
+    return ChangesPublic(
+        devis=[build_devis_public(d, boutique, include_lignes=False) for d in devis],
+        bons_commande=[build_bon_commande_public(bc, bc.devis.numero_boutique, activity.get(bc.id)) for bc in bons],
+        boutique=BoutiquePublic.model_validate(boutique) if boutique_changed else None,
+        archived_devis=[devis_id for devis_id, _, _ in archived],
+        archived_bons_commande=[bc_id for _, bc_id, _ in archived if bc_id is not None],
+        next=encode_token(next_since),
+        has_more=has_more,
+    )
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional, Tuple, Union
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+
+from .. import models
+from ..archive_models import BonCommandeArchive, DevisArchive
+
+
+def devis_detail_options(model=models.Devis):
+    """Eager-load options for everything build_devis_public(include_lignes=True) reads."""
+
+    # Les mesures sont une colonne du devis (mesures_json) : rien à charger en plus.
+    return (selectinload(model.lignes),)
+
+
+def get_devis_for_boutique(
+    db: Session,
+    devis_id: int,
+    boutique_id: int,
+    with_children: bool = True,
+    include_archived: bool = False,
+) -> Optional[Union[models.Devis, DevisArchive]]:
+    """Load a devis owned by a boutique, with lignes/mesures in the same round-trip batch.
+
+    `include_archived`: read paths only (detail, PDF) fall back to the archive
+    (app.archive); archived devis are read-only.
+    """
+
+    for model in (models.Devis, DevisArchive) if include_archived else (models.Devis,):
+        q = db.query(model).filter(model.id == devis_id, model.boutique_id == boutique_id)
+        if with_children:
+            q = q.options(*devis_detail_options(model))
+        devis = q.first()
+        if devis is not None:
+            return devis
+    return None
+
+
+def next_numero_boutique(db: Session, boutique_id: int) -> int:
+    """Next per-boutique devis number; archived devis keep theirs, so they count too."""
+
+    numeros = [
+        db.query(func.max(model.numero_boutique)).filter(model.boutique_id == boutique_id).scalar()
+        for model in (models.Devis, DevisArchive)
+    ]
+    return max((n for n in numeros if n is not None), default=0) + 1
+
+
+def get_devis_version(
+    db: Session,
+    devis_id: int,
+    boutique_id: int,
+) -> Optional[Tuple[Optional[datetime], Optional[datetime]]]:
+    """(devis.updated_at, bon_commande.updated_at) in one indexed lookup, or None if not found.
+
+    Used to answer conditional requests (304) before loading anything else.
+    """
+
+    for devis_model, bc_model in ((models.Devis, models.BonCommande), (DevisArchive, BonCommandeArchive)):
+        row = (
+            db.query(devis_model.updated_at, bc_model.updated_at)
+            .outerjoin(bc_model, bc_model.devis_id == devis_model.id)
+            .filter(devis_model.id == devis_id, devis_model.boutique_id == boutique_id)
+            .first()
+        )
+        if row is not None:
+            return tuple(row)
+    return None
+
+
+def get_bons_commande_version(db: Session, boutique_id: int) -> Tuple[int, Optional[datetime]]:
+    """(count, max(updated_at)) of a boutique's bons de commande."""
+
+    count, last = (
+        db.query(func.count(models.BonCommande.id), func.max(models.BonCommande.updated_at))
+        .join(models.Devis, models.BonCommande.devis_id == models.Devis.id)
+        .filter(models.Devis.boutique_id == boutique_id)
+        .one()
+    )
+    return count, last
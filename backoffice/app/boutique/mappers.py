@@ -4,8 +4,10 @@ import json
 from typing import List, Optional
 
 from .. import models
+from ..timeline import LatestEvent
+from .mesures import read_mesures
 from .pricing import compute_prix_boutique_et_client
-from .schemas import DevisPublic, LigneDevisPublic, MesureValeurPublic
+from .schemas import BonCommandePublic, DevisPublic, LigneDevisPublic, MesureValeurPublic
 
 
 def build_devis_public(
@@ -38,10 +40,11 @@ def build_devis_public(
         ]
 
     mesures_public: Optional[List[MesureValeurPublic]] = None
-    if include_lignes and getattr(devis, "mesures", None):
+    mesures = read_mesures(devis) if include_lignes else []
+    if mesures:
         mesures_public = [
             MesureValeurPublic(mesure_type_id=m.mesure_type_id, valeur=m.valeur)
-            for m in devis.mesures
+            for m in mesures
         ]
 
     config_data: dict | None = None
@@ -58,6 +61,7 @@ def build_devis_public(
         statut=devis.statut.value if hasattr(devis.statut, "value") else str(devis.statut),
         type=devis.type.value if hasattr(devis.type, "value") else str(getattr(devis, "type", "")) or None,
         date_creation=devis.date_creation.isoformat() if devis.date_creation else None,
+        updated_at=devis.updated_at.isoformat() if getattr(devis, "updated_at", None) else None,
         prix_total=devis.prix_total,
         prix_boutique=prix_boutique_affiche,
         prix_client_conseille_ttc=prix["client_ttc"],
@@ -66,3 +70,28 @@ def build_devis_public(
         lignes=lignes_public,
         mesures=mesures_public,
     )
+
+
+def build_bon_commande_public(
+    bc: models.BonCommande,
+    numero_devis: int,
+    latest: Optional[LatestEvent] = None,
+) -> BonCommandePublic:
+    """Map ORM BonCommande -> API BonCommandePublic (`latest`: see timeline.latest_events)."""
+
+    return BonCommandePublic(
+        id=bc.id,
+        devis_id=bc.devis_id,
+        numero_devis=numero_devis,
+        date_creation=bc.date_creation,
+        montant_boutique_ht=bc.montant_boutique_ht,
+        montant_boutique_ttc=bc.montant_boutique_ttc,
+        has_tva=bc.has_tva,
+        statut=bc.statut.value if hasattr(bc.statut, "value") else str(bc.statut),
+        commentaire_admin=bc.commentaire_admin,
+        commentaire_boutique=getattr(bc, "commentaire_boutique", None),
+        updated_at=getattr(bc, "updated_at", None),
+        derniere_activite=latest.event.created_at if latest else None,
+        dernier_evenement=latest.event.event_type if latest else None,
+        nb_evenements=latest.nb_events if latest else 0,
+    )
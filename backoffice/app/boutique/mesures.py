@@ -0,0 +1,64 @@
+"""Compact storage of a devis' measurements.
+
+Measurements used to be stored as one `devis_mesures` row per value (~19 per
+devis). They now live in a single JSON column on the devis:
+
+    devis.mesures_json = '{"1": 88.0, "2": 70.5, ...}'
+
+Keys are MesureType ids (not positions), so adding, removing or re-ordering
+mesure types never shifts existing values. Order is the payload order, i.e. the
+front's MesureType.ordre order, which keeps API output identical to the
+previous row-based storage.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from .. import models
+from .schemas import MesureValeurPayload
+
+
+@dataclass(frozen=True)
+class MesureValeur:
+    mesure_type_id: int
+    valeur: Optional[float]
+    type: Optional[models.MesureType] = None
+
+
+def read_mesures(devis: models.Devis) -> List[MesureValeur]:
+    raw = getattr(devis, "mesures_json", None)
+    if not raw:
+        return []
+    try:
+        data: Dict[str, Optional[float]] = json.loads(raw)
+    except (TypeError, ValueError):
+        return []
+    return [MesureValeur(mesure_type_id=int(k), valeur=v) for k, v in data.items()]
+
+
+def write_mesures(devis: models.Devis, mesures: Iterable[MesureValeurPayload]) -> bool:
+    """Replace the devis' measurements. Returns True if the stored value changed."""
+
+    data: Dict[str, Optional[float]] = {}
+    for m in mesures:
+        data[str(m.mesure_type_id)] = m.valeur
+
+    raw = json.dumps(data) if data else None
+    if raw == devis.mesures_json:
+        return False
+    devis.mesures_json = raw
+    return True
+
+
+def with_types(
+    mesures: List[MesureValeur],
+    types_by_id: Dict[int, models.MesureType],
+) -> List[MesureValeur]:
+    """Attach MesureType objects (labels) for display, e.g. in the BC PDF."""
+
+    return [
+        MesureValeur(mesure_type_id=m.mesure_type_id, valeur=m.valeur, type=types_by_id.get(m.mesure_type_id))
+        for m in mesures
+    ]
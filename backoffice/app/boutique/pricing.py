@@ -1,34 +1,102 @@
 from __future__ import annotations
 
-from typing import Dict
+from typing import Dict, Optional
 
 from .. import models
+from ..money import from_cents, to_cents
 from .constants import MARGE_BOUTIQUE, MARGE_CREATRICE, TVA_RATE
 
+PRIX_KEYS = (
+    "partenaire_ht",
+    "partenaire_tva",
+    "partenaire_ttc",
+    "client_ht",
+    "client_tva",
+    "client_ttc",
+)
 
-def compute_prix_boutique_et_client(devis: models.Devis) -> Dict[str, float]:
-    """Compute displayed prices from devis.prix_total (internal cost).
+
+def compute_prix(
+    prix_total: float,
+    marge_creatrice: float = MARGE_CREATRICE,
+    marge_boutique: float = MARGE_BOUTIQUE,
+    tva_rate: float = TVA_RATE,
+) -> Dict[str, float]:
+    """Compute displayed prices from an internal cost (devis.prix_total).
+
+    Each HT / TVA amount is rounded to the cent, and TTC = HT + TVA is an exact
+    integer sum, so stored amounts always add up.
 
     Returns:
         partenaire_ht / partenaire_tva / partenaire_ttc
         client_ht / client_tva / client_ttc
     """
 
-    base_ht = devis.prix_total * MARGE_CREATRICE
-
-    partenaire_ht = base_ht
-    partenaire_tva = partenaire_ht * TVA_RATE
+    partenaire_ht = to_cents((prix_total or 0.0) * marge_creatrice)
+    partenaire_tva = to_cents(from_cents(partenaire_ht) * tva_rate)
     partenaire_ttc = partenaire_ht + partenaire_tva
 
-    client_ht = partenaire_ht * MARGE_BOUTIQUE
-    client_tva = client_ht * TVA_RATE
+    client_ht = to_cents(from_cents(partenaire_ht) * marge_boutique)
+    client_tva = to_cents(from_cents(client_ht) * tva_rate)
     client_ttc = client_ht + client_tva
 
     return {
-        "partenaire_ht": partenaire_ht,
-        "partenaire_tva": partenaire_tva,
-        "partenaire_ttc": partenaire_ttc,
-        "client_ht": client_ht,
-        "client_tva": client_tva,
-        "client_ttc": client_ttc,
+        "partenaire_ht": from_cents(partenaire_ht),
+        "partenaire_tva": from_cents(partenaire_tva),
+        "partenaire_ttc": from_cents(partenaire_ttc),
+        "client_ht": from_cents(client_ht),
+        "client_tva": from_cents(client_tva),
+        "client_ttc": from_cents(client_ttc),
     }
+
+
+def stored_prix(devis: models.Devis) -> Optional[Dict[str, float]]:
+    """Prices persisted on the devis when prix_total was last set, or None (legacy row)."""
+
+    values = {k: getattr(devis, f"prix_{k}", None) for k in PRIX_KEYS}
+    if any(v is None for v in values.values()):
+        return None
+    return values
+
+
+def apply_prix_devis(devis: models.Devis) -> Dict[str, float]:
+    """Compute prices with the current MARGE_*/TVA_RATE and persist them on the devis.
+
+    Call whenever devis.prix_total is set. Historical devis keep the parameters
+    that were in force at that time, even if the env vars change later.
+    """
+
+    prix = compute_prix(devis.prix_total)
+    for k, v in prix.items():
+        setattr(devis, f"prix_{k}", v)
+    devis.marge_creatrice = MARGE_CREATRICE
+    devis.marge_boutique = MARGE_BOUTIQUE
+    devis.tva_rate = TVA_RATE
+    return prix
+
+
+def apply_prix_bon(bon: models.BonCommande, devis: models.Devis, has_tva: bool) -> Dict[str, float]:
+    """Copy the devis price breakdown (and its parameters) onto the bon de commande."""
+
+    prix = compute_prix_boutique_et_client(devis)
+    bon.montant_boutique_ht = prix["partenaire_ht"]
+    bon.montant_boutique_tva = prix["partenaire_tva"]
+    bon.montant_boutique_ttc = prix["partenaire_ttc"]
+    bon.montant_client_ht = prix["client_ht"]
+    bon.montant_client_tva = prix["client_tva"]
+    bon.montant_client_ttc = prix["client_ttc"]
+    bon.has_tva = has_tva
+    bon.marge_creatrice = devis.marge_creatrice if devis.marge_creatrice is not None else MARGE_CREATRICE
+    bon.marge_boutique = devis.marge_boutique if devis.marge_boutique is not None else MARGE_BOUTIQUE
+    bon.tva_rate = devis.tva_rate if devis.tva_rate is not None else TVA_RATE
+    return prix
+
+
+def compute_prix_boutique_et_client(devis: models.Devis) -> Dict[str, float]:
+    """Displayed prices of a devis.
+
+    Reads the persisted breakdown; only legacy rows that were never backfilled
+    (see scripts/backfill_prix.py) are computed on the fly.
+    """
+
+    return stored_prix(devis) or compute_prix(devis.prix_total)
@@ -70,6 +70,7 @@ class DevisPublic(BaseModel):
     statut: str
     type: str | None = None
     date_creation: Optional[str]
+    updated_at: Optional[str] = None
     prix_total: float
     prix_boutique: float
     prix_client_conseille_ttc: float
@@ -127,10 +128,27 @@ class BonCommandePublic(BaseModel):
     statut: str
     commentaire_admin: Optional[str] = None
     commentaire_boutique: Optional[str] = None
+    updated_at: Optional[datetime] = None
+    derniere_activite: Optional[datetime] = None
+    dernier_evenement: Optional[str] = None
+    nb_evenements: int = 0
 
     model_config = {"from_attributes": True}
 
 
+class ChangesPublic(BaseModel):
+    """Delta since a sync token (GET /api/boutique/changes)."""
+
+    devis: List[DevisPublic]
+    bons_commande: List[BonCommandePublic]
+    boutique: Optional[BoutiquePublic] = None
+    # Archived since the token (app.archive): to remove from the local lists
+    archived_devis: List[int] = []
+    archived_bons_commande: List[int] = []
+    next: str
+    has_more: bool = False
+
+
 class UpdateDevisMesuresPayload(BaseModel):
     mesures: List[MesureValeurPayload]
     commentaire_boutique: Optional[str] = None
@@ -0,0 +1,77 @@
+"""Diff-based synchronisation of a devis' lignes.
+
+Instead of "DELETE all + INSERT all" on every edit:
+- unchanged rows are left alone (no write at all);
+- changed rows get an UPDATE (the ORM batches same-column updates as executemany);
+- new rows are inserted in one multi-row INSERT ... RETURNING;
+- removed rows are deleted in one DELETE ... WHERE id IN (...).
+
+The relationship collection is then set as committed state, so the response can
+be built from memory (see get_db_no_expire) without reloading children.
+"""
+from __future__ import annotations
+
+from typing import Iterable, List
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .. import models
+from ..money import from_cents, round_eur, to_cents
+from .schemas import LigneDevisCreate
+
+
+def _bulk_insert(db: Session, model, rows: List[dict]) -> list:
+    if not rows:
+        return []
+    return list(db.scalars(insert(model).returning(model), rows).all())
+
+
+def _bulk_delete(db: Session, model, objs: List) -> None:
+    if not objs:
+        return
+    db.execute(
+        delete(model).where(model.id.in_([o.id for o in objs])),
+        execution_options={"synchronize_session": False},
+    )
+    for o in objs:
+        db.expunge(o)
+
+
+def sync_lignes(
+    db: Session,
+    devis: models.Devis,
+    lignes: Iterable[LigneDevisCreate],
+) -> float:
+    """Align devis.lignes with the payload (matched by position). Returns the new total."""
+
+    existing = sorted(devis.lignes, key=lambda l: l.id)
+    kept: List[models.LigneDevis] = []
+    to_insert: List[dict] = []
+    total_cents = 0
+
+    for i, ligne in enumerate(lignes):
+        values = {
+            "robe_modele_id": ligne.robe_modele_id,
+            "description": ligne.description or None,
+            "quantite": ligne.quantite,
+            "prix_unitaire": round_eur(ligne.prix_unitaire),
+        }
+        total_cents += ligne.quantite * to_cents(ligne.prix_unitaire)
+
+        if i < len(existing):
+            row = existing[i]
+            for field, value in values.items():
+                if getattr(row, field) != value:
+                    setattr(row, field, value)
+            kept.append(row)
+        else:
+            to_insert.append({"devis_id": devis.id, **values})
+
+    _bulk_delete(db, models.LigneDevis, existing[len(kept):])
+    created = _bulk_insert(db, models.LigneDevis, to_insert)
+
+    set_committed_value(devis, "lignes", kept + sorted(created, key=lambda l: l.id))
+    return from_cents(total_cents)
+
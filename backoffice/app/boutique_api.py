@@ -3,16 +3,23 @@ import json
 import secrets
 from typing import List, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 
 from . import models
-from .auth import get_password_hash, verify_password
-from .dependencies import get_db
+from .auth import get_password_hash, verify_and_update_password, verify_password
+from .dependencies import get_db, get_db_no_expire, get_read_db
+from .events import event_stream, latest_bc_event_id, publish_bc_event, publish_devis_statut
+from .http_cache import cache_headers, latest, make_etag, not_modified
+from .notifications import send_now
+from .rate_limit import get_login_limiter, login_keys
+from .money import from_cents, to_cents
+from .timeline import create_event, latest_events
 from .utils.pdf import generate_pdf_devis_bon
 from .utils.mailer import (
-    send_admin_bc_notification,
+    send_admin_email,
     send_boutique_password_email,
     send_password_reset_email,
 )
@@ -20,13 +27,23 @@ from .utils.mailer import (
 from .boutique.auth_tokens import create_token_for_boutique, get_current_boutique
 from .boutique.constants import TOKEN_MAX_AGE_SECONDS
 from .config import FRONT_BASE_URL, SECURE_COOKIES, COOKIE_SAME_SITE
-from .boutique.mappers import build_devis_public
-from .boutique.pricing import compute_prix_boutique_et_client
+from .boutique.loaders import (
+    get_bons_commande_version,
+    get_devis_for_boutique,
+    get_devis_version,
+    next_numero_boutique,
+)
+from .boutique.changes import DEFAULT_LIMIT, collect_changes
+from .boutique.mappers import build_bon_commande_public, build_devis_public
+from .boutique.pricing import apply_prix_bon, apply_prix_devis, compute_prix_boutique_et_client
+from .boutique.mesures import read_mesures, with_types, write_mesures
+from .boutique.sync import sync_lignes
 from .boutique.schemas import (
     BonCommandePublic,
     BoutiqueProfileUpdate,
     BoutiquePublic,
     ChangePasswordRequest,
+    ChangesPublic,
     DevisCreateRequest,
     DevisPublic,
     LoginRequest,
@@ -51,26 +68,44 @@ router = APIRouter(prefix="/api/boutique", tags=["Boutique API"])
 @router.post("/login", response_model=LoginResponse)
 def login_boutique(
     payload: LoginRequest,
+    request: Request,
     response: Response,
     db: Session = Depends(get_db),
 ):
+    # Refus immédiat (429) si l'IP ou l'email a trop d'échecs récents :
+    # aucune requête ni calcul pbkdf2 dans ce cas.
+    limiter = get_login_limiter()
+    keys = login_keys(request, payload.email)
+    limiter.check(keys)
+
     boutique = (
         db.query(models.Boutique)
         .filter(models.Boutique.email == payload.email)
         .first()
     )
     if not boutique:
+        limiter.record_failure(keys)
         raise HTTPException(status_code=400, detail="Email ou mot de passe incorrect")
 
     if not boutique.mot_de_passe_hash:
+        limiter.record_failure(keys)
         raise HTTPException(status_code=400, detail="Compte boutique sans mot de passe configuré")
 
-    if not verify_password(payload.password, boutique.mot_de_passe_hash):
+    valid, new_hash = verify_and_update_password(payload.password, boutique.mot_de_passe_hash)
+    if not valid:
+        limiter.record_failure(keys)
         raise HTTPException(status_code=400, detail="Email ou mot de passe incorrect")
 
+    limiter.record_success(keys)
+
     if boutique.statut == models.BoutiqueStatut.SUSPENDU:
         raise HTTPException(status_code=403, detail="Boutique suspendue")
 
+    if new_hash:
+        # Coût de hachage modifié (PASSWORD_HASH_ROUNDS) : re-hash transparent
+        boutique.mot_de_passe_hash = new_hash
+        db.commit()
+
     token = create_token_for_boutique(boutique)
     
     response.set_cookie(
@@ -220,7 +255,7 @@ def get_options(
 
 @router.get("/devis", response_model=List[DevisPublic])
 def list_devis(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     boutique: models.Boutique = Depends(get_current_boutique),
 ):
     devis_list = (
@@ -235,24 +270,35 @@ def list_devis(
 @router.get("/devis/{devis_id}", response_model=DevisPublic)
 def get_devis_detail(
     devis_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     boutique: models.Boutique = Depends(get_current_boutique),
 ):
-    d = (
-        db.query(models.Devis)
-        .filter(models.Devis.id == devis_id, models.Devis.boutique_id == boutique.id)
-        .first()
-    )
+    version = get_devis_version(db, devis_id, boutique.id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Devis introuvable")
+
+    # Le prix affiché dépend aussi de la boutique (TVA)
+    devis_updated_at = version[0]
+    etag = make_etag("devis", devis_id, devis_updated_at, boutique.updated_at)
+    last_modified = latest(devis_updated_at, boutique.updated_at)
+    cached = not_modified(request, etag, last_modified)
+    if cached is not None:
+        return cached
+
+    d = get_devis_for_boutique(db, devis_id, boutique.id, include_archived=True)
     if not d:
         raise HTTPException(status_code=404, detail="Devis introuvable")
 
+    response.headers.update(cache_headers(etag, last_modified))
     return build_devis_public(d, boutique, include_lignes=True)
 
 
 @router.post("/devis", response_model=DevisPublic)
 def create_devis(
     payload: DevisCreateRequest,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_no_expire),
     boutique: models.Boutique = Depends(get_current_boutique),
 ):
     if boutique.statut != models.BoutiqueStatut.ACTIF:
@@ -264,13 +310,7 @@ def create_devis(
     if not payload.lignes:
         raise HTTPException(status_code=400, detail="Le devis doit contenir au moins une ligne")
 
-    max_num = (
-        db.query(models.Devis.numero_boutique)
-        .filter(models.Devis.boutique_id == boutique.id)
-        .order_by(models.Devis.numero_boutique.desc())
-        .first()
-    )
-    next_num = (max_num[0] + 1) if max_num else 1
+    next_num = next_numero_boutique(db, boutique.id)
 
     devis_type = getattr(models, "DevisType", None)
     type_value = None
@@ -284,30 +324,20 @@ def create_devis(
         boutique_id=boutique.id,
         numero_boutique=next_num,
         statut=models.StatutDevis.EN_COURS,
-        prix_total=0.0,
+        prix_total=from_cents(sum(l.quantite * to_cents(l.prix_unitaire) for l in payload.lignes)),
         configuration_json=json.dumps(payload.configuration) if payload.configuration is not None else None,
         dentelle_id=payload.dentelle_id,
         type=type_value or getattr(models.DevisType, "ROBE", None),
+        lignes=[],
     )
+    apply_prix_devis(d)
 
     db.add(d)
     db.flush()
 
-    total = 0.0
-    for ligne in payload.lignes:
-        l = models.LigneDevis(
-            devis_id=d.id,
-            robe_modele_id=ligne.robe_modele_id,
-            description=ligne.description or None,
-            quantite=ligne.quantite,
-            prix_unitaire=ligne.prix_unitaire,
-        )
-        db.add(l)
-        total += ligne.quantite * ligne.prix_unitaire
-
-    d.prix_total = total
+    # Une seule requête INSERT multi-lignes ; la collection reste en mémoire après commit
+    sync_lignes(db, d, payload.lignes)
     db.commit()
-    db.refresh(d)
 
     return build_devis_public(d, boutique, include_lignes=True)
 
@@ -316,7 +346,7 @@ def create_devis(
 def update_devis(
     devis_id: int,
     payload: DevisCreateRequest,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_no_expire),
     boutique: models.Boutique = Depends(get_current_boutique),
 ):
     """
@@ -324,11 +354,7 @@ def update_devis(
     On n'autorise l'édition que si le devis appartient à la boutique
     et qu'il n'est pas REFUSE ou ACCEPTE.
     """
-    d = (
-        db.query(models.Devis)
-        .filter(models.Devis.id == devis_id, models.Devis.boutique_id == boutique.id)
-        .first()
-    )
+    d = get_devis_for_boutique(db, devis_id, boutique.id)
     if not d:
         raise HTTPException(status_code=404, detail="Devis introuvable")
 
@@ -347,24 +373,13 @@ def update_devis(
             pass
     d.dentelle_id = payload.dentelle_id
 
-    db.query(models.LigneDevis).filter(models.LigneDevis.devis_id == d.id).delete()
-
-    total = 0.0
-    for ligne in payload.lignes:
-        l = models.LigneDevis(
-            devis_id=d.id,
-            robe_modele_id=ligne.robe_modele_id,
-            description=ligne.description or None,
-            quantite=ligne.quantite,
-            prix_unitaire=ligne.prix_unitaire,
-        )
-        db.add(l)
-        total += ligne.quantite * ligne.prix_unitaire
-
-    d.prix_total = total
+    # Diff : seules les lignes modifiées / ajoutées / retirées sont écrites
+    d.prix_total = sync_lignes(db, d, payload.lignes)
+    apply_prix_devis(d)
     d.statut = models.StatutDevis.EN_COURS
+    # Une modification des seules lignes ne touche pas la ligne devis (onupdate)
+    d.updated_at = datetime.utcnow()
     db.commit()
-    db.refresh(d)
 
     return build_devis_public(d, boutique, include_lignes=True)
 
@@ -391,7 +406,7 @@ def update_devis_mesures(
     devis_id: int,
     payload: UpdateDevisMesuresPayload,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_no_expire),
     boutique: models.Boutique = Depends(get_current_boutique),
 ):
     """
@@ -405,11 +420,7 @@ def update_devis_mesures(
     - correction autorisée uniquement si un BC existe ET est en statut A_MODIFIER
     - ne crée jamais un BC "silencieusement"
     """
-    devis = (
-        db.query(models.Devis)
-        .filter(models.Devis.id == devis_id, models.Devis.boutique_id == boutique.id)
-        .first()
-    )
+    devis = get_devis_for_boutique(db, devis_id, boutique.id)
     if not devis:
         raise HTTPException(status_code=404, detail="Devis introuvable")
 
@@ -428,26 +439,9 @@ def update_devis_mesures(
                 detail="Ce bon de commande n'est pas en attente de correction.",
             )
 
-    devis.mesures.clear()
-    db.flush()
-
-    for m in payload.mesures:
-        dm = models.DevisMesure(
-            devis_id=devis.id,
-            mesure_type_id=m.mesure_type_id,
-            valeur=m.valeur,
-        )
-        db.add(dm)
-
-    prix = compute_prix_boutique_et_client(devis)
-    has_tva = bool(boutique.numero_tva)
-
-    montant_boutique_ht = prix["partenaire_ht"]
-    montant_boutique_ttc = prix["partenaire_ttc"]
+    write_mesures(devis, payload.mesures)
 
-    bon.montant_boutique_ht = montant_boutique_ht
-    bon.montant_boutique_ttc = montant_boutique_ttc
-    bon.has_tva = has_tva
+    apply_prix_bon(bon, devis, has_tva=bool(boutique.numero_tva))
 
     if hasattr(bon, "commentaire_boutique") and payload.commentaire_boutique is not None:
         bon.commentaire_boutique = payload.commentaire_boutique
@@ -455,31 +449,31 @@ def update_devis_mesures(
     if hasattr(models, "StatutBonCommande") and hasattr(bon, "statut"):
         bon.statut = models.StatutBonCommande.EN_ATTENTE_VALIDATION
 
+    ev = create_event(
+        db,
+        bon_commande_id=bon.id,
+        actor_type="BOUTIQUE",
+        actor_id=boutique.id,
+        event_type="BC_REVALIDE",
+        message=getattr(bon, "commentaire_boutique", None),
+    )
     db.commit()
-    db.refresh(devis)
+    publish_bc_event(bon, ev)
 
     # ---- MAIL ADMIN : BC revalidé ----
     try:
         ref = f"{boutique.nom}-{devis.numero_boutique}"
         comment = getattr(bon, "commentaire_boutique", None) or ""
 
-        subject = f"Bon de commande soumis — {ref}"
-        html = f"""
-        <p>La boutique <b>{boutique.nom}</b> a soumis / revalidé un bon de commande.</p>
-        <p><b>Référence :</b> {ref}</p>
-        <p><b>Commentaire boutique :</b></p>
-        <div style="white-space:pre-wrap;border:1px solid #eee;padding:12px;border-radius:8px;">
-            {comment or "—"}
-        </div>
-        """
-        text = f"BC soumis par {boutique.nom} ({ref})\nCommentaire boutique : {comment or '—'}"
-
-        background_tasks.add_task(
-            send_admin_bc_notification,
-            subject,
-            html,
-            text,
-        )
+        # Sinon : inclus dans le prochain récapitulatif (voir app.notifications)
+        if send_now(ev.event_type):
+            background_tasks.add_task(
+                send_admin_email,
+                "bc_soumis",
+                boutique_nom=boutique.nom,
+                ref=ref,
+                commentaire=comment,
+            )
 
     except Exception:
         pass
@@ -496,14 +490,10 @@ def update_devis_statut(
     devis_id: int,
     payload: UpdateDevisStatutPayload,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_no_expire),
     boutique: models.Boutique = Depends(get_current_boutique),
 ):
-    devis = (
-        db.query(models.Devis)
-        .filter(models.Devis.id == devis_id, models.Devis.boutique_id == boutique.id)
-        .first()
-    )
+    devis = get_devis_for_boutique(db, devis_id, boutique.id)
 
     if not devis:
         raise HTTPException(status_code=404, detail="Devis introuvable")
@@ -512,70 +502,48 @@ def update_devis_statut(
         if not payload.mesures or len(payload.mesures) == 0:
             raise HTTPException(status_code=400, detail="Les mesures sont obligatoires pour valider le devis.")
 
-        devis.mesures.clear()
-        db.flush()
-
-        for m in payload.mesures:
-            dm = models.DevisMesure(
-                devis_id=devis.id,
-                mesure_type_id=m.mesure_type_id,
-                valeur=m.valeur,
-            )
-            db.add(dm)
+        write_mesures(devis, payload.mesures)
 
         devis.statut = models.StatutDevis.ACCEPTE
 
-        prix = compute_prix_boutique_et_client(devis)
-        has_tva = bool(boutique.numero_tva)
-
-        montant_boutique_ht = prix["partenaire_ht"]
-        montant_boutique_ttc = prix["partenaire_ttc"]
-
         bon = db.query(models.BonCommande).filter(models.BonCommande.devis_id == devis.id).first()
         created = False
 
         if not bon:
-            bon = models.BonCommande(
-                devis_id=devis.id,
-                montant_boutique_ht=montant_boutique_ht,
-                montant_boutique_ttc=montant_boutique_ttc,
-                has_tva=has_tva,
-            )
+            bon = models.BonCommande(devis_id=devis.id)
             db.add(bon)
             created = True
-        else:
-            bon.montant_boutique_ht = montant_boutique_ht
-            bon.montant_boutique_ttc = montant_boutique_ttc
-            bon.has_tva = has_tva
+        apply_prix_bon(bon, devis, has_tva=bool(boutique.numero_tva))
 
         if hasattr(models, "StatutBonCommande") and hasattr(bon, "statut"):
             bon.statut = models.StatutBonCommande.EN_ATTENTE_VALIDATION
 
+        db.flush()
+        ev = create_event(
+            db,
+            bon_commande_id=bon.id,
+            actor_type="BOUTIQUE",
+            actor_id=boutique.id,
+            event_type="BC_SOUMIS" if created else "BC_REVALIDE",
+        )
         db.commit()
-        db.refresh(devis)
+        publish_devis_statut(devis)
+        publish_bc_event(bon, ev)
 
         # ---- MAIL ADMIN : BC soumis (première validation) ----
         try:
             ref = f"{boutique.nom}-{devis.numero_boutique}"
             comment = getattr(bon, "commentaire_boutique", None) or ""
 
-            subject = f"Bon de commande soumis — {ref}"
-            html = f"""
-            <p>La boutique <b>{boutique.nom}</b> a soumis / revalidé un bon de commande.</p>
-            <p><b>Référence :</b> {ref}</p>
-            <p><b>Commentaire boutique :</b></p>
-            <div style="white-space:pre-wrap;border:1px solid #eee;padding:12px;border-radius:8px;">
-                {comment or "—"}
-            </div>
-            """
-            text = f"BC soumis par {boutique.nom} ({ref})\nCommentaire boutique : {comment or '—'}"
-
-            background_tasks.add_task(
-                send_admin_bc_notification,
-                subject,
-                html,
-                text,
-            )
+            # Sinon : inclus dans le prochain récapitulatif (voir app.notifications)
+            if send_now(ev.event_type):
+                background_tasks.add_task(
+                    send_admin_email,
+                    "bc_soumis",
+                    boutique_nom=boutique.nom,
+                    ref=ref,
+                    commentaire=comment,
+                )
         except Exception:
             pass
 
@@ -584,92 +552,170 @@ def update_devis_statut(
     if payload.statut == "REFUSE":
         devis.statut = models.StatutDevis.REFUSE
         db.commit()
-        db.refresh(devis)
+        publish_devis_statut(devis)
         return build_devis_public(devis, boutique, include_lignes=True)
 
     devis.statut = models.StatutDevis.EN_COURS
     db.commit()
-    db.refresh(devis)
+    publish_devis_statut(devis)
     return build_devis_public(devis, boutique, include_lignes=True)
 
 
+# =========================
+# Synchronisation incrémentale
+# =========================
+
+@router.get("/changes", response_model=ChangesPublic)
+def list_changes(
+    since: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT,
+    db: Session = Depends(get_db),
+    boutique: models.Boutique = Depends(get_current_boutique),
+):
+    """
+    Devis et bons de commande modifiés depuis le jeton `since`
+    (sans `since` : tout, pour la synchronisation initiale).
+
+    Renvoyer `next` au prochain appel ; si `has_more`, rappeler immédiatement.
+    Les éléments peuvent réapparaître d'un appel à l'autre (upsert par id côté front).
+    `archived_devis` / `archived_bons_commande` : ids archivés depuis `since`, à retirer.
+    """
+    return collect_changes(db, boutique, since, limit)
+
+
+# =========================
+# Flux temps réel (SSE)
+# =========================
+
+@router.get("/events/stream")
+def stream_events(
+    request: Request,
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+    db: Session = Depends(get_db),
+    boutique: models.Boutique = Depends(get_current_boutique),
+):
+    """
+    Server-Sent Events : changements de statut des bons de commande et devis
+    de la boutique connectée (remplace le polling de /bons-commande).
+
+    - `id:` = id de bon_commande_events ; à la reconnexion, le navigateur renvoie
+      Last-Event-ID et les événements manqués sont rejoués
+    - `last_event_id` en query string accepté aussi (première connexion)
+    - commentaire `: heartbeat` toutes les SSE_HEARTBEAT_SECONDS
+    """
+    raw = last_event_id or request.query_params.get("last_event_id")
+    try:
+        last_id = int(raw) if raw else None
+    except ValueError:
+        last_id = None
+    if last_id is None:
+        # Nouvelle connexion : uniquement les événements à venir
+        last_id = latest_bc_event_id(db, boutique.id)
+
+    boutique_id = boutique.id
+    # La connexion SQL n'est pas gardée pendant toute la durée du flux
+    db.close()
+
+    return StreamingResponse(
+        event_stream(request, boutique_id, last_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 @router.get("/bons-commande", response_model=List[BonCommandePublic])
 def list_bons_commande(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     boutique: models.Boutique = Depends(get_current_boutique),
 ):
+    count, last_modified = get_bons_commande_version(db, boutique.id)
+    etag = make_etag("bons-commande", boutique.id, count, last_modified)
+    cached = not_modified(request, etag, last_modified)
+    if cached is not None:
+        return cached
+
     bons = (
         db.query(models.BonCommande)
         .join(models.Devis)
+        .options(contains_eager(models.BonCommande.devis))
         .filter(models.Devis.boutique_id == boutique.id)
         .order_by(models.BonCommande.date_creation.desc())
         .all()
     )
 
-    result: List[BonCommandePublic] = []
-    for bc in bons:
-        result.append(
-            BonCommandePublic(
-                id=bc.id,
-                devis_id=bc.devis_id,
-                numero_devis=bc.devis.numero_boutique,
-                date_creation=bc.date_creation,
-                montant_boutique_ht=bc.montant_boutique_ht,
-                montant_boutique_ttc=bc.montant_boutique_ttc,
-                has_tva=bc.has_tva,
-                statut=bc.statut.value if hasattr(bc.statut, "value") else str(bc.statut),
-                commentaire_admin=bc.commentaire_admin,
-                commentaire_boutique=getattr(bc, "commentaire_boutique", None),
-            )
-        )
-    return result
+    activity = latest_events(db, [bc.id for bc in bons])
+
+    response.headers.update(cache_headers(etag, last_modified))
+    return [build_bon_commande_public(bc, bc.devis.numero_boutique, activity.get(bc.id)) for bc in bons]
 
 
 @router.get("/devis/{devis_id}/pdf")
 def get_devis_pdf(
     devis_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     boutique: models.Boutique = Depends(get_current_boutique),
 ):
-    devis = (
-        db.query(models.Devis)
-        .filter(models.Devis.id == devis_id, models.Devis.boutique_id == boutique.id)
-        .first()
-    )
+    version = get_devis_version(db, devis_id, boutique.id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Devis introuvable")
+
+    etag = make_etag("devis-pdf", devis_id, version[0], boutique.updated_at)
+    last_modified = latest(version[0], boutique.updated_at)
+    cached = not_modified(request, etag, last_modified)
+    if cached is not None:
+        return cached
+
+    devis = get_devis_for_boutique(db, devis_id, boutique.id, include_archived=True)
     if not devis:
         raise HTTPException(status_code=404, detail="Devis introuvable")
 
-    lignes = db.query(models.LigneDevis).filter(models.LigneDevis.devis_id == devis.id).all()
+    lignes = list(devis.lignes)
     prix = compute_prix_boutique_et_client(devis)
 
-    return generate_pdf_devis_bon(
+    pdf = generate_pdf_devis_bon(
         devis=devis,
         boutique=boutique,
         prix=prix,
         lignes=lignes,
         type="devis",
     )
+    pdf.headers.update(cache_headers(etag, last_modified))
+    return pdf
 
 
 @router.get("/bons-commande/{devis_id}/pdf")
 def get_bon_commande_pdf(
     devis_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     boutique: models.Boutique = Depends(get_current_boutique),
 ):
-    devis = (
-        db.query(models.Devis)
-        .filter(models.Devis.id == devis_id, models.Devis.boutique_id == boutique.id)
-        .first()
-    )
+    version = get_devis_version(db, devis_id, boutique.id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Bon de commande introuvable")
+
+    etag = make_etag("bon-pdf", devis_id, version[0], version[1], boutique.updated_at)
+    last_modified = latest(version[0], version[1], boutique.updated_at)
+    cached = not_modified(request, etag, last_modified)
+    if cached is not None:
+        return cached
+
+    devis = get_devis_for_boutique(db, devis_id, boutique.id, include_archived=True)
     if not devis:
         raise HTTPException(status_code=404, detail="Bon de commande introuvable")
 
-    lignes = db.query(models.LigneDevis).filter(models.LigneDevis.devis_id == devis.id).all()
-    mesures = db.query(models.DevisMesure).filter(models.DevisMesure.devis_id == devis.id).all()
+    lignes = list(devis.lignes)
+    types_by_id = {t.id: t for t in db.query(models.MesureType).all()}
+    mesures = with_types(read_mesures(devis), types_by_id)
     prix = compute_prix_boutique_et_client(devis)
 
-    return generate_pdf_devis_bon(
+    pdf = generate_pdf_devis_bon(
         devis=devis,
         boutique=boutique,
         prix=prix,
@@ -677,6 +723,8 @@ def get_bon_commande_pdf(
         mesures=mesures,
         type="bon",
     )
+    pdf.headers.update(cache_headers(etag, last_modified))
+    return pdf
 
 
 # =========================
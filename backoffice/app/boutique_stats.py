@@ -0,0 +1,83 @@
+"""
+Compteurs par boutique (`boutique_stats`) pour la liste admin paginée / triable.
+
+SQLite : la ligne d'une boutique est recalculée par des triggers à chaque écriture
+sur ses devis et bons de commande (installés par la migration 006_boutique_stats).
+Le recalcul complet d'une seule boutique (agrégats sur l'index devis.boutique_id)
+reste exact même après des UPDATE en masse, sans compteurs incrémentaux à dériver.
+
+Les devis archivés (devis_archive, voir app.archive) restent comptés : l'archivage
+supprime des lignes de `devis`, le trigger de suppression relit les deux tables.
+
+Autres bases : pas de triggers ; la liste affiche les compteurs absents comme vides.
+"""
+from __future__ import annotations
+
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+_STATS_ROW = """
+SELECT b.id,
+       (SELECT count(*) FROM devis d WHERE d.boutique_id = b.id)
+         + (SELECT count(*) FROM devis_archive d WHERE d.boutique_id = b.id),
+       (SELECT count(*) FROM devis d WHERE d.boutique_id = b.id AND d.statut = 'ACCEPTE')
+         + (SELECT count(*) FROM devis_archive d WHERE d.boutique_id = b.id AND d.statut = 'ACCEPTE'),
+       (SELECT COALESCE(sum(d.prix_total), 0) FROM devis d WHERE d.boutique_id = b.id)
+         + (SELECT COALESCE(sum(d.prix_total), 0) FROM devis_archive d WHERE d.boutique_id = b.id),
+       (SELECT count(*) FROM bons_commandes bc JOIN devis d ON d.id = bc.devis_id
+         WHERE d.boutique_id = b.id AND bc.statut = 'EN_ATTENTE_VALIDATION'),
+       NULLIF(max(
+         COALESCE((SELECT max(d.updated_at) FROM devis d WHERE d.boutique_id = b.id), ''),
+         COALESCE((SELECT max(d.updated_at) FROM devis_archive d WHERE d.boutique_id = b.id), ''),
+         COALESCE((SELECT max(bc.updated_at) FROM bons_commandes bc JOIN devis d ON d.id = bc.devis_id
+                   WHERE d.boutique_id = b.id), '')
+       ), '')
+FROM boutiques b
+"""
+
+_REPLACE = (
+    "INSERT OR REPLACE INTO boutique_stats "
+    "(boutique_id, nb_devis, nb_acceptes, ca, nb_bc_en_attente, derniere_activite) "
+)
+
+
+def _refresh(boutique_id: str) -> str:
+    return f"{_REPLACE}{_STATS_ROW} WHERE b.id = {boutique_id};"
+
+
+def _refresh_for_devis(devis_id: str) -> str:
+    return _refresh(f"(SELECT boutique_id FROM devis WHERE id = {devis_id})")
+
+
+# (nom, table, événement, corps)
+_TRIGGERS: List[Tuple[str, str, str, str]] = [
+    ("boutiques_ai", "boutiques", "AFTER INSERT", _refresh("NEW.id")),
+    ("devis_ai", "devis", "AFTER INSERT", _refresh("NEW.boutique_id")),
+    (
+        "devis_au",
+        "devis",
+        "AFTER UPDATE OF statut, prix_total, updated_at, boutique_id",
+        _refresh("OLD.boutique_id") + "\n" + _refresh("NEW.boutique_id"),
+    ),
+    ("devis_ad", "devis", "AFTER DELETE", _refresh("OLD.boutique_id")),
+    ("bc_ai", "bons_commandes", "AFTER INSERT", _refresh_for_devis("NEW.devis_id")),
+    ("bc_au", "bons_commandes", "AFTER UPDATE OF statut, updated_at", _refresh_for_devis("NEW.devis_id")),
+    ("bc_ad", "bons_commandes", "AFTER DELETE", _refresh_for_devis("OLD.devis_id")),
+]
+
+
+def install_boutique_stats(conn: Connection) -> None:
+    """Triggers (SQLite uniquement) puis calcul initial de toutes les boutiques."""
+    if conn.dialect.name != "sqlite":
+        return
+    for name, table, event, body in _TRIGGERS:
+        conn.execute(text(f"DROP TRIGGER IF EXISTS trg_stats_{name}"))
+        conn.exec_driver_sql(f"CREATE TRIGGER trg_stats_{name} {event} ON {table} BEGIN\n{body}\nEND")
+    rebuild_boutique_stats(conn)
+
+
+def rebuild_boutique_stats(conn: Connection) -> None:
+    conn.execute(text("DELETE FROM boutique_stats"))
+    conn.execute(text(_REPLACE + _STATS_ROW))
@@ -29,3 +29,111 @@ BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
 # Email admin pour recevoir les notifications (doit être configuré en production)
 # Définir ADMIN_EMAIL=cellierconstance@gmail.com en production
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "")
+
+# Hachage des mots de passe (pbkdf2_sha256)
+# - PASSWORD_HASH_ROUNDS : coût ; un changement déclenche un re-hash transparent au login
+# - PASSWORD_HASH_WORKERS : threads dédiés au hachage
+# - PASSWORD_HASH_MAX_PENDING : file d'attente max avant de répondre 503 (protège le reste de l'API)
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+
+# Limitation des tentatives de login (fenêtre glissante, clés IP + email)
+# - LOGIN_RATE_LIMIT_BACKEND : "memory" (par worker) ou "db" (table partagée entre workers)
+LOGIN_RATE_LIMIT_BACKEND = os.getenv("LOGIN_RATE_LIMIT_BACKEND", "memory").lower()
+LOGIN_RATE_LIMIT_WINDOW_SECONDS = int(os.getenv("LOGIN_RATE_LIMIT_WINDOW_SECONDS", "900"))
+LOGIN_MAX_FAILURES_PER_EMAIL = int(os.getenv("LOGIN_MAX_FAILURES_PER_EMAIL", "5"))
+LOGIN_MAX_FAILURES_PER_IP = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", "20"))
+LOGIN_RATE_LIMIT_MAX_KEYS = int(os.getenv("LOGIN_RATE_LIMIT_MAX_KEYS", "10000"))
+# Derrière un reverse proxy de confiance uniquement : utiliser X-Forwarded-For
+# - TRUSTED_PROXY_HOPS : nombre de proxies de confiance devant l'application ; l'IP client
+#   est la N-ième entrée en partant de la droite (celles de gauche sont fournies par le client)
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "false").lower() == "true"
+TRUSTED_PROXY_HOPS = max(1, int(os.getenv("TRUSTED_PROXY_HOPS", "1")))
+
+# Sessions admin
+# - ADMIN_SESSION_BACKEND : "cookie" (cookie signé, défaut), "memory" ou "db" (stockage serveur)
+# - ADMIN_IDENTITY_CACHE_TTL_SECONDS : cache par process de l'admin connecté (0 = désactivé)
+ADMIN_SESSION_BACKEND = os.getenv("ADMIN_SESSION_BACKEND", "cookie").lower()
+ADMIN_SESSION_MAX_AGE_SECONDS = int(os.getenv("ADMIN_SESSION_MAX_AGE_SECONDS", str(14 * 24 * 60 * 60)))
+ADMIN_IDENTITY_CACHE_TTL_SECONDS = int(os.getenv("ADMIN_IDENTITY_CACHE_TTL_SECONDS", "60"))
+
+# Templates Jinja (admin)
+# Cache de bytecode partagé entre workers ; auto_reload désactivé en production
+TEMPLATE_BYTECODE_CACHE_DIR = os.getenv("TEMPLATE_BYTECODE_CACHE_DIR", "")
+TEMPLATE_AUTO_RELOAD = os.getenv("TEMPLATE_AUTO_RELOAD", "false" if IS_PRODUCTION else "true").lower() == "true"
+
+# Flux SSE boutique (/api/boutique/events/stream)
+# - SSE_HEARTBEAT_SECONDS : commentaire keep-alive + rattrapage en base entre workers
+# - SSE_QUEUE_SIZE : événements en attente max par connexion (au-delà : rattrapage en base)
+# - SSE_REPLAY_LIMIT : événements relus max par rattrapage (Last-Event-ID)
+SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+SSE_REPLAY_LIMIT = int(os.getenv("SSE_REPLAY_LIMIT", "100"))
+
+# Notifications email des bons de commande
+# - NOTIFICATION_DIGEST_WINDOW_SECONDS : regroupe les notifications par destinataire sur
+#   cette fenêtre (un seul email récapitulatif) ; 0 = envoi immédiat (comportement historique)
+# - NOTIFICATION_URGENT_TYPES : types d'événements toujours envoyés immédiatement
+NOTIFICATION_DIGEST_WINDOW_SECONDS = int(os.getenv("NOTIFICATION_DIGEST_WINDOW_SECONDS", "0"))
+NOTIFICATION_URGENT_TYPES = frozenset(
+    t.strip()
+    for t in os.getenv("NOTIFICATION_URGENT_TYPES", "BC_RENVOYE,BC_REFUSE").split(",")
+    if t.strip()
+)
+
+# Envoi des emails (SMTP)
+# - MAIL_SEND_WORKERS / MAIL_MAX_PENDING : threads dédiés à SMTP et file max ; les handlers
+#   n'attendent plus le serveur SMTP (au-delà de la file : stockage pour renvoi)
+# - MAIL_SMTP_TIMEOUT_SECONDS : timeout de connexion / d'échange SMTP
+# - MAIL_CIRCUIT_FAILURE_THRESHOLD : échecs consécutifs avant ouverture du disjoncteur ;
+#   ouvert, les emails vont directement en table mail_outbox (pas de tentative SMTP)
+# - MAIL_CIRCUIT_RESET_SECONDS : délai avant un envoi d'essai (disjoncteur semi-ouvert)
+# - MAIL_RETRY_INTERVAL_SECONDS / MAIL_MAX_ATTEMPTS : renvoi périodique de mail_outbox
+# - MAIL_OUTBOX_RETENTION_DAYS : lignes abandonnées supprimées après N jours (0 = conservées)
+MAIL_SEND_WORKERS = int(os.getenv("MAIL_SEND_WORKERS", "2"))
+MAIL_MAX_PENDING = int(os.getenv("MAIL_MAX_PENDING", "100"))
+MAIL_SMTP_TIMEOUT_SECONDS = float(os.getenv("MAIL_SMTP_TIMEOUT_SECONDS", "15"))
+MAIL_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("MAIL_CIRCUIT_FAILURE_THRESHOLD", "3"))
+MAIL_CIRCUIT_RESET_SECONDS = int(os.getenv("MAIL_CIRCUIT_RESET_SECONDS", "60"))
+MAIL_RETRY_INTERVAL_SECONDS = int(os.getenv("MAIL_RETRY_INTERVAL_SECONDS", "30"))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "8"))
+MAIL_OUTBOX_RETENTION_DAYS = int(os.getenv("MAIL_OUTBOX_RETENTION_DAYS", "30"))
+
+# Statistiques de conversion (entonnoir devis -> BC validé, table funnel_snapshots)
+# - ANALYTICS_REFRESH_SECONDS : intervalle de recalcul par la tâche de fond ; 0 = désactivé
+ANALYTICS_REFRESH_SECONDS = int(os.getenv("ANALYTICS_REFRESH_SECONDS", "900"))
+
+# Archivage des devis clos (tables *_archive, voir app.archive)
+# - ARCHIVE_AFTER_DAYS : âge minimal (dernière modification) d'un devis refusé ou d'un BC
+#   validé / refusé avant archivage ; 0 = archivage désactivé
+# - ARCHIVE_INTERVAL_SECONDS : intervalle entre deux passages de la tâche de fond
+# - ARCHIVE_BATCH_SIZE : devis déplacés par transaction
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "0"))
+ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ARCHIVE_INTERVAL_SECONDS", "86400"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+
+# Attente max d'un verrou SQLite avant "database is locked" (toutes les connexions).
+# La synchro boutique relit au moins cette durée (app/boutique/changes.py, SYNC_OVERLAP).
+SQLITE_BUSY_TIMEOUT_SECONDS = int(os.getenv("SQLITE_BUSY_TIMEOUT_SECONDS", "30"))
+
+# Connexions SQLite en lecture seule (moteur read_engine, Depends(get_read_db))
+# - SQLITE_READ_POOL_SIZE : connexions gardées ouvertes (autant en débordement)
+# - SQLITE_READ_CACHE_SIZE_KB : cache de pages par connexion (PRAGMA cache_size)
+# - SQLITE_READ_MMAP_SIZE : octets lus par mmap (PRAGMA mmap_size) ; 0 = désactivé
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+SQLITE_READ_CACHE_SIZE_KB = int(os.getenv("SQLITE_READ_CACHE_SIZE_KB", "65536"))
+SQLITE_READ_MMAP_SIZE = int(os.getenv("SQLITE_READ_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# Sauvegardes à chaud de la base SQLite (voir app.backup, scripts/backup.py)
+# - BACKUP_INTERVAL_SECONDS : intervalle entre deux sauvegardes de la tâche de fond ; 0 = désactivé
+# - BACKUP_DIR : dossier des sauvegardes (défaut : backups/ à côté de la base)
+# - BACKUP_RETENTION : nombre de sauvegardes conservées (0 = toutes)
+# - BACKUP_PAGES_PER_STEP / BACKUP_STEP_SLEEP_MS : taille des lots copiés et pause entre deux lots
+# - BACKUP_MAX_RESTARTS : reprises tolérées (base modifiée pendant la copie) avant une copie d'un seul lot
+BACKUP_INTERVAL_SECONDS = int(os.getenv("BACKUP_INTERVAL_SECONDS", "0"))
+BACKUP_DIR = os.getenv("BACKUP_DIR", "")
+BACKUP_RETENTION = int(os.getenv("BACKUP_RETENTION", "14"))
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+BACKUP_STEP_SLEEP_MS = int(os.getenv("BACKUP_STEP_SLEEP_MS", "20"))
+BACKUP_MAX_RESTARTS = int(os.getenv("BACKUP_MAX_RESTARTS", "3"))
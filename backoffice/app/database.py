@@ -1,13 +1,22 @@
 import os
 from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from .config import (
+    SQLITE_BUSY_TIMEOUT_SECONDS,
+    SQLITE_READ_CACHE_SIZE_KB,
+    SQLITE_READ_MMAP_SIZE,
+    SQLITE_READ_POOL_SIZE,
+)
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./robes_demi_mesure.db")
 
 connect_args = {}
 if DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False, "timeout": 30}
+    connect_args = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_SECONDS}
 
+# Moteur d'écriture : tout ce qui modifie la base (et les lectures sans Depends(get_read_db))
 engine = create_engine(
     DATABASE_URL,
     connect_args=connect_args,
@@ -24,8 +33,54 @@ if DATABASE_URL.startswith("sqlite"):
         finally:
             cursor.close()
 
+
+def _sqlite_read_url(url: str):
+    """URL SQLite en lecture seule (mode=ro), ou None pour une base en mémoire."""
+    parsed = make_url(url)
+    if not parsed.database or parsed.database == ":memory:":
+        return None
+    return parsed.set(database=f"file:{parsed.database}", query={"mode": "ro", "uri": "true"})
+
+
+# Moteur de lecture (SQLite) : pool de connexions `mode=ro` pour les longues lectures
+# (exports en streaming, agrégats du dashboard). En WAL, un lecteur travaille sur un
+# instantané et ne bloque jamais l'écrivain ; les transactions de lecture n'occupent
+# plus les connexions du moteur d'écriture. Autres bases : même moteur que l'écriture.
+read_engine = engine
+_read_url = _sqlite_read_url(DATABASE_URL) if DATABASE_URL.startswith("sqlite") else None
+if _read_url is not None:
+    read_engine = create_engine(
+        _read_url,
+        connect_args=connect_args,
+        pool_size=SQLITE_READ_POOL_SIZE,
+        max_overflow=SQLITE_READ_POOL_SIZE,
+    )
+
+    @event.listens_for(read_engine, "connect")
+    def _set_sqlite_read_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA query_only=ON;")
+            cursor.execute(f"PRAGMA cache_size=-{SQLITE_READ_CACHE_SIZE_KB};")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_READ_MMAP_SIZE};")
+            cursor.execute("PRAGMA temp_store=MEMORY;")
+        finally:
+            cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Variante pour les endpoints "écrire puis répondre" : les objets restent chargés
+# après commit, la réponse est construite depuis l'état en mémoire (pas de reload).
+SessionNoExpire = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=engine,
+)
+
+# Sessions en lecture seule (Depends(get_read_db)) : toute écriture échoue
+SessionRead = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
 
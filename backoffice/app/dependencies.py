@@ -10,7 +10,7 @@ from typing import Generator
 
 from sqlalchemy.orm import Session
 
-from .database import SessionLocal
+from .database import SessionLocal, SessionNoExpire, SessionRead
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -21,3 +21,32 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+def get_db_no_expire() -> Generator[Session, None, None]:
+    """Session with expire_on_commit=False, for write-then-read endpoints.
+
+    Objects keep their loaded state after ``commit()``, so the response can be
+    built without ``refresh()`` or lazy reloads of relationships.
+    """
+
+    db = SessionNoExpire()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db() -> Generator[Session, None, None]:
+    """Read-only session for GET pages and exports.
+
+    Under SQLite it uses the ``mode=ro`` reader pool: long read transactions
+    (streamed CSV exports, dashboard aggregates) never hold a writer
+    connection. Any write through this session fails.
+    """
+
+    db = SessionRead()
+    try:
+        yield db
+    finally:
+        db.close()
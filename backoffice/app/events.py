@@ -0,0 +1,238 @@
+"""
+Diffusion des changements de statut (BC / devis) vers les boutiques connectées (SSE).
+
+- `broker` : pub/sub en mémoire, par process. Les handlers publient après commit
+  (`publish_bc_event`, `publish_devis_statut`), chaque flux SSE ouvert par une
+  boutique reçoit les événements qui la concernent.
+- Les événements de bon de commande ont pour id celui de `bon_commande_events` :
+  à la reconnexion (`Last-Event-ID`), les événements manqués sont relus en base.
+- Plusieurs workers : un événement publié par un autre process n'arrive pas par le
+  broker ; il est rattrapé depuis `bon_commande_events` à chaque heartbeat.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from sqlalchemy import func
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from . import models
+from .config import SSE_HEARTBEAT_SECONDS, SSE_QUEUE_SIZE, SSE_REPLAY_LIMIT
+from .database import SessionLocal
+from .timeline_models import BonCommandeEvent
+
+
+class _Subscriber:
+    __slots__ = ("boutique_id", "queue", "loop")
+
+    def __init__(self, boutique_id: int, loop: asyncio.AbstractEventLoop) -> None:
+        self.boutique_id = boutique_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+        self.loop = loop
+
+
+class EventBroker:
+    def __init__(self) -> None:
+        self._subscribers: Dict[int, Set[_Subscriber]] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, boutique_id: int) -> _Subscriber:
+        sub = _Subscriber(boutique_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(boutique_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: _Subscriber) -> None:
+        with self._lock:
+            subs = self._subscribers.get(sub.boutique_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.boutique_id]
+
+    def publish(self, boutique_id: int, event: Dict[str, Any]) -> None:
+        """Thread-safe : appelable depuis un handler sync (threadpool)."""
+        with self._lock:
+            subs = list(self._subscribers.get(boutique_id, ()))
+        self.published += 1
+        for sub in subs:
+            sub.loop.call_soon_threadsafe(self._deliver, sub, event)
+
+    def _deliver(self, sub: _Subscriber, event: Dict[str, Any]) -> None:
+        try:
+            sub.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Client trop lent : l'événement sera rattrapé en base (bon_commande_events)
+            self.dropped += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            connections = sum(len(s) for s in self._subscribers.values())
+            boutiques = len(self._subscribers)
+        return {
+            "connections": connections,
+            "boutiques": boutiques,
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+broker = EventBroker()
+
+
+def _statut(value) -> Optional[str]:
+    if value is None:
+        return None
+    return value.value if hasattr(value, "value") else str(value)
+
+
+def _bc_payload(
+    ev: BonCommandeEvent,
+    bon_statut,
+    devis_id: int,
+    numero_devis: int,
+) -> Dict[str, Any]:
+    return {
+        "id": ev.id,
+        "type": "bon_commande",
+        "bon_commande_id": ev.bon_commande_id,
+        "devis_id": devis_id,
+        "numero_devis": numero_devis,
+        "statut": _statut(bon_statut),
+        "event_type": ev.event_type,
+        "actor_type": ev.actor_type,
+        "message": ev.message,
+        "created_at": ev.created_at.isoformat() if ev.created_at else None,
+    }
+
+
+def publish_bc_event(bon: models.BonCommande, ev: Optional[BonCommandeEvent]) -> None:
+    """À appeler après le commit qui a enregistré `ev`."""
+    if ev is None or ev.id is None:
+        return
+    devis = bon.devis
+    broker.publish(devis.boutique_id, _bc_payload(ev, bon.statut, devis.id, devis.numero_boutique))
+
+
+def publish_bc_event_for(
+    boutique_id: int,
+    ev: BonCommandeEvent,
+    bon_statut,
+    devis_id: int,
+    numero_devis: int,
+) -> None:
+    """Variante sans objet BonCommande chargé (traitements en masse)."""
+    broker.publish(boutique_id, _bc_payload(ev, bon_statut, devis_id, numero_devis))
+
+
+def publish_devis_statut(devis: models.Devis) -> None:
+    """Changement de statut d'un devis (sans historique : non rejouable)."""
+    broker.publish(
+        devis.boutique_id,
+        {
+            "id": None,
+            "type": "devis",
+            "devis_id": devis.id,
+            "numero_devis": devis.numero_boutique,
+            "statut": _statut(devis.statut),
+        },
+    )
+
+
+def load_bc_events_since(db, boutique_id: int, last_id: int, limit: int = SSE_REPLAY_LIMIT) -> List[Dict[str, Any]]:
+    rows = (
+        db.query(
+            BonCommandeEvent,
+            models.BonCommande.statut,
+            models.Devis.id,
+            models.Devis.numero_boutique,
+        )
+        .join(models.BonCommande, BonCommandeEvent.bon_commande_id == models.BonCommande.id)
+        .join(models.Devis, models.BonCommande.devis_id == models.Devis.id)
+        .filter(models.Devis.boutique_id == boutique_id, BonCommandeEvent.id > last_id)
+        .order_by(BonCommandeEvent.id.asc())
+        .limit(limit)
+        .all()
+    )
+    return [_bc_payload(ev, statut, devis_id, numero) for ev, statut, devis_id, numero in rows]
+
+
+def _replay(boutique_id: int, last_id: int) -> List[Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        return load_bc_events_since(db, boutique_id, last_id)
+    finally:
+        db.close()
+
+
+def latest_bc_event_id(db, boutique_id: int) -> int:
+    value = (
+        db.query(func.max(BonCommandeEvent.id))
+        .join(models.BonCommande, BonCommandeEvent.bon_commande_id == models.BonCommande.id)
+        .join(models.Devis, models.BonCommande.devis_id == models.Devis.id)
+        .filter(models.Devis.boutique_id == boutique_id)
+        .scalar()
+    )
+    return value or 0
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    lines = []
+    if event.get("id") is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def event_stream(request: Request, boutique_id: int, last_id: int) -> AsyncIterator[str]:
+    """Flux SSE d'une boutique : rattrapage depuis last_id, puis direct + heartbeat."""
+    sub = broker.subscribe(boutique_id)
+    sent: deque = deque(maxlen=SSE_QUEUE_SIZE)
+    cursor = last_id
+
+    def fresh(event: Dict[str, Any]) -> bool:
+        event_id = event.get("id")
+        if event_id is None:
+            return True
+        if event_id in sent:
+            return False
+        sent.append(event_id)
+        return True
+
+    try:
+        # Délai de reconnexion suggéré au navigateur (ms)
+        yield "retry: 5000\n\n"
+
+        for event in await run_in_threadpool(_replay, boutique_id, cursor):
+            cursor = max(cursor, event["id"])
+            if fresh(event):
+                yield format_sse(event)
+
+        while True:
+            try:
+                event = await asyncio.wait_for(sub.queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                # Rattrapage des événements publiés par d'autres workers
+                for missed in await run_in_threadpool(_replay, boutique_id, cursor):
+                    cursor = max(cursor, missed["id"])
+                    if fresh(missed):
+                        yield format_sse(missed)
+                yield ": heartbeat\n\n"
+                continue
+
+            # Le curseur n'avance qu'avec la base : un événement d'id inférieur encore
+            # en cours de commit ailleurs sera relu au prochain rattrapage
+            if fresh(event):
+                yield format_sse(event)
+    finally:
+        broker.unsubscribe(sub)
@@ -0,0 +1,88 @@
+"""
+Requêtes conditionnelles HTTP (ETag / Last-Modified -> 304).
+
+Principe pour un endpoint de lecture :
+1. lecture d'une "version" peu coûteuse (updated_at, une seule colonne) ;
+2. si le client a déjà cette version (If-None-Match / If-Modified-Since) : 304 sans
+   requête complète, sans sérialisation ni génération de PDF ;
+3. sinon réponse normale, avec ETag / Last-Modified / Cache-Control: private.
+
+`private, no-cache` : le navigateur garde la réponse mais la revalide à chaque
+affichage (données métier : jamais servies périmées, jamais mises en cache partagé).
+"""
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+CACHE_CONTROL = "private, no-cache"
+
+# À incrémenter si le format d'une réponse change (invalide les ETags existants)
+ETAG_VERSION = "1"
+
+
+def make_etag(*parts) -> str:
+    raw = "|".join([ETAG_VERSION] + ["" if p is None else str(p) for p in parts])
+    return 'W/"' + hashlib.sha1(raw.encode()).hexdigest()[:20] + '"'
+
+
+def latest(*values: Optional[datetime]) -> Optional[datetime]:
+    present = [v for v in values if v is not None]
+    return max(present) if present else None
+
+
+def _http_date(dt: datetime) -> str:
+    # updated_at est en UTC naïf
+    return format_datetime(dt.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+    return headers
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Comparaison faible : W/"x" == "x"
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def not_modified(
+    request: Request,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+) -> Optional[Response]:
+    """Réponse 304 si le client est à jour, sinon None."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        if not if_modified_since or last_modified is None:
+            return None
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        fresh = last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+    if not fresh:
+        return None
+    return Response(status_code=304, headers=cache_headers(etag, last_modified))
@@ -0,0 +1,470 @@
+"""
+Envoi SMTP hors des threads de requête, avec disjoncteur et file de renvoi.
+
+Avant : chaque `_send` ouvrait une connexion SMTP dans un thread BackgroundTasks
+(pool partagé avec les handlers sync) ; SMTP en panne = jusqu'à 15 s bloquées par
+email, et une rafale d'échecs occupait tout le pool.
+
+Ici :
+- `submit` rend la main tout de suite : l'envoi tourne dans un ThreadPoolExecutor
+  dédié (MAIL_SEND_WORKERS), borné (MAIL_MAX_PENDING) ;
+- disjoncteur : après MAIL_CIRCUIT_FAILURE_THRESHOLD échecs consécutifs il s'ouvre ;
+  les emails partent alors directement dans `mail_outbox`, sans tentative SMTP.
+  Après MAIL_CIRCUIT_RESET_SECONDS, un seul envoi d'essai (semi-ouvert) décide de
+  la fermeture ou d'une nouvelle ouverture ;
+- `retry_due` (tâche de fond, lifespan) renvoie les emails de `mail_outbox`, avec
+  un délai croissant, jusqu'à MAIL_MAX_ATTEMPTS.
+
+`mail_outbox` ne contient jamais le message rendu : seulement le template et son
+contexte (JSON), re-rendus au renvoi. Les templates porteurs d'identifiants
+(SECRET_TEMPLATES : mot de passe provisoire, lien de réinitialisation) n'y laissent
+qu'une trace sans contexte, jamais renvoyée. Les lignes abandonnées sont supprimées
+après MAIL_OUTBOX_RETENTION_DAYS.
+
+Plusieurs workers : chaque process a son disjoncteur ; une ligne de `mail_outbox`
+est réservée par UPDATE conditionnel avant renvoi (un seul worker l'envoie).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from starlette.concurrency import run_in_threadpool
+
+from . import models
+from .config import (
+    MAIL_CIRCUIT_FAILURE_THRESHOLD,
+    MAIL_CIRCUIT_RESET_SECONDS,
+    MAIL_MAX_ATTEMPTS,
+    MAIL_MAX_PENDING,
+    MAIL_OUTBOX_RETENTION_DAYS,
+    MAIL_RETRY_INTERVAL_SECONDS,
+    MAIL_SEND_WORKERS,
+    MAIL_SMTP_TIMEOUT_SECONDS,
+)
+from .database import SessionLocal
+from .mail_templates import SECRET_TEMPLATES
+
+RETRY_BATCH_SIZE = 50
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_DELAY = timedelta(hours=1)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.opened_count = 0
+
+    def _reset_elapsed(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.reset_seconds
+
+    @property
+    def closed(self) -> bool:
+        with self._lock:
+            return self._state == self.CLOSED
+
+    def ready(self) -> bool:
+        """Un envoi serait-il tenté ? (sans réserver l'essai semi-ouvert)"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            return not self._trial_running and self._reset_elapsed()
+
+    def allow(self) -> bool:
+        """Autorise un envoi ; en semi-ouvert, un seul à la fois (l'essai)."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._trial_running or not self._reset_elapsed():
+                return False
+            self._state = self.HALF_OPEN
+            self._trial_running = True
+            return True
+
+    def cancel_trial(self) -> None:
+        """Essai réservé par `allow` mais jamais tenté."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.opened_count += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "opened_count": self.opened_count,
+                "failure_threshold": self.failure_threshold,
+                "reset_seconds": self.reset_seconds,
+            }
+
+
+# (destinataire, template, contexte, Message-ID ou None) -> message prêt à envoyer
+BuildMessage = Callable[[str, str, Dict[str, Any], Optional[str]], EmailMessage]
+
+
+@dataclass(frozen=True)
+class Mail:
+    """Un email : de quoi le re-rendre (template + contexte) et le message rendu."""
+
+    template: str
+    context: Dict[str, Any]
+    message: EmailMessage
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return min(timedelta(seconds=RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1)), RETRY_MAX_DELAY)
+
+
+class MailSender:
+    def __init__(
+        self,
+        deliver: Callable[[EmailMessage, float], None],
+        build: BuildMessage,
+        max_workers: int,
+        max_pending: int,
+        breaker: CircuitBreaker,
+    ) -> None:
+        self._deliver = deliver
+        self._build = build
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self.breaker = breaker
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[Future, Tuple[Mail, Optional[int]]] = {}
+        self._stats = {
+            "submitted": 0,
+            "sent": 0,
+            "failed": 0,
+            "short_circuited": 0,
+            "overflow": 0,
+            "retried": 0,
+            "abandoned": 0,
+            "not_stored": 0,
+            "purged": 0,
+            "in_flight": 0,
+        }
+
+    def _incr(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="mail")
+            return self._executor
+
+    # --- Envoi
+
+    def submit(self, to_email: str, template: str, context: Dict[str, Any]) -> None:
+        """Rendu puis envoi en arrière-plan, ou stockage pour renvoi. Non bloquant."""
+        self._incr("submitted")
+        mail = Mail(template, context, self._build(to_email, template, context, None))
+        if not self._slots.acquire(blocking=False):
+            self._incr("overflow")
+            self._store(mail, None, "file d'envoi pleine", attempted=False)
+            return
+        if not self.breaker.allow():
+            self._slots.release()
+            self._incr("short_circuited")
+            self._store(mail, None, "disjoncteur SMTP ouvert", attempted=False)
+            return
+        self._dispatch(mail, None)
+
+    def _dispatch(self, mail: Mail, outbox_id: Optional[int]) -> None:
+        """Slot et autorisation du disjoncteur déjà acquis."""
+        with self._lock:
+            self._stats["in_flight"] += 1
+        try:
+            future = self._get_executor().submit(self._job, mail, outbox_id)
+        except RuntimeError:
+            # Arrêt en cours : l'email sera renvoyé au prochain démarrage
+            self._finish()
+            self.breaker.cancel_trial()
+            self._store(mail, outbox_id, "arrêt du serveur", attempted=False)
+            return
+        with self._lock:
+            if not future.done():
+                self._pending[future] = (mail, outbox_id)
+        future.add_done_callback(self._forget)
+
+    def _forget(self, future: Future) -> None:
+        with self._lock:
+            self._pending.pop(future, None)
+
+    def _finish(self) -> None:
+        with self._lock:
+            self._stats["in_flight"] -= 1
+        self._slots.release()
+
+    def _job(self, mail: Mail, outbox_id: Optional[int]) -> None:
+        msg = mail.message
+        try:
+            self._deliver(msg, MAIL_SMTP_TIMEOUT_SECONDS)
+        except Exception as e:
+            self.breaker.record_failure()
+            self._incr("failed")
+            print(f"[MAIL ERROR] to={msg['To']} subject={msg['Subject']} err={e!r}")
+            self._store(mail, outbox_id, repr(e), attempted=True)
+        else:
+            self.breaker.record_success()
+            self._incr("sent")
+            print(f"[MAIL] Sent to={msg['To']} subject={msg['Subject']}")
+            if outbox_id is not None:
+                self._delete(outbox_id)
+        finally:
+            self._finish()
+
+    # --- Table mail_outbox
+
+    def _store(self, mail: Mail, outbox_id: Optional[int], error: str, attempted: bool) -> None:
+        now = datetime.utcnow()
+        msg = mail.message
+        db = SessionLocal()
+        try:
+            row = db.get(models.MailOutbox, outbox_id) if outbox_id is not None else None
+            if row is None:
+                secret = mail.template in SECRET_TEMPLATES
+                row = models.MailOutbox(
+                    to_email=str(msg["To"]),
+                    subject=str(msg["Subject"])[:255],
+                    template=mail.template,
+                    # Identifiants : jamais en base (ni dans les sauvegardes), pas de renvoi
+                    context_json=None if secret else json.dumps(mail.context, default=str, ensure_ascii=False),
+                    message_id=msg["Message-ID"],
+                    attempts=0,
+                )
+                db.add(row)
+            if attempted:
+                row.attempts += 1
+            row.last_error = error
+            if row.context_json is None:
+                row.next_attempt_at = None
+                self._incr("not_stored")
+                print(f"[MAIL ERROR] non renvoyé (identifiants non conservés) to={row.to_email} template={row.template}")
+            elif row.attempts >= MAIL_MAX_ATTEMPTS:
+                row.next_attempt_at = None
+                self._incr("abandoned")
+                print(f"[MAIL ERROR] abandon après {row.attempts} tentatives to={row.to_email} subject={row.subject}")
+            else:
+                # Jamais tenté (disjoncteur ouvert, file pleine) : dès le prochain passage
+                row.next_attempt_at = now + _retry_delay(row.attempts) if attempted else now
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"[MAIL ERROR] stockage pour renvoi impossible to={msg['To']} err={e!r}")
+        finally:
+            db.close()
+
+    def _render_failed(self, outbox_id: int, error: str) -> None:
+        """Ligne réservée que le template ne sait plus rendre : compte comme une tentative."""
+        db = SessionLocal()
+        try:
+            row = db.get(models.MailOutbox, outbox_id)
+            if row is not None:
+                row.attempts += 1
+                row.last_error = error
+                row.next_attempt_at = (
+                    None if row.attempts >= MAIL_MAX_ATTEMPTS else datetime.utcnow() + _retry_delay(row.attempts)
+                )
+                db.commit()
+        finally:
+            db.close()
+
+    def _delete(self, outbox_id: int) -> None:
+        db = SessionLocal()
+        try:
+            db.query(models.MailOutbox).filter(models.MailOutbox.id == outbox_id).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _claim_due(self, db, limit: int) -> List[models.MailOutbox]:
+        now = datetime.utcnow()
+        # Réservation : pendant ce délai, les autres workers ignorent la ligne
+        lease_until = now + timedelta(seconds=MAIL_SMTP_TIMEOUT_SECONDS * 4)
+        candidates = (
+            db.query(models.MailOutbox.id, models.MailOutbox.next_attempt_at)
+            .filter(
+                models.MailOutbox.next_attempt_at.isnot(None),
+                models.MailOutbox.next_attempt_at <= now,
+                models.MailOutbox.context_json.isnot(None),
+            )
+            .order_by(models.MailOutbox.next_attempt_at, models.MailOutbox.id)
+            .limit(limit)
+            .all()
+        )
+        claimed_ids = []
+        for outbox_id, next_attempt_at in candidates:
+            updated = (
+                db.query(models.MailOutbox)
+                .filter(models.MailOutbox.id == outbox_id, models.MailOutbox.next_attempt_at == next_attempt_at)
+                .update({models.MailOutbox.next_attempt_at: lease_until}, synchronize_session=False)
+            )
+            if updated:
+                claimed_ids.append(outbox_id)
+        db.commit()
+        if not claimed_ids:
+            return []
+        return db.query(models.MailOutbox).filter(models.MailOutbox.id.in_(claimed_ids)).all()
+
+    def _release(self, outbox_ids: List[int]) -> None:
+        """Lignes réservées mais non soumises : de nouveau échues."""
+        if not outbox_ids:
+            return
+        db = SessionLocal()
+        try:
+            db.query(models.MailOutbox).filter(models.MailOutbox.id.in_(outbox_ids)).update(
+                {models.MailOutbox.next_attempt_at: datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def purge_abandoned(self, retention_days: int = MAIL_OUTBOX_RETENTION_DAYS) -> int:
+        """Supprime les lignes abandonnées depuis plus de `retention_days` jours (0 = jamais)."""
+        if retention_days <= 0:
+            return 0
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        db = SessionLocal()
+        try:
+            purged = (
+                db.query(models.MailOutbox)
+                .filter(models.MailOutbox.next_attempt_at.is_(None), models.MailOutbox.created_at < cutoff)
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+        self._incr("purged", purged)
+        return purged
+
+    def retry_due(self) -> int:
+        """Renvoie les emails échus de mail_outbox. Retourne le nombre soumis."""
+        self.purge_abandoned()
+        if not self.breaker.ready():
+            return 0
+        # Disjoncteur semi-ouvert : un seul email d'essai
+        limit = RETRY_BATCH_SIZE if self.breaker.closed else 1
+        db = SessionLocal()
+        try:
+            rows = self._claim_due(db, limit)
+            items = [(row.id, row.to_email, row.template, row.context_json, row.message_id) for row in rows]
+        finally:
+            db.close()
+
+        submitted = 0
+        done: List[int] = []
+        for outbox_id, to_email, template, context_json, message_id in items:
+            context = json.loads(context_json)
+            try:
+                # Même Message-ID qu'au premier essai
+                mail = Mail(template, context, self._build(to_email, template, context, message_id))
+            except Exception as e:
+                print(f"[MAIL ERROR] rendu impossible au renvoi to={to_email} template={template} err={e!r}")
+                self._render_failed(outbox_id, repr(e))
+                done.append(outbox_id)
+                continue
+            if not self._slots.acquire(blocking=False):
+                break
+            if not self.breaker.allow():
+                self._slots.release()
+                break
+            self._dispatch(mail, outbox_id)
+            done.append(outbox_id)
+            submitted += 1
+        self._release([item[0] for item in items if item[0] not in done])
+        self._incr("retried", submitted)
+        return submitted
+
+    # --- Cycle de vie
+
+    def shutdown(self) -> None:
+        """Arrêt : les envois non commencés sont stockés pour le prochain démarrage."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        # Copie avant l'annulation : les callbacks retirent les futures de _pending
+        with self._lock:
+            pending = dict(self._pending)
+        executor.shutdown(wait=False, cancel_futures=True)
+        for future, (mail, outbox_id) in pending.items():
+            if not future.cancelled():
+                continue
+            self._finish()
+            if outbox_id is None:
+                self._store(mail, None, "arrêt du serveur", attempted=False)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            data: Dict[str, object] = dict(self._stats)
+        data["max_workers"] = self.max_workers
+        data["max_pending"] = self.max_pending
+        data["circuit"] = self.breaker.stats()
+        db = SessionLocal()
+        try:
+            waiting, abandoned = db.query(
+                func.count(models.MailOutbox.next_attempt_at),
+                func.count(models.MailOutbox.id) - func.count(models.MailOutbox.next_attempt_at),
+            ).one()
+        finally:
+            db.close()
+        data["outbox_waiting"] = waiting or 0
+        data["outbox_abandoned"] = abandoned or 0
+        return data
+
+
+def build_sender(deliver: Callable[[EmailMessage, float], None], build: BuildMessage) -> MailSender:
+    return MailSender(
+        deliver,
+        build,
+        MAIL_SEND_WORKERS,
+        MAIL_MAX_PENDING,
+        CircuitBreaker(MAIL_CIRCUIT_FAILURE_THRESHOLD, MAIL_CIRCUIT_RESET_SECONDS),
+    )
+
+
+async def retry_loop(sender: MailSender) -> None:
+    """Tâche de fond (lifespan) : renvoi de mail_outbox."""
+    while True:
+        await asyncio.sleep(MAIL_RETRY_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(sender.retry_due)
+        except Exception as e:
+            print(f"[MAIL ERROR] retry failed: {e!r}")
@@ -0,0 +1,86 @@
+"""
+Rendu des emails à partir des templates Jinja (app/templates/emails/).
+
+Un email `<nom>` = deux templates :
+- `emails/<nom>.html` : étend `emails/base.html`, échappement HTML automatique
+  (les commentaires saisis par les boutiques / l'atelier ne sont plus injectés tels quels) ;
+- `emails/<nom>.txt` : version texte, non échappée ; son `{% set subject %}` donne le sujet.
+
+Même Environment que les pages admin (app.templating) : templates compilés une fois
+par process (précompilés au démarrage), cache de bytecode partagé.
+
+Cache de rendu (template + hash du contexte) : un même email envoyé plusieurs fois
+(récapitulatifs, envois groupés) n'est rendu qu'une fois. Limité à CACHED_TEMPLATES :
+les emails porteurs d'identifiants (mot de passe provisoire, lien de réinitialisation)
+ne sont jamais renvoyés et ne doivent pas rester en mémoire.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+from .templating import env
+
+RENDER_CACHE_SIZE = 512
+CACHED_TEMPLATES = frozenset({"bc_recapitulatif", "bc_groupe"})
+# Emails porteurs d'identifiants : ni en cache, ni en base (app.mail_sender)
+SECRET_TEMPLATES = frozenset({"boutique_bienvenue", "password_reset", "admin_password_reset"})
+
+
+@dataclass(frozen=True)
+class RenderedEmail:
+    subject: str
+    text: str
+    html: str
+
+
+_cache: "OrderedDict[Tuple[str, str], RenderedEmail]" = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "uncached": 0}
+
+
+def _context_key(context: Dict[str, Any]) -> str:
+    raw = json.dumps(context, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _render(name: str, context: Dict[str, Any]) -> RenderedEmail:
+    text_module = env.get_template(f"emails/{name}.txt").make_module(context)
+    html = env.get_template(f"emails/{name}.html").render(context)
+    return RenderedEmail(
+        subject=" ".join(str(getattr(text_module, "subject", "")).split()),
+        text=str(text_module).strip() + "\n",
+        html=html,
+    )
+
+
+def render_email(name: str, **context: Any) -> RenderedEmail:
+    if name not in CACHED_TEMPLATES:
+        with _lock:
+            _stats["uncached"] += 1
+        return _render(name, context)
+
+    key = (name, _context_key(context))
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return cached
+        _stats["misses"] += 1
+
+    rendered = _render(name, context)
+    with _lock:
+        _cache[key] = rendered
+        if len(_cache) > RENDER_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return rendered
+
+
+def render_stats() -> Dict[str, int]:
+    with _lock:
+        return {**_stats, "size": len(_cache), "max_size": RENDER_CACHE_SIZE}
@@ -1,4 +1,6 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import RedirectResponse
@@ -11,23 +13,80 @@ from .config import (
     HTTPS_ONLY,
     COOKIE_SAME_SITE,
     FRONT_ORIGIN,
+    ADMIN_SESSION_BACKEND,
+    ADMIN_SESSION_MAX_AGE_SECONDS,
 )
 from .csrf import CSRFMiddleware
+from .sessions import ServerSessionMiddleware, build_session_store
+from .migrations import run_migrations
+from .templating import precompile_templates
+from .mail_sender import retry_loop as mail_retry_loop
+from .utils.mailer import sender as mail_sender
+from .analytics import analytics_enabled, analytics_loop
+from .archive import archive_enabled, archive_loop
+from .backup import backup_enabled, backup_loop
+from .notifications import digest_enabled, digest_loop, flush_digest, init_digest, reset_digest
 from . import auth
 from .admin.router import router as admin_router
 from .boutique_api import router as boutique_api_router
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schéma à jour (migrations idempotentes, voir app.migrations)
+    run_migrations()
+    # Templates compilés avant la première requête (cold start admin)
+    precompile_templates()
+    # Récapitulatifs d'emails (NOTIFICATION_DIGEST_WINDOW_SECONDS > 0)
+    digest_task = None
+    if digest_enabled():
+        init_digest()
+        digest_task = asyncio.create_task(digest_loop())
+    else:
+        reset_digest()
+    # Renvoi des emails en échec (mail_outbox, voir app.mail_sender)
+    mail_retry_task = asyncio.create_task(mail_retry_loop(mail_sender))
+    # Entonnoir de conversion (funnel_snapshots, voir app.analytics)
+    analytics_task = asyncio.create_task(analytics_loop()) if analytics_enabled() else None
+    # Archivage des devis clos (ARCHIVE_AFTER_DAYS > 0, voir app.archive)
+    archive_task = asyncio.create_task(archive_loop()) if archive_enabled() else None
+    # Sauvegardes à chaud de la base SQLite (BACKUP_INTERVAL_SECONDS > 0, voir app.backup)
+    backup_task = asyncio.create_task(backup_loop()) if backup_enabled() else None
+    yield
+    if backup_task is not None:
+        backup_task.cancel()
+    if analytics_task is not None:
+        analytics_task.cancel()
+    if archive_task is not None:
+        archive_task.cancel()
+    if digest_task is not None:
+        digest_task.cancel()
+        flush_digest()
+    mail_retry_task.cancel()
+    mail_sender.shutdown()
+
+
 def create_app() -> FastAPI:
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     # --- Sessions (ADMIN) ---
-    app.add_middleware(
-        SessionMiddleware,
-        secret_key=SESSION_SECRET_KEY,
-        https_only=HTTPS_ONLY,
-        same_site=COOKIE_SAME_SITE,
-    )
+    session_store = build_session_store(ADMIN_SESSION_BACKEND)
+    if session_store is not None:
+        app.add_middleware(
+            ServerSessionMiddleware,
+            store=session_store,
+            max_age=ADMIN_SESSION_MAX_AGE_SECONDS,
+            https_only=HTTPS_ONLY,
+            same_site=COOKIE_SAME_SITE,
+        )
+    else:
+        app.add_middleware(
+            SessionMiddleware,
+            secret_key=SESSION_SECRET_KEY,
+            max_age=ADMIN_SESSION_MAX_AGE_SECONDS,
+            https_only=HTTPS_ONLY,
+            same_site=COOKIE_SAME_SITE,
+        )
 
     # --- CORS (FRONT boutique) ---
     app.add_middleware(
@@ -55,6 +114,7 @@ def create_app() -> FastAPI:
         return JSONResponse(
             status_code=exc.status_code,
             content={"detail": exc.detail},
+            headers=exc.headers,
         )
 
     # --- Routes ---
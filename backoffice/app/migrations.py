@@ -0,0 +1,390 @@
+"""
+Migrations de schéma légères (sans Alembic).
+
+`Base.metadata.create_all` crée les tables manquantes mais ne modifie jamais une
+table existante. Chaque migration ci-dessous est idempotente (elle vérifie l'état
+avant d'agir) et son nom est enregistré dans `schema_migrations` une fois appliquée.
+
+Exécutées :
+- au démarrage de l'application (lifespan) ;
+- à la main : `python scripts/migrate.py`.
+"""
+from __future__ import annotations
+
+import json
+import re
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator, List, Tuple
+
+from sqlalchemy import Float, Numeric, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from .bc_durations import rebuild_status_durations
+from .boutique_stats import install_boutique_stats
+from .database import Base, engine as default_engine
+from .search import install_search_index
+
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def _has_table(conn: Connection, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+
+def add_column(conn: Connection, table: str, column: str, ddl: str) -> None:
+    """ALTER TABLE ... ADD COLUMN si la colonne n'existe pas encore."""
+    if _has_table(conn, table) and not _has_column(conn, table, column):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+# =========================
+# Migrations
+# =========================
+
+def _m001_devis_mesures_json(conn: Connection) -> None:
+    """Mesures des devis : lignes devis_mesures -> vecteur JSON sur devis.mesures_json.
+
+    Les lignes d'origine sont conservées (retour arrière possible) ; elles ne sont plus
+    lues ni écrites. Leur suppression, le jour venu, fera l'objet d'une migration dédiée
+    (DROP TABLE devis_mesures), pas d'un effacement silencieux ici.
+    """
+    add_column(conn, "devis", "mesures_json", "TEXT")
+    if not _has_table(conn, "devis_mesures"):
+        return
+
+    rows = conn.execute(
+        text(
+            "SELECT devis_id, mesure_type_id, valeur FROM devis_mesures "
+            "ORDER BY devis_id, id"
+        )
+    ).all()
+    par_devis: dict[int, dict[str, float | None]] = {}
+    for devis_id, mesure_type_id, valeur in rows:
+        par_devis.setdefault(devis_id, {})[str(mesure_type_id)] = valeur
+
+    if par_devis:
+        conn.execute(
+            text("UPDATE devis SET mesures_json = :data WHERE id = :id AND mesures_json IS NULL"),
+            [{"id": devis_id, "data": json.dumps(values)} for devis_id, values in par_devis.items()],
+        )
+
+
+def _m002_prix_figes(conn: Connection) -> None:
+    """Décomposition des prix stockée sur devis / bons_commandes (voir scripts/backfill_prix.py)."""
+    for column in (
+        "prix_partenaire_ht",
+        "prix_partenaire_tva",
+        "prix_partenaire_ttc",
+        "prix_client_ht",
+        "prix_client_tva",
+        "prix_client_ttc",
+        "marge_creatrice",
+        "marge_boutique",
+        "tva_rate",
+    ):
+        add_column(conn, "devis", column, "FLOAT")
+    for column in (
+        "montant_boutique_tva",
+        "montant_client_ht",
+        "montant_client_tva",
+        "montant_client_ttc",
+        "marge_creatrice",
+        "marge_boutique",
+        "tva_rate",
+    ):
+        add_column(conn, "bons_commandes", column, "FLOAT")
+
+
+MONEY_COLUMNS = {
+    "tarifs_transformations": ("prix",),
+    "tarifs_tissus": ("prix",),
+    "finitions_supplementaires": ("prix",),
+    "accessoires": ("prix",),
+    "devis": (
+        "prix_total",
+        "prix_partenaire_ht",
+        "prix_partenaire_tva",
+        "prix_partenaire_ttc",
+        "prix_client_ht",
+        "prix_client_tva",
+        "prix_client_ttc",
+    ),
+    "bons_commandes": (
+        "montant_boutique_ht",
+        "montant_boutique_tva",
+        "montant_boutique_ttc",
+        "montant_client_ht",
+        "montant_client_tva",
+        "montant_client_ttc",
+    ),
+    "lignes_devis": ("prix_unitaire",),
+}
+
+
+def _m003_montants_centimes(conn: Connection) -> None:
+    """Montants en euros (FLOAT) -> centimes entiers (type Money, voir app.money).
+
+    Seules les colonnes encore déclarées en flottant sont converties : une base
+    créée directement par create_all a déjà des colonnes INTEGER en centimes.
+    """
+    for table, columns in MONEY_COLUMNS.items():
+        if not _has_table(conn, table):
+            continue
+        types = {c["name"]: c["type"] for c in inspect(conn).get_columns(table)}
+        for column in columns:
+            if not isinstance(types.get(column), (Float, Numeric)):
+                continue
+            if conn.dialect.name == "postgresql":
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {table} ALTER COLUMN {column} TYPE INTEGER "
+                        f"USING ROUND({column} * 100)"
+                    )
+                )
+            else:
+                # SQLite : le type déclaré ne change pas, seules les valeurs sont converties
+                conn.execute(
+                    text(
+                        f"UPDATE {table} SET {column} = CAST(ROUND({column} * 100) AS INTEGER) "
+                        f"WHERE {column} IS NOT NULL"
+                    )
+                )
+
+
+def _m004_updated_at(conn: Connection) -> None:
+    """Colonne updated_at (indexée) sur boutiques, devis et bons_commandes."""
+    for table in ("boutiques", "devis", "bons_commandes"):
+        if not _has_table(conn, table):
+            continue
+        add_column(conn, table, "updated_at", "TIMESTAMP")
+        conn.execute(text(f"UPDATE {table} SET updated_at = date_creation WHERE updated_at IS NULL"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_boutiques_updated_at ON boutiques (updated_at)"))
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_devis_boutique_updated_at ON devis (boutique_id, updated_at)")
+    )
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_bons_commandes_updated_at ON bons_commandes (updated_at)"))
+
+
+def _m005_search_fts(conn: Connection) -> None:
+    """Index plein texte admin (FTS5 + triggers, SQLite ; voir app.search)."""
+    install_search_index(conn)
+
+
+def _m006_boutique_stats(conn: Connection) -> None:
+    """Compteurs par boutique pour la liste admin (triggers, SQLite ; voir app.boutique_stats)."""
+    install_boutique_stats(conn)
+
+
+def _m007_bc_statut_date_index(conn: Connection) -> None:
+    """Index de la file de validation des bons de commande (statut, date_creation, id)."""
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_bons_commandes_statut_date "
+            "ON bons_commandes (statut, date_creation, id)"
+        )
+    )
+
+
+def _m008_bc_events_index(conn: Connection) -> None:
+    """Index composite de l'historique des BC ; remplace l'index simple sur bon_commande_id."""
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_bon_commande_events_bc_created "
+            "ON bon_commande_events (bon_commande_id, created_at, id)"
+        )
+    )
+    conn.execute(text("DROP INDEX IF EXISTS ix_bon_commande_events_bon_commande_id"))
+
+
+def _m009_bc_status_durations(conn: Connection) -> None:
+    """Durées par statut des BC, reconstruites depuis l'historique (voir app.bc_durations)."""
+    rebuild_status_durations(conn)
+
+
+def _m010_archive(conn: Connection) -> None:
+    """Tables *_archive (create_all) : compteurs boutique_stats recalculés avec les archives."""
+    install_boutique_stats(conn)
+
+
+# Tables dont des lignes partent dans *_archive (app.archive) -> table d'archive
+ARCHIVED_TABLES = {
+    "devis": "devis_archive",
+    "lignes_devis": "lignes_devis_archive",
+    "devis_mesures": "devis_mesures_archive",
+    "bons_commandes": "bons_commandes_archive",
+    "bon_commande_events": "bon_commande_events_archive",
+    "bc_status_durations": "bc_status_durations_archive",
+}
+
+
+def _rebuild_autoincrement(conn: Connection, table: str) -> None:
+    """Recrée `table` avec `id INTEGER PRIMARY KEY AUTOINCREMENT` (procédure SQLite :
+    nouvelle table, copie, DROP, renommage, index et triggers recréés)."""
+    sql = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :t"), {"t": table}
+    ).scalar()
+    if sql is None or "AUTOINCREMENT" in sql.upper():
+        return
+    tmp = f"{table}_autoinc"
+    ddl = re.sub(rf"^CREATE TABLE\s+\"?{table}\"?", f"CREATE TABLE {tmp}", sql)
+    ddl = re.sub(r"\bid INTEGER NOT NULL,", "id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,", ddl, count=1)
+    ddl = re.sub(r",\s*PRIMARY KEY \(id\)", "", ddl)
+    dependents = [
+        r[0]
+        for r in conn.execute(
+            text(
+                "SELECT sql FROM sqlite_master WHERE tbl_name = :t AND type IN ('index', 'trigger') "
+                "AND sql IS NOT NULL ORDER BY type"
+            ),
+            {"t": table},
+        )
+    ]
+    columns = ", ".join(c["name"] for c in inspect(conn).get_columns(table))
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {tmp}")  # tentative précédente interrompue
+    conn.exec_driver_sql(ddl)
+    conn.exec_driver_sql(f"INSERT INTO {tmp} ({columns}) SELECT {columns} FROM {table}")
+    conn.exec_driver_sql(f"DROP TABLE {table}")
+    conn.exec_driver_sql(f"ALTER TABLE {tmp} RENAME TO {table}")
+    for statement in dependents:
+        conn.exec_driver_sql(statement)
+
+
+def _bump_sequence(conn: Connection, table: str, archive: str) -> None:
+    """sqlite_sequence >= plus grand id actif ou archivé : aucun id ne sera réattribué."""
+    high = conn.execute(
+        text(
+            f"SELECT max(COALESCE((SELECT max(id) FROM {table}), 0), "
+            f"COALESCE((SELECT max(id) FROM {archive}), 0), "
+            "COALESCE((SELECT seq FROM sqlite_sequence WHERE name = :t), 0))"
+        ),
+        {"t": table},
+    ).scalar()
+    conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :t"), {"t": table})
+    conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:t, :seq)"), {"t": table, "seq": high})
+
+
+def _m011_autoincrement_ids(conn: Connection) -> None:
+    """AUTOINCREMENT sur les tables archivées : SQLite réattribuait l'id max une fois
+    la ligne partie dans *_archive (collision au prochain archivage)."""
+    if conn.dialect.name != "sqlite":
+        return  # séquences PostgreSQL : jamais réutilisées
+    conn.exec_driver_sql("PRAGMA legacy_alter_table=ON")
+    try:
+        for table, archive in ARCHIVED_TABLES.items():
+            if _has_table(conn, table):
+                _rebuild_autoincrement(conn, table)
+                _bump_sequence(conn, table, archive)
+    finally:
+        conn.exec_driver_sql("PRAGMA legacy_alter_table=OFF")
+    violations = conn.exec_driver_sql("PRAGMA foreign_key_check").all()
+    if violations:
+        raise RuntimeError(f"Clés étrangères invalides après reconstruction : {violations[:5]}")
+
+
+def _m012_mail_outbox_template(conn: Connection) -> None:
+    """mail_outbox : template + contexte au lieu du message MIME complet, qui gardait
+    en clair mots de passe provisoires et liens de réinitialisation (app.mail_sender).
+
+    Les lignes existantes ne peuvent pas être re-rendues : elles sont supprimées."""
+    if not _has_table(conn, "mail_outbox") or not _has_column(conn, "mail_outbox", "message"):
+        return
+    add_column(conn, "mail_outbox", "template", "VARCHAR(100) NOT NULL DEFAULT ''")
+    add_column(conn, "mail_outbox", "context_json", "TEXT")
+    add_column(conn, "mail_outbox", "message_id", "VARCHAR(255)")
+    sqlite = conn.dialect.name == "sqlite"
+    if sqlite:
+        # Pages libérées écrasées : le texte des messages ne reste pas dans le fichier
+        conn.exec_driver_sql("PRAGMA secure_delete=ON")
+    try:
+        dropped = conn.execute(text("DELETE FROM mail_outbox")).rowcount
+        conn.execute(text("ALTER TABLE mail_outbox DROP COLUMN message"))
+    finally:
+        if sqlite:
+            conn.exec_driver_sql("PRAGMA secure_delete=OFF")
+    if dropped:
+        print(f"[MIGRATION] mail_outbox : {dropped} email(s) en attente supprimé(s) (ancien format)")
+
+
+def _m013_devis_archive_sync_index(conn: Connection) -> None:
+    """Devis archivés depuis un jeton de synchro (app.boutique.changes)."""
+    if _has_table(conn, "devis_archive"):
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_devis_archive_boutique_archived_at "
+                "ON devis_archive (boutique_id, archived_at)"
+            )
+        )
+
+
+# Migrations qui recréent des tables référencées par des clés étrangères : exécutées
+# avec PRAGMA foreign_keys=OFF (sinon DROP TABLE déclenche les ON DELETE CASCADE)
+WITHOUT_FOREIGN_KEYS = {"011_autoincrement_ids"}
+
+
+@contextmanager
+def _migration_transaction(engine: Engine, foreign_keys: bool = True) -> Iterator[Connection]:
+    with engine.connect() as conn:
+        toggle = not foreign_keys and conn.dialect.name == "sqlite"
+        if toggle:
+            # Sans effet dans une transaction : positionné avant BEGIN
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            conn.commit()
+        try:
+            with conn.begin():
+                yield conn
+        finally:
+            if toggle:
+                conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+                conn.commit()
+
+
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("001_devis_mesures_json", _m001_devis_mesures_json),
+    ("002_prix_figes", _m002_prix_figes),
+    ("003_montants_centimes", _m003_montants_centimes),
+    ("004_updated_at", _m004_updated_at),
+    ("005_search_fts", _m005_search_fts),
+    ("006_boutique_stats", _m006_boutique_stats),
+    ("007_bc_statut_date_index", _m007_bc_statut_date_index),
+    ("008_bc_events_index", _m008_bc_events_index),
+    ("009_bc_status_durations", _m009_bc_status_durations),
+    ("010_archive", _m010_archive),
+    ("011_autoincrement_ids", _m011_autoincrement_ids),
+    ("012_mail_outbox_template", _m012_mail_outbox_template),
+    ("013_devis_archive_sync_index", _m013_devis_archive_sync_index),
+]
+
+
+def run_migrations(engine: Engine = default_engine) -> List[str]:
+    """Crée les tables manquantes puis applique les migrations non encore enregistrées."""
+    Base.metadata.create_all(bind=engine)
+
+    applied_now: List[str] = []
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "name VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP NOT NULL)"
+            )
+        )
+        done = {r[0] for r in conn.execute(text("SELECT name FROM schema_migrations"))}
+
+    for name, migration in MIGRATIONS:
+        if name in done:
+            continue
+        try:
+            with _migration_transaction(engine, foreign_keys=name not in WITHOUT_FOREIGN_KEYS) as conn:
+                migration(conn)
+                conn.execute(
+                    text("INSERT INTO schema_migrations (name, applied_at) VALUES (:name, :at)"),
+                    {"name": name, "at": datetime.utcnow()},
+                )
+        except IntegrityError:
+            # Appliquée entre-temps par un autre worker
+            continue
+        applied_now.append(name)
+    return applied_now
@@ -17,6 +17,7 @@ from sqlalchemy import (
 from sqlalchemy.orm import relationship
 
 from .database import Base
+from .money import Money
 
 
 class UserType(str, Enum):
@@ -72,6 +73,8 @@ class Boutique(Base):
     numero_tva = Column(String, nullable=True)
 
     date_creation = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Dernière modification (synchronisation incrémentale, cache HTTP)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True)
 
     devis = relationship("Devis", back_populates="boutique")
 
@@ -102,7 +105,7 @@ class TransformationTarif(Base):
     robe_modele_id = Column(Integer, ForeignKey("robe_modeles.id"), nullable=True)
 
     epaisseur_ou_option = Column(String, nullable=True)
-    prix = Column(Float, default=0.0, nullable=False)
+    prix = Column(Money, default=0.0, nullable=False)
 
     est_decollete = Column(Boolean, default=False, nullable=False)
     ceinture_possible = Column(Boolean, default=False, nullable=False)
@@ -121,7 +124,7 @@ class TissuTarif(Base):
     robe_modele_id = Column(Integer, ForeignKey("robe_modeles.id"), nullable=True)
     detail = Column(Text, nullable=False)
     forme = Column(String, nullable=True)
-    prix = Column(Float, default=0.0, nullable=False)
+    prix = Column(Money, default=0.0, nullable=False)
 
     nb_epaisseurs = Column(Integer, nullable=True)
     mono_epaisseur = Column(Boolean, default=False, nullable=False)
@@ -136,7 +139,7 @@ class FinitionSupplementaire(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     nom = Column(String, nullable=False)
-    prix = Column(Float, default=0.0, nullable=False)
+    prix = Column(Money, default=0.0, nullable=False)
     est_fente = Column(Boolean, default=False, nullable=False)
     applicable_top_unique = Column(Boolean, default=False, nullable=False)
 
@@ -148,7 +151,7 @@ class Accessoire(Base):
     id = Column(Integer, primary_key=True, index=True)
     nom = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    prix = Column(Float, default=0.0, nullable=False)
+    prix = Column(Money, default=0.0, nullable=False)
 
 
 class StatutDevis(str, Enum):
@@ -167,6 +170,12 @@ class DevisType(str, Enum):
 class Devis(Base):
     """Devis créé par les boutiques pour une cliente."""
     __tablename__ = "devis"
+    __table_args__ = (
+        # Synchronisation incrémentale : devis d'une boutique modifiés depuis ...
+        sa.Index("ix_devis_boutique_updated_at", "boutique_id", "updated_at"),
+        # AUTOINCREMENT : l'id d'un devis archivé (app.archive) n'est jamais réattribué
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     boutique_id = Column(Integer, ForeignKey("boutiques.id"), nullable=False)
@@ -174,11 +183,29 @@ class Devis(Base):
     type = Column(SAEnum(DevisType), default=DevisType.ROBE, nullable=False)
     statut = Column(SAEnum(StatutDevis), default=StatutDevis.EN_COURS, nullable=False)
     date_creation = Column(DateTime, default=datetime.utcnow, nullable=False)
-    prix_total = Column(Float, default=0.0, nullable=False)
+    # Dernière modification (synchronisation incrémentale, cache HTTP)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Montants : type Money (centimes entiers en base, euros côté Python, voir app.money)
+    prix_total = Column(Money, default=0.0, nullable=False)
+
+    # Prix affichés, figés quand prix_total est défini (voir app.boutique.pricing)
+    prix_partenaire_ht = Column(Money, nullable=True)
+    prix_partenaire_tva = Column(Money, nullable=True)
+    prix_partenaire_ttc = Column(Money, nullable=True)
+    prix_client_ht = Column(Money, nullable=True)
+    prix_client_tva = Column(Money, nullable=True)
+    prix_client_ttc = Column(Money, nullable=True)
+    # Paramètres utilisés pour ce calcul
+    marge_creatrice = Column(Float, nullable=True)
+    marge_boutique = Column(Float, nullable=True)
+    tva_rate = Column(Float, nullable=True)
 
     # configuration complète du devis (choix tissus, finitions, accessoires, etc.)
     configuration_json = sa.Column(sa.Text, nullable=True)
 
+    # mesures de la cliente : {"<mesure_type_id>": valeur, ...} (voir app.boutique.mesures)
+    mesures_json = sa.Column(sa.Text, nullable=True)
+
     # dentelle choisie
     dentelle_id = sa.Column(sa.Integer, sa.ForeignKey("dentelles.id"), nullable=True)
     dentelle = sa.orm.relationship("Dentelle")
@@ -188,11 +215,13 @@ class Devis(Base):
         "LigneDevis",
         back_populates="devis",
         cascade="all, delete-orphan",
+        order_by="LigneDevis.id",
     )
     mesures = relationship(
         "DevisMesure",
         back_populates="devis",
         cascade="all, delete-orphan",
+        order_by="DevisMesure.id",
     )
     bon_commande = relationship(
         "BonCommande",
@@ -210,14 +239,29 @@ class StatutBonCommande(str, Enum):
 
 class BonCommande(Base):
     __tablename__ = "bons_commandes"
+    # File de validation admin : filtre par statut, tri par ancienneté (keyset date_creation, id)
+    __table_args__ = (
+        sa.Index("ix_bons_commandes_statut_date", "statut", "date_creation", "id"),
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     devis_id = Column(Integer, ForeignKey("devis.id"), unique=True, nullable=False)
 
     date_creation = Column(DateTime, server_default=func.now(), nullable=False)
-    montant_boutique_ht = Column(Float, default=0.0, nullable=False)
-    montant_boutique_ttc = Column(Float, default=0.0, nullable=False)
+    # Dernière modification (synchronisation incrémentale, cache HTTP)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True)
+    montant_boutique_ht = Column(Money, default=0.0, nullable=False)
+    montant_boutique_tva = Column(Money, nullable=True)
+    montant_boutique_ttc = Column(Money, default=0.0, nullable=False)
+    montant_client_ht = Column(Money, nullable=True)
+    montant_client_tva = Column(Money, nullable=True)
+    montant_client_ttc = Column(Money, nullable=True)
     has_tva = Column(Boolean, default=False, nullable=False)
+    # Paramètres de calcul en vigueur lors de la soumission
+    marge_creatrice = Column(Float, nullable=True)
+    marge_boutique = Column(Float, nullable=True)
+    tva_rate = Column(Float, nullable=True)
 
     statut = Column(
         SAEnum(StatutBonCommande),
@@ -233,6 +277,7 @@ class BonCommande(Base):
 class LigneDevis(Base):
     """Ligne d'un devis (description textuelle + prix interne)."""
     __tablename__ = "lignes_devis"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     devis_id = Column(Integer, ForeignKey("devis.id"), nullable=False)
@@ -240,7 +285,7 @@ class LigneDevis(Base):
 
     description = Column(Text, nullable=True)
     quantite = Column(Integer, default=1, nullable=False)
-    prix_unitaire = Column(Float, default=0.0, nullable=False)
+    prix_unitaire = Column(Money, default=0.0, nullable=False)
 
     devis = relationship("Devis", back_populates="lignes")
     robe_modele = relationship("RobeModele")
@@ -260,8 +305,13 @@ class MesureType(Base):
 class DevisMesure(Base):
     """
     Valeur d'une mesure pour un devis donné.
+
+    Ancien stockage (une ligne par mesure) : les mesures vivent désormais dans
+    Devis.mesures_json. Table conservée telle quelle après la migration 001
+    (ni lue ni écrite) : elle permet un retour arrière sur les bases existantes.
     """
     __tablename__ = "devis_mesures"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     devis_id = Column(Integer, ForeignKey("devis.id", ondelete="CASCADE"), nullable=False)
@@ -270,3 +320,101 @@ class DevisMesure(Base):
 
     devis = relationship("Devis", back_populates="mesures")
     mesure_type = relationship("MesureType")
+
+
+class LoginAttempt(Base):
+    """Échec de login (backend partagé du limiteur, voir app.rate_limit)."""
+    __tablename__ = "login_attempts"
+    __table_args__ = (sa.Index("ix_login_attempts_key_created", "key", "created_at"),)
+
+    id = Column(Integer, primary_key=True)
+    key = Column(String(255), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AdminSession(Base):
+    """Session admin stockée côté serveur (ADMIN_SESSION_BACKEND=db, voir app.sessions)."""
+    __tablename__ = "admin_sessions"
+
+    id = Column(String(64), primary_key=True)
+    data = Column(Text, nullable=False, default="{}")
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class NotificationDigestState(Base):
+    """Curseur des récapitulatifs d'emails dans bon_commande_events (voir app.notifications)."""
+    __tablename__ = "notification_digest_state"
+
+    name = Column(String(50), primary_key=True)
+    last_event_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class MailOutbox(Base):
+    """Email en attente de renvoi (SMTP en échec ou disjoncteur ouvert, voir app.mail_sender)."""
+    __tablename__ = "mail_outbox"
+
+    id = Column(Integer, primary_key=True)
+    to_email = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    # Re-rendu au renvoi (jamais le message rendu) ; même Message-ID qu'au premier essai
+    template = Column(String(100), nullable=False)
+    # NULL : template porteur d'identifiants (SECRET_TEMPLATES), trace seule, pas de renvoi
+    context_json = Column(Text, nullable=True)
+    message_id = Column(String(255), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    # NULL : abandonné (MAIL_MAX_ATTEMPTS, identifiants), supprimé après MAIL_OUTBOX_RETENTION_DAYS
+    next_attempt_at = Column(DateTime, nullable=True, index=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class BoutiqueStats(Base):
+    """Compteurs par boutique pour la liste admin, tenus à jour par triggers (voir app.boutique_stats)."""
+    __tablename__ = "boutique_stats"
+
+    boutique_id = Column(Integer, ForeignKey("boutiques.id", ondelete="CASCADE"), primary_key=True)
+    nb_devis = Column(Integer, nullable=False, default=0)
+    nb_acceptes = Column(Integer, nullable=False, default=0)
+    # Somme des prix_total des devis (même calcul que la fiche boutique, sans filtre)
+    ca = Column(Money, nullable=False, default=0.0)
+    nb_bc_en_attente = Column(Integer, nullable=False, default=0)
+    # Dernière modification d'un devis ou d'un bon de commande
+    derniere_activite = Column(DateTime, nullable=True)
+
+
+class BcStatusDuration(Base):
+    """Séjour d'un bon de commande dans un statut (voir app.bc_durations)."""
+    __tablename__ = "bc_status_durations"
+    __table_args__ = (
+        sa.Index("ix_bc_status_durations_bc_debut", "bon_commande_id", "debut"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    bon_commande_id = Column(Integer, ForeignKey("bons_commandes.id", ondelete="CASCADE"), nullable=False)
+    boutique_id = Column(Integer, nullable=True, index=True)
+    statut = Column(String(30), nullable=False)
+    debut = Column(DateTime, nullable=False)
+    # NULL : statut courant du BC
+    fin = Column(DateTime, nullable=True)
+    duree_secondes = Column(Integer, nullable=True)
+
+
+class FunnelSnapshot(Base):
+    """Entonnoir devis -> accepté -> BC validé par mois de création et boutique (voir app.analytics)."""
+    __tablename__ = "funnel_snapshots"
+
+    mois = Column(String(7), primary_key=True)  # AAAA-MM
+    boutique_id = Column(Integer, ForeignKey("boutiques.id", ondelete="CASCADE"), primary_key=True)
+    nb_devis = Column(Integer, nullable=False, default=0)
+    nb_acceptes = Column(Integer, nullable=False, default=0)
+    nb_bc = Column(Integer, nullable=False, default=0)
+    nb_bc_valides = Column(Integer, nullable=False, default=0)
+    montant_devis = Column(Money, nullable=False, default=0.0)
+    montant_acceptes = Column(Money, nullable=False, default=0.0)
+    computed_at = Column(DateTime, nullable=False)
+
+
+# Tables d'archive : colonnes copiées des modèles ci-dessus (voir app.archive_models)
+from . import archive_models  # noqa: E402,F401
@@ -0,0 +1,66 @@
+"""
+Montants en centimes entiers.
+
+Les colonnes de prix sont stockées en INTEGER (centimes) via le type `Money` :
+- côté Python / API / templates, la valeur reste en euros (float arrondi au centime),
+  les schémas et le front ne changent pas ;
+- côté SQL, SUM / comparaisons travaillent sur des entiers (exacts, pas d'erreur
+  d'arrondi flottant qui s'accumule).
+
+Helpers :
+- to_cents(12.345) -> 1235 (arrondi commercial, demi vers le haut)
+- from_cents(1235) -> 12.35
+- format_cents(1235) -> "12.35" ; format_eur(12.35) -> "12.35" (exports CSV)
+"""
+from __future__ import annotations
+
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Optional, Union
+
+from sqlalchemy import Integer
+from sqlalchemy.types import TypeDecorator
+
+Number = Union[int, float, Decimal]
+
+
+def to_cents(value: Optional[Number]) -> int:
+    if value is None:
+        return 0
+    return int(Decimal(str(value)).scaleb(2).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents: Optional[int]) -> float:
+    return (cents or 0) / 100
+
+
+def round_eur(value: Optional[Number]) -> float:
+    """Arrondi au centime (valeur telle qu'elle sera relue en base)."""
+    return from_cents(to_cents(value))
+
+
+def format_cents(cents: Optional[int]) -> str:
+    cents = int(cents or 0)
+    sign = "-" if cents < 0 else ""
+    cents = abs(cents)
+    return f"{sign}{cents // 100}.{cents % 100:02d}"
+
+
+def format_eur(value: Optional[Number]) -> str:
+    return format_cents(to_cents(value))
+
+
+class Money(TypeDecorator):
+    """Montant en euros côté Python, centimes entiers en base."""
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return from_cents(int(round(value)))
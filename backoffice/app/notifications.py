@@ -0,0 +1,205 @@
+"""
+Regroupement des notifications email des bons de commande (récapitulatifs).
+
+Avec NOTIFICATION_DIGEST_WINDOW_SECONDS > 0 :
+- les handlers n'envoient plus l'email d'un événement non urgent (`send_now`) ;
+- toutes les N secondes, `run_digest` relit `bon_commande_events` depuis le dernier
+  curseur et envoie UN email par destinataire avec tous ses événements de la fenêtre ;
+- les types urgents (NOTIFICATION_URGENT_TYPES) partent immédiatement, comme avant,
+  et sont ignorés par le récapitulatif.
+
+Destinataires :
+- événements de la boutique (BC_SOUMIS, BC_REVALIDE)        -> ADMIN_EMAIL
+- événements de l'atelier (BC_RENVOYE, BC_VALIDE, BC_REFUSE) -> email de la boutique
+
+Plusieurs workers : le curseur (`notification_digest_state`) est avancé par un UPDATE
+conditionnel avant l'envoi ; un seul worker envoie un lot donné.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import models
+from .config import NOTIFICATION_DIGEST_WINDOW_SECONDS, NOTIFICATION_URGENT_TYPES
+from .database import SessionLocal
+from .timeline_models import BonCommandeEvent
+from .utils import mailer
+
+DIGEST_NAME = "bc_events"
+BATCH_SIZE = 1000
+
+EVENT_LABELS = {
+    "BC_SOUMIS": "Bon de commande soumis",
+    "BC_REVALIDE": "Bon de commande revalidé par la boutique",
+    "BC_RENVOYE": "Bon de commande renvoyé pour correction",
+    "BC_VALIDE": "Bon de commande validé",
+    "BC_REFUSE": "Bon de commande refusé",
+}
+TO_ADMIN = {"BC_SOUMIS", "BC_REVALIDE"}
+TO_BOUTIQUE = {"BC_RENVOYE", "BC_VALIDE", "BC_REFUSE"}
+
+_stats = {"digests_sent": 0, "events_digested": 0, "runs": 0}
+
+
+def digest_enabled() -> bool:
+    return NOTIFICATION_DIGEST_WINDOW_SECONDS > 0
+
+
+def send_now(event_type: str) -> bool:
+    """True si l'email de cet événement doit partir tout de suite (sinon : récapitulatif).
+
+    Les types sans destinataire de récapitulatif (ex. BC_MAJ_ADMIN, commentaire modifié
+    sans changement de statut) partent toujours immédiatement : le récapitulatif les ignore.
+    """
+    return (
+        not digest_enabled()
+        or event_type in NOTIFICATION_URGENT_TYPES
+        or event_type not in TO_ADMIN | TO_BOUTIQUE
+    )
+
+
+def ensure_digest_state(db: Session) -> None:
+    """Première activation : le curseur part du dernier événement (pas de renvoi de l'historique)."""
+    if db.get(models.NotificationDigestState, DIGEST_NAME) is not None:
+        return
+    start = db.query(func.max(BonCommandeEvent.id)).scalar() or 0
+    db.add(models.NotificationDigestState(name=DIGEST_NAME, last_event_id=start))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Créé entre-temps par un autre worker
+        db.rollback()
+
+
+def _claim_batch(db: Session) -> List[Tuple]:
+    """Lit le lot suivant et avance le curseur ; [] si rien à faire ou lot pris par un autre worker."""
+    ensure_digest_state(db)
+    last_id = db.get(models.NotificationDigestState, DIGEST_NAME).last_event_id
+    rows = (
+        db.query(
+            BonCommandeEvent.id,
+            BonCommandeEvent.event_type,
+            BonCommandeEvent.message,
+            models.Devis.numero_boutique,
+            models.Boutique.nom,
+            models.Boutique.email,
+        )
+        .join(models.BonCommande, BonCommandeEvent.bon_commande_id == models.BonCommande.id)
+        .join(models.Devis, models.BonCommande.devis_id == models.Devis.id)
+        .join(models.Boutique, models.Devis.boutique_id == models.Boutique.id)
+        .filter(BonCommandeEvent.id > last_id)
+        .order_by(BonCommandeEvent.id.asc())
+        .limit(BATCH_SIZE)
+        .all()
+    )
+    if not rows:
+        return []
+
+    claimed = (
+        db.query(models.NotificationDigestState)
+        .filter(
+            models.NotificationDigestState.name == DIGEST_NAME,
+            models.NotificationDigestState.last_event_id == last_id,
+        )
+        .update({models.NotificationDigestState.last_event_id: rows[-1][0]}, synchronize_session=False)
+    )
+    db.commit()
+    return rows if claimed else []
+
+
+def group_by_recipient(rows: List[Tuple], admin_email: str) -> Dict[str, List[Tuple[str, str, Optional[str]]]]:
+    digests: Dict[str, List[Tuple[str, str, Optional[str]]]] = {}
+    for _, event_type, message, numero, boutique_nom, boutique_email in rows:
+        if event_type in NOTIFICATION_URGENT_TYPES:
+            continue  # déjà envoyé immédiatement
+        if event_type in TO_ADMIN:
+            to_email = admin_email
+        elif event_type in TO_BOUTIQUE:
+            to_email = boutique_email
+        else:
+            continue
+        if not to_email:
+            continue
+        ref = f"{boutique_nom}-{numero}"
+        digests.setdefault(to_email, []).append((ref, EVENT_LABELS[event_type], message))
+    return digests
+
+
+def run_digest(db: Session) -> int:
+    """Envoie les récapitulatifs en attente. Retourne le nombre d'emails envoyés."""
+    _stats["runs"] += 1
+    sent = 0
+    while True:
+        rows = _claim_batch(db)
+        if not rows:
+            break
+        for to_email, items in group_by_recipient(rows, mailer.ADMIN_EMAIL).items():
+            mailer.send_bc_digest(to_email, items)
+            sent += 1
+            _stats["events_digested"] += len(items)
+        if len(rows) < BATCH_SIZE:
+            break
+    _stats["digests_sent"] += sent
+    return sent
+
+
+def _run_digest_once() -> int:
+    db = SessionLocal()
+    try:
+        return run_digest(db)
+    finally:
+        db.close()
+
+
+def init_digest() -> None:
+    """Au démarrage (avant la première requête) : aucun événement ne passe entre les mailles."""
+    db = SessionLocal()
+    try:
+        ensure_digest_state(db)
+    finally:
+        db.close()
+
+
+def reset_digest() -> None:
+    """Récapitulatifs désactivés : les emails partent immédiatement, le curseur est oublié
+    (une réactivation repartira du dernier événement, sans renvoyer ceux déjà notifiés)."""
+    db = SessionLocal()
+    try:
+        db.query(models.NotificationDigestState).filter(
+            models.NotificationDigestState.name == DIGEST_NAME
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def digest_loop() -> None:
+    """Tâche de fond (lifespan) : un passage par fenêtre."""
+    while True:
+        await asyncio.sleep(NOTIFICATION_DIGEST_WINDOW_SECONDS)
+        try:
+            await run_in_threadpool(_run_digest_once)
+        except Exception as e:
+            print(f"[NOTIFICATIONS] digest failed: {e!r}")
+
+
+def flush_digest() -> None:
+    """À l'arrêt : envoie ce qui est en attente plutôt que d'attendre le prochain démarrage."""
+    try:
+        _run_digest_once()
+    except Exception as e:
+        print(f"[NOTIFICATIONS] digest flush failed: {e!r}")
+
+
+def digest_stats() -> Dict[str, object]:
+    return {
+        "window_seconds": NOTIFICATION_DIGEST_WINDOW_SECONDS,
+        "urgent_types": sorted(NOTIFICATION_URGENT_TYPES),
+        **_stats,
+    }
@@ -0,0 +1,122 @@
+"""
+Hachage des mots de passe dans un pool de threads dédié.
+
+pbkdf2_sha256 est volontairement coûteux : exécuté directement dans les handlers,
+une rafale de logins occupe tous les threads du serveur et affame le reste de l'API.
+
+Ici :
+- le calcul tourne dans un ThreadPoolExecutor borné (PASSWORD_HASH_WORKERS) ;
+- au-delà de PASSWORD_HASH_MAX_PENDING demandes en cours, on refuse tout de suite
+  (HTTP 503 + Retry-After) au lieu d'empiler des threads bloqués ;
+- le coût (PASSWORD_HASH_ROUNDS) est configurable ; les hash stockés avec un autre
+  nombre de rounds sont re-calculés au prochain login réussi.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from .config import PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_ROUNDS, PASSWORD_HASH_WORKERS
+
+T = TypeVar("T")
+
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=PASSWORD_HASH_ROUNDS,
+    # min == max : tout hash hors de ce coût est signalé par needs_update()
+    pbkdf2_sha256__min_rounds=PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__max_rounds=PASSWORD_HASH_ROUNDS,
+)
+
+
+class PasswordHasherBusy(HTTPException):
+    """File d'attente du hachage pleine : on échoue vite plutôt que d'attendre."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=503,
+            detail="Service momentanément surchargé, veuillez réessayer.",
+            headers={"Retry-After": "2"},
+        )
+
+
+class PasswordHasher:
+    def __init__(self, max_workers: int, max_pending: int) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers),
+            thread_name_prefix="pwd-hash",
+        )
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._lock = threading.Lock()
+        self._stats: Dict[str, float] = {
+            "submitted": 0,
+            "completed": 0,
+            "rejected": 0,
+            "in_flight": 0,
+            "max_in_flight": 0,
+            "queue_wait_ms_total": 0.0,
+            "run_ms_total": 0.0,
+        }
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+
+    def _run(self, fn: Callable[..., T], *args) -> T:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise PasswordHasherBusy()
+
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["in_flight"] += 1
+            self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._stats["in_flight"])
+
+        queued_at = time.perf_counter()
+        timings: Dict[str, float] = {}
+
+        def job() -> T:
+            started = time.perf_counter()
+            timings["wait"] = started - queued_at
+            try:
+                return fn(*args)
+            finally:
+                timings["run"] = time.perf_counter() - started
+
+        try:
+            return self._executor.submit(job).result()
+        finally:
+            self._slots.release()
+            with self._lock:
+                self._stats["in_flight"] -= 1
+                self._stats["completed"] += 1
+                self._stats["queue_wait_ms_total"] += timings.get("wait", 0.0) * 1000
+                self._stats["run_ms_total"] += timings.get("run", 0.0) * 1000
+
+    def hash(self, password: str) -> str:
+        return self._run(pwd_context.hash, password)
+
+    def verify(self, plain: str, hashed: str) -> bool:
+        return self._run(pwd_context.verify, plain, hashed)
+
+    def verify_and_update(self, plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return self._run(pwd_context.verify_and_update, plain, hashed)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            data = dict(self._stats)
+        done = data["completed"] or 1
+        data["avg_queue_wait_ms"] = round(data.pop("queue_wait_ms_total") / done, 2)
+        data["avg_run_ms"] = round(data.pop("run_ms_total") / done, 2)
+        data["max_workers"] = self.max_workers
+        data["max_pending"] = self.max_pending
+        data["rounds"] = PASSWORD_HASH_ROUNDS
+        return data
+
+
+hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
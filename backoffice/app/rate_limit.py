@@ -0,0 +1,226 @@
+"""
+Limitation des tentatives de login (fenêtre glissante).
+
+On compte les échecs par clé ("ip:<adresse>" et "email:<adresse>") sur
+LOGIN_RATE_LIMIT_WINDOW_SECONDS. Dès qu'une clé dépasse son quota, les logins
+sont refusés AVANT toute requête SQL sur le compte et tout calcul pbkdf2.
+
+Backends :
+- "memory" : par process, borné (LRU sur LOGIN_RATE_LIMIT_MAX_KEYS clés) ;
+- "db"     : table `login_attempts`, partagée entre workers uvicorn.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+from .config import (
+    LOGIN_MAX_FAILURES_PER_EMAIL,
+    LOGIN_MAX_FAILURES_PER_IP,
+    LOGIN_RATE_LIMIT_BACKEND,
+    LOGIN_RATE_LIMIT_MAX_KEYS,
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+    TRUST_FORWARDED_FOR,
+    TRUSTED_PROXY_HOPS,
+)
+
+
+class TooManyLoginAttempts(HTTPException):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(
+            status_code=429,
+            detail="Trop de tentatives de connexion. Réessayez plus tard.",
+            headers={"Retry-After": str(max(1, retry_after))},
+        )
+        self.retry_after = retry_after
+
+
+class MemoryBackend:
+    """Fenêtres glissantes en mémoire, éviction LRU au-delà de max_keys."""
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max(1, max_keys)
+        self._hits: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self, key: str, window: int, now: float) -> Optional[Deque[float]]:
+        hits = self._hits.get(key)
+        if hits is None:
+            return None
+        limit = now - window
+        while hits and hits[0] <= limit:
+            hits.popleft()
+        if not hits:
+            del self._hits[key]
+            return None
+        self._hits.move_to_end(key)
+        return hits
+
+    def count(self, key: str, window: int) -> tuple[int, float]:
+        """Retourne (nb d'échecs dans la fenêtre, timestamp du plus ancien)."""
+        now = time.time()
+        with self._lock:
+            hits = self._prune(key, window, now)
+            if not hits:
+                return 0, now
+            return len(hits), hits[0]
+
+    def add(self, key: str, window: int) -> None:
+        now = time.time()
+        with self._lock:
+            hits = self._prune(key, window, now)
+            if hits is None:
+                hits = deque()
+                self._hits[key] = hits
+            hits.append(now)
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._hits.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._hits)
+
+
+class DatabaseBackend:
+    """Fenêtres glissantes dans la table `login_attempts` (multi-workers)."""
+
+    def __init__(self) -> None:
+        from .database import SessionLocal, engine
+        from .models import LoginAttempt
+
+        self._session_factory = SessionLocal
+        self._model = LoginAttempt
+        LoginAttempt.__table__.create(bind=engine, checkfirst=True)
+
+    def count(self, key: str, window: int) -> tuple[int, float]:
+        from sqlalchemy import func
+
+        since = datetime.utcnow() - timedelta(seconds=window)
+        db = self._session_factory()
+        try:
+            n, oldest = (
+                db.query(func.count(self._model.id), func.min(self._model.created_at))
+                .filter(self._model.key == key, self._model.created_at > since)
+                .one()
+            )
+        finally:
+            db.close()
+        if not n:
+            return 0, time.time()
+        # created_at est stocké en UTC naïf
+        return int(n), (oldest - datetime(1970, 1, 1)).total_seconds()
+
+    def add(self, key: str, window: int) -> None:
+        since = datetime.utcnow() - timedelta(seconds=window)
+        db = self._session_factory()
+        try:
+            db.query(self._model).filter(
+                self._model.key == key, self._model.created_at <= since
+            ).delete(synchronize_session=False)
+            db.add(self._model(key=key))
+            db.commit()
+        finally:
+            db.close()
+
+    def reset(self, key: str) -> None:
+        db = self._session_factory()
+        try:
+            db.query(self._model).filter(self._model.key == key).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+class LoginRateLimiter:
+    def __init__(self, backend, window_seconds: int, limits: Dict[str, int]) -> None:
+        self.backend = backend
+        self.window = window_seconds
+        self.limits = limits
+        self.rejected = 0
+
+    @staticmethod
+    def keys_for(ip: Optional[str], email: Optional[str]) -> Dict[str, str]:
+        keys: Dict[str, str] = {}
+        if ip:
+            keys["ip"] = f"ip:{ip}"
+        if email:
+            keys["email"] = f"email:{email.strip().lower()}"
+        return keys
+
+    def check(self, keys: Dict[str, str]) -> None:
+        """Lève TooManyLoginAttempts si une des clés a atteint son quota."""
+        now = time.time()
+        for kind, key in keys.items():
+            n, oldest = self.backend.count(key, self.window)
+            if n >= self.limits[kind]:
+                self.rejected += 1
+                raise TooManyLoginAttempts(math.ceil(oldest + self.window - now))
+
+    def record_failure(self, keys: Dict[str, str]) -> None:
+        for key in keys.values():
+            self.backend.add(key, self.window)
+
+    def record_success(self, keys: Dict[str, str]) -> None:
+        # L'IP garde son historique : un succès ne doit pas blanchir un balayage
+        if "email" in keys:
+            self.backend.reset(keys["email"])
+
+    def stats(self) -> Dict[str, object]:
+        data: Dict[str, object] = {
+            "backend": type(self.backend).__name__,
+            "window_seconds": self.window,
+            "limits": dict(self.limits),
+            "rejected": self.rejected,
+        }
+        if isinstance(self.backend, MemoryBackend):
+            data["tracked_keys"] = len(self.backend)
+        return data
+
+
+def client_ip(request: Request) -> Optional[str]:
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            # Chaque proxy ajoute l'adresse qu'il voit à droite : les entrées de gauche
+            # viennent du client (falsifiables), on prend celle ajoutée par notre premier proxy
+            hops = [h.strip() for h in forwarded.split(",") if h.strip()]
+            if hops:
+                return hops[max(0, len(hops) - TRUSTED_PROXY_HOPS)]
+    return request.client.host if request.client else None
+
+
+def _build_backend():
+    if LOGIN_RATE_LIMIT_BACKEND == "db":
+        return DatabaseBackend()
+    return MemoryBackend(LOGIN_RATE_LIMIT_MAX_KEYS)
+
+
+_limiter: Optional[LoginRateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_login_limiter() -> LoginRateLimiter:
+    """Instance unique, créée au premier login (le backend "db" touche la base)."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = LoginRateLimiter(
+                    _build_backend(),
+                    LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+                    {"ip": LOGIN_MAX_FAILURES_PER_IP, "email": LOGIN_MAX_FAILURES_PER_EMAIL},
+                )
+    return _limiter
+
+
+def login_keys(request: Request, email: Optional[str]) -> Dict[str, str]:
+    return LoginRateLimiter.keys_for(client_ip(request), email)
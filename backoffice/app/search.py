@@ -0,0 +1,233 @@
+"""
+Recherche plein texte admin (boutiques, devis, commentaires de bons de commande).
+
+SQLite : table virtuelle FTS5 `search_index`, tenue à jour par des triggers
+(installés par la migration 005_search_fts) :
+- une ligne par boutique (rowid = id * 2 + 1) : nom, email, gérant ;
+- une ligne par devis (rowid = id * 2) : descriptions des lignes, configuration,
+  commentaires admin / boutique du bon de commande.
+Le rowid dérivé de l'id permet de remplacer un document sans parcourir l'index.
+
+Autres bases (PostgreSQL) : repli sur des ILIKE, sans classement.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from . import models
+
+MAX_PER_PAGE = 100
+
+# Poids bm25 par colonne : boutique_id (non indexée), boutique, lignes, configuration, commentaires
+BM25_WEIGHTS = "0.0, 10.0, 5.0, 1.0, 3.0"
+
+_DEVIS_DOC = """
+SELECT d.id * 2, d.boutique_id, '',
+       COALESCE((SELECT group_concat(l.description, ' ') FROM lignes_devis l WHERE l.devis_id = d.id), ''),
+       COALESCE(d.configuration_json, ''),
+       COALESCE((SELECT COALESCE(bc.commentaire_admin, '') || ' ' || COALESCE(bc.commentaire_boutique, '')
+                 FROM bons_commandes bc WHERE bc.devis_id = d.id), '')
+FROM devis d
+"""
+
+_BOUTIQUE_DOC = """
+SELECT b.id * 2 + 1, b.id, b.nom || ' ' || b.email || ' ' || COALESCE(b.gerant, ''), '', '', ''
+FROM boutiques b
+"""
+
+_INSERT = "INSERT INTO search_index (rowid, boutique_id, boutique, lignes, configuration, commentaires) "
+
+
+def _refresh_devis(devis_id: str) -> str:
+    return (
+        f"DELETE FROM search_index WHERE rowid = {devis_id} * 2;\n"
+        f"{_INSERT}{_DEVIS_DOC} WHERE d.id = {devis_id};"
+    )
+
+
+def _refresh_boutique(boutique_id: str) -> str:
+    return (
+        f"DELETE FROM search_index WHERE rowid = {boutique_id} * 2 + 1;\n"
+        f"{_INSERT}{_BOUTIQUE_DOC} WHERE b.id = {boutique_id};"
+    )
+
+
+# (nom, table, événement, corps)
+_TRIGGERS: List[Tuple[str, str, str, str]] = [
+    ("boutiques_ai", "boutiques", "AFTER INSERT", _refresh_boutique("NEW.id")),
+    ("boutiques_au", "boutiques", "AFTER UPDATE OF nom, email, gerant", _refresh_boutique("NEW.id")),
+    ("boutiques_ad", "boutiques", "AFTER DELETE", _refresh_boutique("OLD.id")),
+    ("devis_ai", "devis", "AFTER INSERT", _refresh_devis("NEW.id")),
+    ("devis_au", "devis", "AFTER UPDATE OF configuration_json", _refresh_devis("NEW.id")),
+    ("devis_ad", "devis", "AFTER DELETE", _refresh_devis("OLD.id")),
+    ("lignes_ai", "lignes_devis", "AFTER INSERT", _refresh_devis("NEW.devis_id")),
+    (
+        "lignes_au",
+        "lignes_devis",
+        "AFTER UPDATE OF description, devis_id",
+        _refresh_devis("OLD.devis_id") + "\n" + _refresh_devis("NEW.devis_id"),
+    ),
+    ("lignes_ad", "lignes_devis", "AFTER DELETE", _refresh_devis("OLD.devis_id")),
+    ("bc_ai", "bons_commandes", "AFTER INSERT", _refresh_devis("NEW.devis_id")),
+    (
+        "bc_au",
+        "bons_commandes",
+        "AFTER UPDATE OF commentaire_admin, commentaire_boutique",
+        _refresh_devis("NEW.devis_id"),
+    ),
+    ("bc_ad", "bons_commandes", "AFTER DELETE", _refresh_devis("OLD.devis_id")),
+]
+
+
+def install_search_index(conn: Connection) -> None:
+    """Crée la table FTS5 et ses triggers (SQLite uniquement), puis indexe l'existant."""
+    if conn.dialect.name != "sqlite":
+        return
+    conn.execute(
+        text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+            "boutique_id UNINDEXED, boutique, lignes, configuration, commentaires, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    )
+    for name, table, event, body in _TRIGGERS:
+        conn.execute(text(f"DROP TRIGGER IF EXISTS trg_search_{name}"))
+        conn.exec_driver_sql(f"CREATE TRIGGER trg_search_{name} {event} ON {table} BEGIN\n{body}\nEND")
+    rebuild_search_index(conn)
+
+
+def rebuild_search_index(conn: Connection) -> None:
+    conn.execute(text("DELETE FROM search_index"))
+    conn.execute(text(_INSERT + _BOUTIQUE_DOC))
+    conn.execute(text(_INSERT + _DEVIS_DOC))
+
+
+def fts_query(q: str) -> Optional[str]:
+    """Saisie libre -> requête FTS5 : chaque mot en préfixe, tous requis."""
+    words = re.findall(r"\w+", q or "")
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def _ranked_ids(db: Session, match: str, limit: int, offset: int) -> Tuple[int, List[Tuple[int, str]]]:
+    total = db.execute(
+        text("SELECT count(*) FROM search_index WHERE search_index MATCH :q"), {"q": match}
+    ).scalar()
+    rows = db.execute(
+        text(
+            "SELECT rowid, snippet(search_index, -1, '[', ']', '…', 12) "
+            "FROM search_index WHERE search_index MATCH :q "
+            f"ORDER BY bm25(search_index, {BM25_WEIGHTS}) LIMIT :limit OFFSET :offset"
+        ),
+        {"q": match, "limit": limit, "offset": offset},
+    ).all()
+    return total or 0, [(rowid, extrait) for rowid, extrait in rows]
+
+
+def _like_ids(db: Session, q: str, limit: int, offset: int) -> Tuple[int, List[Tuple[int, str]]]:
+    """Repli hors SQLite : boutiques puis devis, sans classement."""
+    pattern = f"%{q.strip()}%"
+    boutiques = db.query(models.Boutique.id).filter(
+        or_(
+            models.Boutique.nom.ilike(pattern),
+            models.Boutique.email.ilike(pattern),
+            models.Boutique.gerant.ilike(pattern),
+        )
+    )
+    devis = (
+        db.query(models.Devis.id)
+        .outerjoin(models.BonCommande, models.BonCommande.devis_id == models.Devis.id)
+        .filter(
+            or_(
+                models.Devis.lignes.any(models.LigneDevis.description.ilike(pattern)),
+                models.Devis.configuration_json.ilike(pattern),
+                models.BonCommande.commentaire_admin.ilike(pattern),
+                models.BonCommande.commentaire_boutique.ilike(pattern),
+            )
+        )
+    )
+    ids = [(b_id * 2 + 1, "") for (b_id,) in boutiques.order_by(models.Boutique.id)]
+    ids += [(d_id * 2, "") for (d_id,) in devis.order_by(models.Devis.id.desc())]
+    return len(ids), ids[offset:offset + limit]
+
+
+def _statut(value) -> Optional[str]:
+    return value.value if hasattr(value, "value") else value
+
+
+def search(db: Session, q: str, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+    page = max(1, page)
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    offset = (page - 1) * per_page
+
+    match = fts_query(q)
+    if match is None:
+        total, hits = 0, []
+    elif db.get_bind().dialect.name == "sqlite":
+        total, hits = _ranked_ids(db, match, per_page, offset)
+    else:
+        total, hits = _like_ids(db, q, per_page, offset)
+
+    devis_ids = [rowid // 2 for rowid, _ in hits if rowid % 2 == 0]
+    boutique_ids = [rowid // 2 for rowid, _ in hits if rowid % 2 == 1]
+
+    devis = {}
+    if devis_ids:
+        rows = (
+            db.query(models.Devis, models.Boutique.nom, models.BonCommande.statut)
+            .join(models.Boutique, models.Devis.boutique_id == models.Boutique.id)
+            .outerjoin(models.BonCommande, models.BonCommande.devis_id == models.Devis.id)
+            .filter(models.Devis.id.in_(devis_ids))
+            .all()
+        )
+        devis = {d.id: (d, nom, bc_statut) for d, nom, bc_statut in rows}
+    boutiques = {}
+    if boutique_ids:
+        boutiques = {
+            b.id: b for b in db.query(models.Boutique).filter(models.Boutique.id.in_(boutique_ids)).all()
+        }
+
+    results: List[Dict[str, Any]] = []
+    for rowid, extrait in hits:
+        if rowid % 2 == 0:
+            found = devis.get(rowid // 2)
+            if found is None:
+                continue
+            d, boutique_nom, bc_statut = found
+            results.append(
+                {
+                    "type": "devis",
+                    "id": d.id,
+                    "reference": f"{boutique_nom}-{d.numero_boutique}",
+                    "boutique_id": d.boutique_id,
+                    "boutique_nom": boutique_nom,
+                    "statut": _statut(d.statut),
+                    "bon_commande_statut": _statut(bc_statut),
+                    "date_creation": d.date_creation.isoformat() if d.date_creation else None,
+                    "extrait": extrait,
+                    "url": f"/admin/boutiques/{d.boutique_id}",
+                }
+            )
+        else:
+            b = boutiques.get(rowid // 2)
+            if b is None:
+                continue
+            results.append(
+                {
+                    "type": "boutique",
+                    "id": b.id,
+                    "nom": b.nom,
+                    "email": b.email,
+                    "gerant": b.gerant,
+                    "extrait": extrait,
+                    "url": f"/admin/boutiques/{b.id}",
+                }
+            )
+
+    return {"q": q, "page": page, "per_page": per_page, "total": total, "results": results}
@@ -0,0 +1,200 @@
+"""
+Sessions admin côté serveur (optionnel, ADMIN_SESSION_BACKEND).
+
+Avec SessionMiddleware (backend "cookie", par défaut), chaque requête décode et
+vérifie la signature du cookie, puis le ré-signe et le renvoie dans chaque
+réponse. Ici le cookie ne contient qu'un identifiant aléatoire opaque :
+- lecture : simple lookup par clé (dict en mémoire ou clé primaire en base) ;
+- écriture / Set-Cookie : uniquement si la session a réellement changé.
+
+Backends :
+- "memory" : par process (un seul worker uvicorn) ;
+- "db"     : table `admin_sessions`, partagée entre workers.
+"""
+from __future__ import annotations
+
+import json
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class ServerSession(dict):
+    """dict de session qui mémorise un clear() (rotation d'id anti-fixation)."""
+
+    cleared = False
+
+    def clear(self) -> None:
+        self.cleared = True
+        super().clear()
+
+
+class MemorySessionStore:
+    blocking = False
+
+    def __init__(self, max_entries: int = 10000) -> None:
+        self.max_entries = max(1, max_entries)
+        self._data: Dict[str, tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, sid: str) -> Optional[Dict[str, Any]]:
+        entry = self._data.get(sid)
+        if not entry:
+            return None
+        if entry[0] <= time.time():
+            self.delete(sid)
+            return None
+        return json.loads(entry[1])
+
+    def set(self, sid: str, data: Dict[str, Any], max_age: int) -> None:
+        now = time.time()
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                for key in [k for k, (exp, _) in self._data.items() if exp <= now]:
+                    del self._data[key]
+                while len(self._data) >= self.max_entries:
+                    del self._data[next(iter(self._data))]
+            self._data[sid] = (now + max_age, json.dumps(data))
+
+    def delete(self, sid: str) -> None:
+        with self._lock:
+            self._data.pop(sid, None)
+
+
+class DatabaseSessionStore:
+    blocking = True
+
+    def __init__(self) -> None:
+        from .database import SessionLocal, engine
+        from .models import AdminSession
+
+        self._session_factory = SessionLocal
+        self._model = AdminSession
+        AdminSession.__table__.create(bind=engine, checkfirst=True)
+
+    def get(self, sid: str) -> Optional[Dict[str, Any]]:
+        db = self._session_factory()
+        try:
+            row = db.get(self._model, sid)
+            if not row:
+                return None
+            if row.expires_at <= datetime.utcnow():
+                db.delete(row)
+                db.commit()
+                return None
+            return json.loads(row.data)
+        finally:
+            db.close()
+
+    def set(self, sid: str, data: Dict[str, Any], max_age: int) -> None:
+        db = self._session_factory()
+        try:
+            now = datetime.utcnow()
+            row = db.get(self._model, sid)
+            if row is None:
+                row = self._model(id=sid)
+                db.add(row)
+                # Nettoyage opportuniste des sessions expirées à la création
+                db.query(self._model).filter(self._model.expires_at <= now).delete(
+                    synchronize_session=False
+                )
+            row.data = json.dumps(data)
+            row.expires_at = now + timedelta(seconds=max_age)
+            db.commit()
+        finally:
+            db.close()
+
+    def delete(self, sid: str) -> None:
+        db = self._session_factory()
+        try:
+            db.query(self._model).filter(self._model.id == sid).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+class ServerSessionMiddleware:
+    """Équivalent de SessionMiddleware, données stockées côté serveur."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store,
+        session_cookie: str = "session",
+        max_age: int = 14 * 24 * 60 * 60,
+        path: str = "/",
+        same_site: str = "lax",
+        https_only: bool = False,
+    ) -> None:
+        self.app = app
+        self.store = store
+        self.session_cookie = session_cookie
+        self.max_age = max_age
+        self.path = path
+        self.security_flags = "httponly; samesite=" + same_site
+        if https_only:
+            self.security_flags += "; secure"
+
+    async def _call_store(self, method, *args):
+        if self.store.blocking:
+            return await run_in_threadpool(method, *args)
+        return method(*args)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        connection = HTTPConnection(scope)
+        sid = connection.cookies.get(self.session_cookie)
+        initial: Optional[Dict[str, Any]] = None
+        if sid:
+            initial = await self._call_store(self.store.get, sid)
+        session = ServerSession(initial or {})
+        scope["session"] = session
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                new_sid: Optional[str] = None
+                expire_cookie = False
+
+                if session:
+                    if not initial or session.cleared:
+                        if sid and initial is not None:
+                            await self._call_store(self.store.delete, sid)
+                        new_sid = secrets.token_urlsafe(32)
+                        await self._call_store(self.store.set, new_sid, dict(session), self.max_age)
+                    elif dict(session) != initial:
+                        await self._call_store(self.store.set, sid, dict(session), self.max_age)
+                elif initial:
+                    await self._call_store(self.store.delete, sid)
+                    expire_cookie = True
+
+                if new_sid or expire_cookie:
+                    headers = MutableHeaders(scope=message)
+                    if new_sid:
+                        value = f"{self.session_cookie}={new_sid}; path={self.path}; Max-Age={self.max_age}; {self.security_flags}"
+                    else:
+                        value = (
+                            f"{self.session_cookie}=null; path={self.path}; "
+                            f"expires=Thu, 01 Jan 1970 00:00:00 GMT; {self.security_flags}"
+                        )
+                    headers.append("Set-Cookie", value)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def build_session_store(backend: str):
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "db":
+        return DatabaseSessionStore()
+    return None
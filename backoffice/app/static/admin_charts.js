@@ -53,7 +53,83 @@ async function loadCaParBoutique() {
     }
 }
 
+function showFunnelComputedAt(computedAt) {
+    const el = document.getElementById("funnelComputedAt");
+    if (!el) return;
+    el.textContent = computedAt
+        ? `Statistiques de conversion calculées le ${computedAt.slice(0, 16).replace("T", " ")} (UTC)`
+        : "Statistiques de conversion pas encore calculées.";
+}
+
+async function loadFunnelParMois() {
+    const canvas = document.getElementById("funnelMoisChart");
+    if (!canvas) return;
+    try {
+        const res = await fetch("/admin/api/funnel_par_mois");
+        if (!res.ok) return;
+        const json = await res.json();
+        showFunnelComputedAt(json.computed_at);
+        const ctx = canvas.getContext("2d");
+        new Chart(ctx, {
+            type: "bar",
+            data: {
+                labels: json.labels,
+                datasets: [
+                    { label: "Devis", data: json.rows.map(r => r.nb_devis) },
+                    { label: "Acceptés", data: json.rows.map(r => r.nb_acceptes) },
+                    { label: "BC validés", data: json.rows.map(r => r.nb_bc_valides) },
+                    {
+                        label: "Panier moyen accepté (€)",
+                        type: "line",
+                        yAxisID: "euros",
+                        data: json.rows.map(r => r.panier_moyen_acceptes)
+                    }
+                ]
+            },
+            options: {
+                responsive: true,
+                scales: {
+                    y: { beginAtZero: true },
+                    euros: { position: "right", beginAtZero: true, grid: { drawOnChartArea: false } }
+                }
+            }
+        });
+    } catch (e) {
+        console.error(e);
+    }
+}
+
+async function loadFunnelParBoutique() {
+    const canvas = document.getElementById("funnelBoutiqueChart");
+    if (!canvas) return;
+    try {
+        const res = await fetch("/admin/api/funnel_par_boutique");
+        if (!res.ok) return;
+        const json = await res.json();
+        const ctx = canvas.getContext("2d");
+        new Chart(ctx, {
+            type: "bar",
+            data: {
+                labels: json.labels,
+                datasets: [
+                    { label: "Taux d'acceptation (%)", data: json.rows.map(r => r.taux_acceptation) },
+                    { label: "Taux de validation BC (%)", data: json.rows.map(r => r.taux_validation) },
+                    { label: "Devis → BC validé (%)", data: json.rows.map(r => r.taux_global) }
+                ]
+            },
+            options: {
+                responsive: true,
+                scales: { y: { beginAtZero: true, max: 100 } }
+            }
+        });
+    } catch (e) {
+        console.error(e);
+    }
+}
+
 document.addEventListener("DOMContentLoaded", () => {
     loadDevisParStatut();
     loadCaParBoutique();
+    loadFunnelParMois();
+    loadFunnelParBoutique();
 });
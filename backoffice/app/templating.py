@@ -0,0 +1,54 @@
+"""
+Environnement Jinja unique pour toutes les pages HTML (admin + login) et les emails.
+
+- un seul Environment => un seul cache de templates compilés par process ;
+- FileSystemBytecodeCache : les workers suivants (et les redémarrages) ne
+  re-parsent pas les templates ;
+- auto_reload désactivé en production (pas de stat() du fichier à chaque rendu) ;
+- precompile_templates() est appelé au démarrage de l'application ;
+- emails : templates emails/*.html + emails/*.txt (voir app.mail_templates).
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+
+from .config import TEMPLATE_AUTO_RELOAD, TEMPLATE_BYTECODE_CACHE_DIR
+from .csrf import get_or_create_csrf_token
+from .money import format_eur
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+
+def _bytecode_cache() -> FileSystemBytecodeCache:
+    directory = TEMPLATE_BYTECODE_CACHE_DIR or os.path.join(tempfile.gettempdir(), "constance-jinja-cache")
+    os.makedirs(directory, exist_ok=True)
+    return FileSystemBytecodeCache(directory)
+
+
+env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=select_autoescape(["html", "htm", "xml"]),
+    bytecode_cache=_bytecode_cache(),
+    auto_reload=TEMPLATE_AUTO_RELOAD,
+    cache_size=-1,
+)
+
+# Ajouter get_csrf_token comme fonction globale dans les templates
+env.globals["get_csrf_token"] = get_or_create_csrf_token
+# Montants : même arrondi au centime que les exports CSV
+env.filters["format_eur"] = format_eur
+
+templates = Jinja2Templates(env=env)
+
+
+def precompile_templates() -> int:
+    """Compile tous les templates (cache mémoire + bytecode). Retourne le nombre compilé."""
+    count = 0
+    for name in env.list_templates(extensions=["html", "txt"]):
+        env.get_template(name)
+        count += 1
+    return count
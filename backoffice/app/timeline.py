@@ -1,7 +1,10 @@
-from typing import Optional
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session, aliased
 
+from .bc_durations import record_transitions
 from .timeline_models import BonCommandeEvent
 
 
@@ -15,15 +18,39 @@ def create_event(
 ) -> BonCommandeEvent:
     ev = BonCommandeEvent(
         bon_commande_id=bon_commande_id,
+        created_at=datetime.utcnow(),
         actor_type=actor_type,
         actor_id=actor_id,
         event_type=event_type,
         message=message.strip() if isinstance(message, str) and message.strip() else None,
     )
     db.add(ev)
+    record_transitions(db, [(bon_commande_id, event_type, ev.created_at)])
     return ev
 
 
+def create_events_bulk(db: Session, events: List[Dict]) -> List[BonCommandeEvent]:
+    """Même chose que create_event pour N bons : un seul INSERT multi-lignes (ids renvoyés)."""
+    if not events:
+        return []
+    now = datetime.utcnow()
+    rows = []
+    for e in events:
+        message = e.get("message")
+        rows.append(
+            {
+                "bon_commande_id": e["bon_commande_id"],
+                "actor_type": e["actor_type"],
+                "actor_id": e.get("actor_id"),
+                "event_type": e["event_type"],
+                "message": message.strip() if isinstance(message, str) and message.strip() else None,
+                "created_at": now,
+            }
+        )
+    record_transitions(db, [(r["bon_commande_id"], r["event_type"], now) for r in rows])
+    return list(db.scalars(insert(BonCommandeEvent).returning(BonCommandeEvent), rows).all())
+
+
 def list_events(db: Session, bon_commande_id: int):
     return (
         db.query(BonCommandeEvent)
@@ -31,3 +58,69 @@ def list_events(db: Session, bon_commande_id: int):
         .order_by(BonCommandeEvent.created_at.asc(), BonCommandeEvent.id.asc())
         .all()
     )
+
+
+def list_archived_events(db: Session, bon_commande_id: int):
+    from .archive_models import BonCommandeEventArchive
+
+    return (
+        db.query(BonCommandeEventArchive)
+        .filter(BonCommandeEventArchive.bon_commande_id == bon_commande_id)
+        .order_by(BonCommandeEventArchive.created_at.asc(), BonCommandeEventArchive.id.asc())
+        .all()
+    )
+
+
+class LatestEvent(NamedTuple):
+    event: BonCommandeEvent
+    nb_events: int
+
+
+# Taille des lots d'ids (limite de paramètres liés de SQLite)
+LATEST_EVENTS_CHUNK = 500
+
+
+def latest_events(db: Session, bon_commande_ids: Iterable[int]) -> Dict[int, LatestEvent]:
+    """Dernier événement et nombre d'événements de chaque BC, en une requête par lot.
+
+    row_number() / count() sur la partition bon_commande_id : l'index
+    (bon_commande_id, created_at, id) fournit l'ordre, sans requête par BC.
+    Les BC sans historique sont absents du résultat.
+    """
+    ids = sorted({int(i) for i in bon_commande_ids})
+    result: Dict[int, LatestEvent] = {}
+    for start in range(0, len(ids), LATEST_EVENTS_CHUNK):
+        chunk = ids[start:start + LATEST_EVENTS_CHUNK]
+        ranked = (
+            select(
+                BonCommandeEvent,
+                func.row_number()
+                .over(
+                    partition_by=BonCommandeEvent.bon_commande_id,
+                    order_by=(BonCommandeEvent.created_at.desc(), BonCommandeEvent.id.desc()),
+                )
+                .label("rang"),
+                func.count().over(partition_by=BonCommandeEvent.bon_commande_id).label("nb_events"),
+            )
+            .where(BonCommandeEvent.bon_commande_id.in_(chunk))
+            .subquery()
+        )
+        ev = aliased(BonCommandeEvent, ranked)
+        rows = db.execute(select(ev, ranked.c.nb_events).where(ranked.c.rang == 1)).all()
+        for event, nb_events in rows:
+            result[event.bon_commande_id] = LatestEvent(event, nb_events)
+    return result
+
+
+def latest_event_public(latest: Optional[LatestEvent]) -> Optional[Dict]:
+    if latest is None:
+        return None
+    ev = latest.event
+    return {
+        "id": ev.id,
+        "event_type": ev.event_type,
+        "actor_type": ev.actor_type,
+        "message": ev.message,
+        "created_at": ev.created_at.isoformat() if ev.created_at else None,
+        "nb_events": latest.nb_events,
+    }
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import relationship
 
 from .database import Base
@@ -8,9 +8,14 @@ from .database import Base
 
 class BonCommandeEvent(Base):
     __tablename__ = "bon_commande_events"
+    # Historique d'un BC trié par date sans tri en mémoire ; couvre aussi le dernier événement par BC
+    __table_args__ = (
+        Index("ix_bon_commande_events_bc_created", "bon_commande_id", "created_at", "id"),
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    bon_commande_id = Column(Integer, ForeignKey("bons_commandes.id"), index=True, nullable=False)
+    bon_commande_id = Column(Integer, ForeignKey("bons_commandes.id"), nullable=False)
 
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     actor_type = Column(String(20), nullable=False)
@@ -0,0 +1,25 @@
+"""
+Archive à la demande les devis clos (même traitement que la tâche de fond, voir app.archive).
+
+Usage :
+    PYTHONPATH=/app python scripts/archive.py --days 730
+"""
+import argparse
+
+from app.archive import run_archival
+from app.config import ARCHIVE_AFTER_DAYS
+
+
+def archive():
+    parser = argparse.ArgumentParser(description="Archive les devis clos (tables *_archive).")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="âge minimal en jours (défaut : ARCHIVE_AFTER_DAYS)")
+    args = parser.parse_args()
+    if args.days <= 0:
+        print("Archivage désactivé (ARCHIVE_AFTER_DAYS=0) : préciser --days.")
+        return
+    count = run_archival(after_days=args.days)
+    print(f"{count} devis archivé(s).")
+
+
+if __name__ == "__main__":
+    archive()
@@ -0,0 +1,72 @@
+"""
+Renseigne la décomposition des prix (HT / TVA / TTC partenaire et client,
+marges et taux de TVA) sur les devis et bons de commande qui ne l'ont pas encore.
+
+Les valeurs sont calculées avec les MARGE_* / TVA_RATE actuellement configurés :
+lancer ce script avec les mêmes variables d'environnement que l'API.
+Les lignes déjà renseignées ne sont jamais recalculées.
+
+Usage :
+    PYTHONPATH=/app python scripts/backfill_prix.py
+"""
+from app.database import SessionLocal
+from app import models
+from app.boutique.pricing import apply_prix_devis, compute_prix_boutique_et_client
+from app.migrations import run_migrations
+
+BATCH_SIZE = 500
+
+
+def backfill():
+    run_migrations()
+    db = SessionLocal()
+    try:
+        nb_devis = 0
+        while True:
+            batch = (
+                db.query(models.Devis)
+                .filter(models.Devis.prix_client_ttc.is_(None))
+                .order_by(models.Devis.id)
+                .limit(BATCH_SIZE)
+                .all()
+            )
+            if not batch:
+                break
+            for devis in batch:
+                apply_prix_devis(devis)
+            db.commit()
+            nb_devis += len(batch)
+
+        nb_bons = 0
+        while True:
+            rows = (
+                db.query(models.BonCommande, models.Devis)
+                .join(models.Devis, models.BonCommande.devis_id == models.Devis.id)
+                .filter(models.BonCommande.montant_client_ttc.is_(None))
+                .order_by(models.BonCommande.id)
+                .limit(BATCH_SIZE)
+                .all()
+            )
+            if not rows:
+                break
+            for bon, devis in rows:
+                # montant_boutique_ht / ttc et has_tva (figés à la soumission) restent inchangés
+                prix = compute_prix_boutique_et_client(devis)
+                bon.montant_boutique_tva = prix["partenaire_tva"]
+                bon.montant_client_ht = prix["client_ht"]
+                bon.montant_client_tva = prix["client_tva"]
+                bon.montant_client_ttc = prix["client_ttc"]
+                bon.marge_creatrice = devis.marge_creatrice
+                bon.marge_boutique = devis.marge_boutique
+                bon.tva_rate = devis.tva_rate
+            db.commit()
+            nb_bons += len(rows)
+
+        print(f"Devis mis à jour : {nb_devis}")
+        print(f"Bons de commande mis à jour : {nb_bons}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    backfill()
@@ -0,0 +1,50 @@
+"""
+Sauvegardes à chaud de la base SQLite (même traitement que la tâche de fond, voir app.backup).
+
+Usage :
+    PYTHONPATH=/app python scripts/backup.py create
+    PYTHONPATH=/app python scripts/backup.py list
+    PYTHONPATH=/app python scripts/backup.py restore /data/backups/robes_demi_mesure-20260101T020000Z.db.gz
+
+La restauration se fait application arrêtée ; la base remplacée est conservée à côté.
+"""
+import argparse
+import os
+import sys
+
+from app.backup import BackupError, database_path, list_backups, restore_backup, run_backup
+
+
+def backup():
+    parser = argparse.ArgumentParser(description="Sauvegardes de la base SQLite.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("create", help="crée une sauvegarde compressée")
+    sub.add_parser("list", help="liste les sauvegardes, de la plus récente à la plus ancienne")
+    restore = sub.add_parser("restore", help="remplace la base par une sauvegarde (application arrêtée)")
+    restore.add_argument("fichier", help="sauvegarde .db.gz (chemin, ou nom dans BACKUP_DIR)")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "create":
+            print(f"Sauvegarde créée : {run_backup()}")
+        elif args.command == "list":
+            backups = list_backups()
+            for path in backups:
+                print(f"{path}  ({os.path.getsize(path) // 1024} Ko)")
+            if not backups:
+                print("Aucune sauvegarde.")
+        else:
+            path = args.fichier
+            if not os.path.exists(path):
+                path = next((p for p in list_backups() if os.path.basename(p) == args.fichier), path)
+            previous = restore_backup(path)
+            print(f"Base restaurée : {database_path()}")
+            if previous:
+                print(f"Ancienne base conservée : {previous}")
+    except BackupError as e:
+        print(e)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    backup()
@@ -0,0 +1,12 @@
+
+from app.migrations import run_migrations
+
+def migrate():
+    print("Application des migrations...")
+    applied = run_migrations()
+    for name in applied:
+        print(f"  - {name}")
+    print("Terminé." if applied else "Base déjà à jour.")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,22 @@
+"""
+Base SQLite temporaire partagée par les tests : à importer AVANT `app`.
+
+`app.database` crée son engine à l'import, une seule fois par process : tous les
+modules de test (unittest discover) travaillent donc sur la même base.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="backoffice-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+
+
+@atexit.register
+def _cleanup():
+    from app.database import engine, read_engine
+
+    engine.dispose()
+    read_engine.dispose()
+    shutil.rmtree(_tmp, ignore_errors=True)
@@ -0,0 +1,158 @@
+"""
+Archivage des devis clos (app.archive) sur une base SQLite temporaire.
+
+    cd backoffice && python -m unittest discover tests
+"""
+import unittest
+from datetime import datetime, timedelta
+
+import _db  # noqa: F401  (base temporaire, avant tout import de app)
+
+from fastapi import Depends
+from fastapi.testclient import TestClient
+
+from app import models
+from app.archive import run_archival
+from app.archive_models import DevisArchive
+from app.boutique.auth_tokens import get_current_boutique
+from app.boutique.loaders import next_numero_boutique
+from app.database import SessionLocal, engine
+from app.dependencies import get_db
+from app.main import app
+from app.migrations import run_migrations
+
+OLD = datetime.utcnow() - timedelta(days=30)
+
+
+class ArchiveIdsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        run_migrations(engine)
+        with SessionLocal() as db:
+            boutique = models.Boutique(nom="Test", email="archive@example.com")
+            db.add(boutique)
+            db.commit()
+            cls.boutique_id = boutique.id
+
+    def _devis(self, db, numero, statut=models.StatutDevis.REFUSE, updated_at=OLD, boutique_id=None):
+        d = models.Devis(
+            boutique_id=boutique_id or self.boutique_id,
+            numero_boutique=numero,
+            statut=statut,
+            prix_total=10,
+            updated_at=updated_at,
+        )
+        d.lignes.append(models.LigneDevis(description="robe", quantite=1, prix_unitaire=10))
+        db.add(d)
+        db.flush()
+        # onupdate=utcnow : date forcée après insertion
+        db.query(models.Devis).filter_by(id=d.id).update({"updated_at": updated_at})
+        return d
+
+    def test_archived_max_id_is_never_reused(self):
+        with SessionLocal() as db:
+            archived = self._devis(db, 1)
+            db.commit()
+            archived_id, archived_ligne_id = archived.id, archived.lignes[0].id
+
+        self.assertEqual(run_archival(engine, after_days=1), 1)
+
+        with SessionLocal() as db:
+            # L'id max vient de partir dans devis_archive
+            fresh = self._devis(db, 2)
+            db.commit()
+            self.assertGreater(fresh.id, archived_id)
+            self.assertGreater(fresh.lignes[0].id, archived_ligne_id)
+            fresh_id = fresh.id
+
+        # Le nouveau devis s'archive à son tour, sans collision dans devis_archive
+        self.assertEqual(run_archival(engine, after_days=1), 1)
+        with SessionLocal() as db:
+            self.assertEqual(db.get(DevisArchive, archived_id).numero_boutique, 1)
+            self.assertEqual(db.get(DevisArchive, fresh_id).numero_boutique, 2)
+
+    def test_numero_counts_archived_devis(self):
+        with SessionLocal() as db:
+            boutique = models.Boutique(nom="Numéros", email="numeros@example.com")
+            db.add(boutique)
+            db.flush()
+            self._devis(db, 1, statut=models.StatutDevis.EN_COURS, updated_at=datetime.utcnow(), boutique_id=boutique.id)
+            self._devis(db, 2, boutique_id=boutique.id)
+            db.commit()
+            boutique_id = boutique.id
+
+        run_archival(engine, after_days=1)
+        with SessionLocal() as db:
+            # Le devis n°2 est archivé : le suivant est le n°3, pas un second n°2
+            self.assertEqual(next_numero_boutique(db, boutique_id), 3)
+
+
+class ArchivedDevisReadTest(unittest.TestCase):
+    """Détail et PDF d'un devis archivé : toujours servis à sa boutique."""
+
+    @classmethod
+    def setUpClass(cls):
+        run_migrations(engine)
+        with SessionLocal() as db:
+            boutique = models.Boutique(nom="Lecture", email="lecture@example.com")
+            db.add(boutique)
+            db.flush()
+            devis = models.Devis(
+                boutique_id=boutique.id, numero_boutique=1, statut=models.StatutDevis.ACCEPTE, prix_total=10
+            )
+            devis.lignes.append(models.LigneDevis(description="robe", quantite=1, prix_unitaire=10))
+            db.add(devis)
+            db.flush()
+            db.add(models.BonCommande(devis_id=devis.id, statut=models.StatutBonCommande.VALIDE))
+            db.flush()
+            db.query(models.Devis).filter_by(id=devis.id).update({"updated_at": OLD})
+            db.query(models.BonCommande).filter_by(devis_id=devis.id).update({"updated_at": OLD})
+            db.commit()
+            cls.boutique_id, cls.devis_id = boutique.id, devis.id
+        cls._login(cls.boutique_id)
+        cls.client = TestClient(app)
+
+    @classmethod
+    def tearDownClass(cls):
+        app.dependency_overrides.pop(get_current_boutique, None)
+
+    @staticmethod
+    def _login(boutique_id):
+        app.dependency_overrides[get_current_boutique] = lambda db=Depends(get_db): db.get(models.Boutique, boutique_id)
+
+    def test_detail_and_pdfs(self):
+        self.assertGreaterEqual(run_archival(engine, after_days=1), 1)
+        with SessionLocal() as db:
+            self.assertIsNone(db.get(models.Devis, self.devis_id))
+            self.assertIsNotNone(db.get(DevisArchive, self.devis_id))
+
+        r = self.client.get(f"/api/boutique/devis/{self.devis_id}")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()["id"], self.devis_id)
+        self.assertEqual(len(r.json()["lignes"]), 1)
+        # Cache HTTP : même ETag que pour un devis actif
+        again = self.client.get(f"/api/boutique/devis/{self.devis_id}", headers={"If-None-Match": r.headers["etag"]})
+        self.assertEqual(again.status_code, 304)
+
+        for url in (f"/api/boutique/devis/{self.devis_id}/pdf", f"/api/boutique/bons-commande/{self.devis_id}/pdf"):
+            with self.subTest(url=url):
+                r = self.client.get(url)
+                self.assertEqual(r.status_code, 200)
+                self.assertTrue(r.content.startswith(b"%PDF"))
+
+    def test_other_boutique_gets_404(self):
+        with SessionLocal() as db:
+            other = models.Boutique(nom="Autre", email="autre-lecture@example.com")
+            db.add(other)
+            db.commit()
+            other_id = other.id
+        run_archival(engine, after_days=1)
+        self._login(other_id)
+        try:
+            self.assertEqual(self.client.get(f"/api/boutique/devis/{self.devis_id}").status_code, 404)
+        finally:
+            self._login(self.boutique_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
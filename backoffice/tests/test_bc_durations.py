@@ -0,0 +1,172 @@
+"""
+Durées par statut des BC (app.bc_durations) : séjours et percentiles.
+
+    cd backoffice && python -m unittest discover tests
+"""
+import unittest
+from datetime import datetime, timedelta
+
+import _db  # noqa: F401  (base temporaire, avant tout import de app)
+
+from app import models
+from app.admin.bons_commande import admin_update_bon_commande
+from app.archive_models import bc_status_durations_archive
+from app.auth import AdminIdentity
+from app.bc_durations import duration_report
+from app.database import SessionLocal, engine
+from app.migrations import run_migrations
+from app.timeline import create_event
+from app.timeline_models import BonCommandeEvent
+
+T0 = datetime(2026, 1, 1, 8, 0, 0)
+ADMIN = AdminIdentity(id=1, nom="Admin", email="admin@example.com", type=models.UserType.ADMIN)
+
+
+def _boutique(db, nom):
+    boutique = models.Boutique(nom=nom, email=f"{nom.lower()}@example.com")
+    db.add(boutique)
+    db.flush()
+    return boutique
+
+
+def _bon(db, boutique, numero, statut=models.StatutBonCommande.EN_ATTENTE_VALIDATION):
+    devis = models.Devis(boutique_id=boutique.id, numero_boutique=numero, prix_total=10)
+    db.add(devis)
+    db.flush()
+    bon = models.BonCommande(devis_id=devis.id, statut=statut)
+    db.add(bon)
+    db.flush()
+    return bon
+
+
+def _stays(db, bon, boutique, *stays):
+    """Séjours consécutifs (statut, durée en secondes ou None pour le statut courant)."""
+    debut = T0
+    for statut, duree in stays:
+        fin = debut + timedelta(seconds=duree) if duree is not None else None
+        db.add(
+            models.BcStatusDuration(
+                bon_commande_id=bon.id,
+                boutique_id=boutique.id,
+                statut=statut,
+                debut=debut,
+                fin=fin,
+                duree_secondes=duree,
+            )
+        )
+        debut = fin
+
+
+class RevertToPendingTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        run_migrations(engine)
+
+    def test_revert_closes_valide_stay(self):
+        with SessionLocal() as db:
+            bon = _bon(db, _boutique(db, "Retour"), 1)
+            create_event(db, bon.id, "BOUTIQUE", None, "BC_SOUMIS")
+            bon.statut = models.StatutBonCommande.VALIDE
+            create_event(db, bon.id, "ADMIN", 1, "BC_VALIDE")
+            db.commit()
+            bon_id = bon.id
+
+        with SessionLocal() as db:
+            admin_update_bon_commande(
+                bon_id,
+                request=None,
+                statut=models.StatutBonCommande.EN_ATTENTE_VALIDATION.value,
+                commentaire_admin="",
+                next_url="",
+                background_tasks=None,
+                db=db,
+                admin=ADMIN,
+            )
+
+        with SessionLocal() as db:
+            stays = (
+                db.query(models.BcStatusDuration)
+                .filter_by(bon_commande_id=bon_id)
+                .order_by(models.BcStatusDuration.id)
+                .all()
+            )
+            self.assertEqual(
+                [(s.statut, s.fin is None) for s in stays],
+                [("EN_ATTENTE_VALIDATION", False), ("VALIDE", False), ("EN_ATTENTE_VALIDATION", True)],
+            )
+            last = (
+                db.query(BonCommandeEvent.event_type)
+                .filter_by(bon_commande_id=bon_id)
+                .order_by(BonCommandeEvent.id.desc())
+                .first()
+            )
+            self.assertEqual(last.event_type, "BC_REMIS_EN_ATTENTE")
+
+
+class DurationReportTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        run_migrations(engine)
+        with SessionLocal() as db:
+            boutique = _boutique(db, "Percentiles")
+            numero = iter(range(1, 100))
+            # Temps en A_MODIFIER : 10, 20, ..., 100 s (dans le désordre)
+            for duree in (70, 10, 100, 40, 20, 90, 30, 60, 80, 50):
+                bon = _bon(db, boutique, next(numero))
+                _stays(
+                    db, bon, boutique,
+                    ("EN_ATTENTE_VALIDATION", 5), ("A_MODIFIER", duree), ("EN_ATTENTE_VALIDATION", None),
+                )
+            # Délai de validation : somme des séjours avant VALIDE
+            for stays in (
+                [("EN_ATTENTE_VALIDATION", 400)],
+                [("EN_ATTENTE_VALIDATION", 100)],
+                # 50 + 30 + 20 : un aller-retour en A_MODIFIER compte dans le délai
+                [("EN_ATTENTE_VALIDATION", 50), ("A_MODIFIER", 30), ("EN_ATTENTE_VALIDATION", 20)],
+            ):
+                bon = _bon(db, boutique, next(numero))
+                _stays(db, bon, boutique, *stays, ("VALIDE", None))
+            db.commit()
+            cls.boutique_id = boutique.id
+
+            # Séjour archivé (app.archive) : compté aussi
+            archived = _boutique(db, "Archives")
+            bon = _bon(db, archived, 1)
+            db.commit()
+            db.execute(
+                bc_status_durations_archive.insert(),
+                [
+                    {"id": 10_000_001, "bon_commande_id": bon.id, "boutique_id": archived.id,
+                     "statut": "EN_ATTENTE_VALIDATION", "debut": T0, "fin": T0 + timedelta(seconds=3600),
+                     "duree_secondes": 3600},
+                    {"id": 10_000_002, "bon_commande_id": bon.id, "boutique_id": archived.id,
+                     "statut": "VALIDE", "debut": T0 + timedelta(seconds=3600), "fin": None,
+                     "duree_secondes": None},
+                ],
+            )
+            db.commit()
+            cls.archived_id = archived.id
+
+    def _boutique_report(self, boutique_id):
+        with SessionLocal() as db:
+            report = duration_report(db)
+        return next(b for b in report["boutiques"] if b["boutique_id"] == boutique_id)
+
+    def test_nearest_rank_percentiles(self):
+        report = self._boutique_report(self.boutique_id)
+        # 10, 20, 30, 30, 40, ..., 100 : les 10 BC renvoyés + l'aller-retour de 30 s
+        self.assertEqual(report["a_modifier"]["n"], 11)
+        # Rang = ceil(p * n / 100) : p50 -> 6e valeur, p95 -> 11e
+        self.assertEqual(report["a_modifier"]["p50"], 50)
+        self.assertEqual(report["a_modifier"]["p95"], 100)
+        # 100, 100, 400 : p50 -> 2e, p95 -> 3e
+        self.assertEqual(report["validation"], {"n": 3, "p50": 100, "p95": 400})
+
+    def test_archived_stays_are_counted(self):
+        report = self._boutique_report(self.archived_id)
+        self.assertEqual(report["validation"], {"n": 1, "p50": 3600, "p95": 3600})
+        self.assertEqual(report["a_modifier"], {"n": 0, "p50": None, "p95": None})
+
+
+if __name__ == "__main__":
+    unittest.main()
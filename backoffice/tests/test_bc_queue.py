@@ -0,0 +1,110 @@
+"""
+File de validation des BC (app.admin.bc_queue) : pagination keyset.
+
+    cd backoffice && python -m unittest discover tests
+"""
+import unittest
+
+import _db  # noqa: F401  (base temporaire, avant tout import de app)
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from app import models
+from app.admin.bc_queue import load_queue
+from app.database import SessionLocal, engine
+from app.migrations import run_migrations
+
+EN_ATTENTE = models.StatutBonCommande.EN_ATTENTE_VALIDATION.value
+
+
+class QueuePaginationTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        run_migrations(engine)
+        with SessionLocal() as db:
+            boutiques = [models.Boutique(nom=f"File {i}", email=f"file{i}@example.com") for i in range(2)]
+            db.add_all(boutiques)
+            db.flush()
+            ids = []
+            for i in range(9):
+                devis = models.Devis(boutique_id=boutiques[i % 2].id, numero_boutique=100 + i, prix_total=10)
+                db.add(devis)
+                db.flush()
+                bon = models.BonCommande(devis_id=devis.id, montant_boutique_ttc=12 + i)
+                db.add(bon)
+                db.flush()
+                ids.append(bon.id)
+            db.commit()
+        # Dates telles que SQLite les stocke : server_default (sans fraction) et
+        # paramètre lié (".000000"), plusieurs BC dans la même seconde
+        dates = [
+            "2026-01-01 10:00:00",
+            "2026-01-01 10:00:00",
+            "2026-01-01 10:00:00.000000",
+            "2026-01-01 10:00:00.500000",
+            "2026-01-01 10:00:01",
+            "2026-01-01 10:00:01",
+            "2026-01-02 08:00:00.000000",
+        ]
+        with engine.begin() as conn:
+            for bon_id, value in zip(ids, dates):
+                conn.execute(
+                    text("UPDATE bons_commandes SET date_creation = :d WHERE id = :id"), {"d": value, "id": bon_id}
+                )
+        cls.ids = ids
+
+    def _all_pages(self, order, limit):
+        seen, after, pages = [], None, 0
+        with SessionLocal() as db:
+            while True:
+                page = load_queue(db, statut=EN_ATTENTE, order=order, after=after, limit=limit)
+                self.assertLessEqual(len(page["items"]), limit)
+                seen.extend(item["id"] for item in page["items"])
+                pages += 1
+                after = page["next"]
+                if after is None:
+                    return seen, pages
+
+    def _expected(self, order):
+        direction = "DESC" if order == "newest" else "ASC"
+        with engine.connect() as conn:
+            return [
+                r[0]
+                for r in conn.execute(
+                    text(
+                        "SELECT id FROM bons_commandes WHERE statut = :s "
+                        f"ORDER BY date_creation {direction}, id {direction}"
+                    ),
+                    {"s": EN_ATTENTE},
+                )
+            ]
+
+    def test_pages_cover_queue_once_in_order(self):
+        for order in ("oldest", "newest"):
+            expected = self._expected(order)
+            self.assertLessEqual(set(self.ids), set(expected))
+            for limit in (1, 2, 4, len(expected)):
+                with self.subTest(order=order, limit=limit):
+                    seen, pages = self._all_pages(order, limit)
+                    self.assertEqual(seen, expected)
+                    self.assertEqual(pages, max(1, -(-len(expected) // limit)))
+
+    def test_items(self):
+        with SessionLocal() as db:
+            page = load_queue(db, statut=EN_ATTENTE, order="oldest", limit=200)
+        first = next(item for item in page["items"] if item["id"] == self.ids[0])
+        self.assertEqual(first["reference"], "File 0-100")
+        self.assertEqual(first["montant_boutique_ttc"], 12)
+        self.assertGreaterEqual(page["counts"][EN_ATTENTE], len(self.ids))
+
+    def test_invalid_cursor_and_statut(self):
+        with SessionLocal() as db:
+            for kwargs in ({"after": "pas-un-curseur"}, {"statut": "INCONNU"}):
+                with self.subTest(**kwargs), self.assertRaises(HTTPException) as ctx:
+                    load_queue(db, **kwargs)
+                self.assertEqual(ctx.exception.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
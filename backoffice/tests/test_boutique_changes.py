@@ -0,0 +1,91 @@
+"""
+Synchronisation incrémentale des boutiques (app.boutique.changes).
+
+    cd backoffice && python -m unittest discover tests
+"""
+import unittest
+from datetime import datetime, timedelta
+
+import _db  # noqa: F401  (base temporaire, avant tout import de app)
+
+from sqlalchemy import text
+
+from app import models
+from app.archive import run_archival
+from app.boutique.changes import SYNC_OVERLAP, collect_changes
+from app.config import SQLITE_BUSY_TIMEOUT_SECONDS
+from app.database import SessionLocal, engine
+from app.migrations import run_migrations
+
+
+class ChangesCursorTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        run_migrations(engine)
+        with SessionLocal() as db:
+            boutique = models.Boutique(nom="Synchro", email="synchro@example.com")
+            db.add(boutique)
+            db.commit()
+            cls.boutique_id = boutique.id
+
+    def _changes(self, since=None):
+        with SessionLocal() as db:
+            return collect_changes(db, db.get(models.Boutique, self.boutique_id), since)
+
+    def test_overlap_covers_busy_timeout(self):
+        self.assertGreaterEqual(SYNC_OVERLAP, timedelta(seconds=SQLITE_BUSY_TIMEOUT_SECONDS))
+
+    def test_late_commit_with_older_stamp_is_returned(self):
+        token = self._changes().next
+
+        # Écrivain resté bloqué sur le verrou : updated_at posé au flush, bien avant
+        # la synchro précédente, commit seulement maintenant
+        stamped = datetime.utcnow() - timedelta(seconds=SQLITE_BUSY_TIMEOUT_SECONDS)
+        with SessionLocal() as db:
+            devis = models.Devis(boutique_id=self.boutique_id, numero_boutique=1, prix_total=10)
+            db.add(devis)
+            db.flush()
+            db.query(models.Devis).filter_by(id=devis.id).update({"updated_at": stamped})
+            db.commit()
+            devis_id = devis.id
+
+        changes = self._changes(token)
+        self.assertIn(devis_id, [d.id for d in changes.devis])
+
+        # Déjà vu : renvoyé encore tant qu'il est dans la fenêtre de recouvrement
+        # (application idempotente côté front), jamais perdu
+        self.assertIn(devis_id, [d.id for d in self._changes(changes.next).devis])
+
+    def test_archived_rows_are_reported(self):
+        with SessionLocal() as db:
+            devis = models.Devis(
+                boutique_id=self.boutique_id, numero_boutique=2, prix_total=10, statut=models.StatutDevis.ACCEPTE
+            )
+            db.add(devis)
+            db.flush()
+            bon = models.BonCommande(devis_id=devis.id, statut=models.StatutBonCommande.VALIDE)
+            db.add(bon)
+            db.commit()
+            devis_id, bon_id = devis.id, bon.id
+
+        token = self._changes().next
+        self.assertEqual(self._changes(token).archived_devis, [])
+
+        old = datetime.utcnow() - timedelta(days=30)
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE devis SET updated_at = :old WHERE id = :id"), {"old": old, "id": devis_id})
+            conn.execute(text("UPDATE bons_commandes SET updated_at = :old WHERE id = :id"), {"old": old, "id": bon_id})
+        self.assertGreaterEqual(run_archival(engine, after_days=1), 1)
+
+        changes = self._changes(token)
+        self.assertEqual(changes.archived_devis, [devis_id])
+        self.assertEqual(changes.archived_bons_commande, [bon_id])
+        self.assertNotIn(devis_id, [d.id for d in changes.devis])
+        # Synchro complète : ni listé, ni signalé
+        full = self._changes()
+        self.assertNotIn(devis_id, [d.id for d in full.devis])
+        self.assertEqual(full.archived_devis, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
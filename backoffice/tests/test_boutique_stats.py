@@ -0,0 +1,97 @@
+"""
+Compteurs boutique_stats (triggers, app.boutique_stats) comparés à la fiche boutique.
+
+    cd backoffice && python -m unittest discover tests
+"""
+import re
+import unittest
+from datetime import datetime, timedelta
+
+import _db  # noqa: F401  (base temporaire, avant tout import de app)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app import models
+from app.archive import run_archival
+from app.auth import AdminIdentity, get_current_admin
+from app.database import SessionLocal, engine
+from app.main import app
+from app.migrations import run_migrations
+
+OLD = datetime.utcnow() - timedelta(days=30)
+
+
+class BoutiqueStatsTriggersTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        run_migrations(engine)
+        app.dependency_overrides[get_current_admin] = lambda: AdminIdentity(
+            id=1, nom="Admin", email="admin@example.com", type=models.UserType.ADMIN
+        )
+        cls.client = TestClient(app)
+        with SessionLocal() as db:
+            boutique = models.Boutique(nom="Compteurs", email="compteurs@example.com")
+            db.add(boutique)
+            db.commit()
+            cls.boutique_id = boutique.id
+
+    @classmethod
+    def tearDownClass(cls):
+        app.dependency_overrides.pop(get_current_admin, None)
+
+    def _stats(self):
+        with SessionLocal() as db:
+            stats = db.get(models.BoutiqueStats, self.boutique_id)
+            return stats.nb_devis, stats.ca
+
+    def _page(self):
+        r = self.client.get(f"/admin/boutiques/{self.boutique_id}")
+        self.assertEqual(r.status_code, 200)
+        ca = re.search(r"CA total</p>\s*<p[^>]*>(-?\d+\.\d\d) €", r.text).group(1)
+        nb = re.search(r"Nombre de devis : (\d+)", r.text).group(1)
+        return int(nb), float(ca)
+
+    def assertMatchesPage(self):
+        self.assertEqual(self._stats(), self._page())
+
+    def test_counters_follow_writes(self):
+        with SessionLocal() as db:
+            for i, prix in enumerate((100.10, 20.05, 3.33), start=1):
+                db.add(models.Devis(boutique_id=self.boutique_id, numero_boutique=i, prix_total=prix))
+            db.commit()
+        self.assertEqual(self._stats(), (3, 123.48))
+        self.assertMatchesPage()
+
+        # UPDATE d'un devis (ORM)
+        with SessionLocal() as db:
+            devis = db.query(models.Devis).filter_by(boutique_id=self.boutique_id, numero_boutique=2).one()
+            devis.prix_total = 25.00
+            devis.statut = models.StatutDevis.REFUSE
+            db.commit()
+        self.assertMatchesPage()
+
+        # UPDATE en masse, hors ORM (montants en centimes)
+        with engine.begin() as conn:
+            conn.execute(
+                text("UPDATE devis SET prix_total = prix_total + 100 WHERE boutique_id = :b"),
+                {"b": self.boutique_id},
+            )
+        self.assertEqual(self._stats(), (3, 131.43))
+        self.assertMatchesPage()
+
+        # Archivage du devis refusé : toujours compté, sur la liste comme sur la fiche
+        with engine.begin() as conn:
+            conn.execute(
+                text("UPDATE devis SET updated_at = :old WHERE boutique_id = :b AND statut = 'REFUSE'"),
+                {"old": OLD, "b": self.boutique_id},
+            )
+        self.assertEqual(run_archival(engine, after_days=1), 1)
+        with SessionLocal() as db:
+            self.assertEqual(db.query(models.Devis).filter_by(boutique_id=self.boutique_id).count(), 2)
+        self.assertEqual(self._stats(), (3, 131.43))
+        self.assertMatchesPage()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+"""
+Disjoncteur SMTP et file de renvoi (app.mail_sender), contre un serveur SMTP local.
+
+    cd backoffice && python -m unittest discover tests
+"""
+import json
+import socket
+import socketserver
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from email import message_from_bytes, policy
+from unittest import mock
+
+import _db  # noqa: F401  (base temporaire, avant tout import de app)
+
+from sqlalchemy import inspect, text
+
+from app import models
+from app.database import SessionLocal, engine
+from app.mail_sender import CircuitBreaker, MailSender
+from app.migrations import run_migrations
+from app.utils import mailer
+
+SECRET_LINK = "https://front.example.com/reset?token=jeton-tres-secret"
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Juste assez de SMTP pour smtplib : accepte tout, garde les messages reçus."""
+
+    def handle(self):
+        self._reply("220 localhost")
+        data = None
+        for line in self.rfile:
+            if data is not None:
+                if line == b".\r\n":
+                    self.server.received.append(message_from_bytes(b"".join(data), policy=policy.default))
+                    data = None
+                    self._reply("250 OK")
+                else:
+                    data.append(line[1:] if line.startswith(b".") else line)
+            elif line[:4].upper() == b"DATA":
+                data = []
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+            elif line[:4].upper() == b"QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("250 OK")
+
+    def _reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+
+class _SMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, port):
+        super().__init__(("127.0.0.1", port), _SMTPHandler)
+        self.received = []
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("délai dépassé")
+        time.sleep(0.01)
+
+
+def _outbox():
+    with SessionLocal() as db:
+        return db.query(models.MailOutbox).order_by(models.MailOutbox.id).all()
+
+
+class MailOutboxTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        run_migrations(engine)
+
+    def setUp(self):
+        with SessionLocal() as db:
+            db.query(models.MailOutbox).delete()
+            db.commit()
+        self.port = _free_port()
+        self.server = None
+        patcher = mock.patch.multiple(mailer, SMTP_HOST="127.0.0.1", SMTP_PORT=self.port, SMTP_USER=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.2)
+        self.sender = MailSender(mailer._smtp_deliver, mailer.build_message, 2, 10, self.breaker)
+
+    def tearDown(self):
+        self.sender.shutdown()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def _start_server(self):
+        self.server = _SMTPServer(self.port)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def _stats(self):
+        return self.sender.stats()
+
+    def test_breaker_outbox_retry_delete(self):
+        # SMTP injoignable : deux échecs ouvrent le disjoncteur
+        for ref in ("BC-1", "BC-2"):
+            self.sender.submit("boutique@example.com", "bc_renvoye", {"ref": ref, "commentaire": "à revoir"})
+        _wait(lambda: self._stats()["failed"] == 2 and self._stats()["in_flight"] == 0)
+        self.assertEqual(self.breaker.stats()["state"], CircuitBreaker.OPEN)
+
+        # Disjoncteur ouvert : directement en file, sans tentative
+        self.sender.submit("boutique@example.com", "bc_valide", {"ref": "BC-3", "commentaire": None})
+        self.sender.submit("boutique@example.com", "password_reset", {"reset_link": SECRET_LINK})
+        self.assertEqual(self._stats()["short_circuited"], 2)
+
+        rows = _outbox()
+        self.assertEqual([r.template for r in rows], ["bc_renvoye", "bc_renvoye", "bc_valide", "password_reset"])
+        self.assertEqual(json.loads(rows[2].context_json), {"ref": "BC-3", "commentaire": None})
+        # Le lien de réinitialisation n'est nulle part en base, et jamais renvoyé
+        secret = rows[3]
+        self.assertIsNone(secret.context_json)
+        self.assertIsNone(secret.next_attempt_at)
+        with engine.connect() as conn:
+            self.assertNotIn("message", [c["name"] for c in inspect(conn).get_columns("mail_outbox")])
+            for row in conn.execute(text("SELECT * FROM mail_outbox")):
+                self.assertNotIn("jeton-tres-secret", " ".join(str(v) for v in row))
+        message_ids = {json.loads(r.context_json)["ref"]: r.message_id for r in rows[:3]}
+
+        # SMTP revenu, délais de renvoi échus
+        self._start_server()
+        with SessionLocal() as db:
+            db.query(models.MailOutbox).filter(models.MailOutbox.next_attempt_at.isnot(None)).update(
+                {"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)}, synchronize_session=False
+            )
+            db.commit()
+        time.sleep(0.25)
+
+        # Semi-ouvert : un seul email d'essai, qui referme le disjoncteur
+        self.assertEqual(self.sender.retry_due(), 1)
+        _wait(lambda: len(self.server.received) == 1 and self.breaker.closed)
+        self.assertEqual(self.sender.retry_due(), 2)
+        _wait(lambda: len(self.server.received) == 3)
+        _wait(lambda: [r.template for r in _outbox()] == ["password_reset"])
+
+        # Re-rendus depuis template + contexte, avec le Message-ID d'origine
+        by_ref = {}
+        for msg in self.server.received:
+            body = msg.get_body(("plain",)).get_content()
+            ref = next(r for r in ("BC-1", "BC-2", "BC-3") if r in body)
+            by_ref[ref] = msg
+        self.assertEqual(sorted(by_ref), ["BC-1", "BC-2", "BC-3"])
+        for ref, msg in by_ref.items():
+            self.assertEqual(msg["Message-ID"], message_ids[ref])
+            self.assertEqual(msg["To"], "boutique@example.com")
+
+        # Rétention : la trace abandonnée part après MAIL_OUTBOX_RETENTION_DAYS
+        self.assertEqual(self.sender.purge_abandoned(retention_days=30), 0)
+        with SessionLocal() as db:
+            db.query(models.MailOutbox).update(
+                {"created_at": datetime.utcnow() - timedelta(days=31)}, synchronize_session=False
+            )
+            db.commit()
+        self.assertEqual(self.sender.purge_abandoned(retention_days=30), 1)
+        self.assertEqual(_outbox(), [])
+
+    def test_secret_email_sent_when_smtp_is_up(self):
+        self._start_server()
+        self.sender.submit("boutique@example.com", "password_reset", {"reset_link": SECRET_LINK})
+        _wait(lambda: len(self.server.received) == 1)
+        self.assertIn(SECRET_LINK, self.server.received[0].get_body(("plain",)).get_content())
+        _wait(lambda: self._stats()["in_flight"] == 0)
+        self.assertEqual(_outbox(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+"""
+Migrations de schéma (app.migrations) sur une base SQLite temporaire.
+
+    cd backoffice && python -m unittest discover tests
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+import _db  # noqa: F401  (base temporaire, avant tout import de app)
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import Session
+
+from app import models
+from app.archive import archive_devis
+from app.boutique_stats import install_boutique_stats
+from app.database import Base, SessionLocal, engine
+from app.migrations import (
+    ARCHIVED_TABLES,
+    MIGRATIONS,
+    _m001_devis_mesures_json,
+    _m012_mail_outbox_template,
+    run_migrations,
+)
+from app.search import install_search_index
+from app.timeline import create_event
+
+
+class DevisMesuresJsonTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        run_migrations(engine)
+
+    def test_rows_are_kept(self):
+        with SessionLocal() as db:
+            boutique = models.Boutique(nom="Mesures", email="mesures@example.com")
+            tour = models.MesureType(code="taille", label="Tour de taille")
+            db.add_all([boutique, tour])
+            db.flush()
+            devis = models.Devis(boutique_id=boutique.id, numero_boutique=1, prix_total=0)
+            db.add(devis)
+            db.flush()
+            db.add(models.DevisMesure(devis_id=devis.id, mesure_type_id=tour.id, valeur=70.5))
+            db.commit()
+            devis_id, tour_id = devis.id, tour.id
+
+        with engine.begin() as conn:
+            _m001_devis_mesures_json(conn)
+            data = conn.execute(text("SELECT mesures_json FROM devis WHERE id = :id"), {"id": devis_id}).scalar()
+            kept = conn.execute(
+                text("SELECT COUNT(*) FROM devis_mesures WHERE devis_id = :id"), {"id": devis_id}
+            ).scalar()
+
+        self.assertEqual(json.loads(data), {str(tour_id): 70.5})
+        # Ancien stockage intact : la migration n'efface rien
+        self.assertEqual(kept, 1)
+
+
+class MailOutboxTemplateTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        run_migrations(engine)
+
+    def test_mime_messages_are_dropped(self):
+        with engine.begin() as conn:
+            # Schéma d'avant 012 : message MIME complet, identifiants compris
+            conn.execute(text("DROP TABLE mail_outbox"))
+            conn.execute(
+                text(
+                    "CREATE TABLE mail_outbox (id INTEGER PRIMARY KEY, to_email VARCHAR(255) NOT NULL, "
+                    "subject VARCHAR(255) NOT NULL, message TEXT NOT NULL, attempts INTEGER NOT NULL, "
+                    "next_attempt_at DATETIME, last_error TEXT, created_at DATETIME NOT NULL)"
+                )
+            )
+            conn.execute(
+                text(
+                    "INSERT INTO mail_outbox (to_email, subject, message, attempts, created_at) "
+                    "VALUES ('b@example.com', 'Bienvenue', 'Mot de passe : s3cret', 0, CURRENT_TIMESTAMP)"
+                )
+            )
+            _m012_mail_outbox_template(conn)
+            columns = {c["name"] for c in inspect(conn).get_columns("mail_outbox")}
+            remaining = conn.execute(text("SELECT COUNT(*) FROM mail_outbox")).scalar()
+
+        self.assertNotIn("message", columns)
+        self.assertLessEqual({"template", "context_json", "message_id"}, columns)
+        self.assertEqual(remaining, 0)
+
+        # Table utilisable par le modèle
+        with SessionLocal() as db:
+            db.add(models.MailOutbox(to_email="b@example.com", subject="s", template="bc_valide", context_json="{}"))
+            db.commit()
+            db.query(models.MailOutbox).delete()
+            db.commit()
+
+
+def _pre_011_engine(path):
+    """Base telle qu'avant 011 : tables archivées sans AUTOINCREMENT, 001-010 appliquées."""
+    pre = create_engine(f"sqlite:///{path}")
+    event.listen(pre, "connect", lambda dbapi, _: dbapi.execute("PRAGMA foreign_keys=ON"))
+    tables = [Base.metadata.tables[name] for name in ARCHIVED_TABLES]
+    for table in tables:
+        table.dialect_options["sqlite"]["autoincrement"] = False
+    try:
+        Base.metadata.create_all(bind=pre)
+    finally:
+        for table in tables:
+            table.dialect_options["sqlite"]["autoincrement"] = True
+    with pre.begin() as conn:
+        install_boutique_stats(conn)
+        install_search_index(conn)
+        conn.execute(
+            text("CREATE TABLE schema_migrations (name VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP NOT NULL)")
+        )
+        for name, _ in MIGRATIONS[:10]:
+            conn.execute(
+                text("INSERT INTO schema_migrations (name, applied_at) VALUES (:n, :at)"),
+                {"n": name, "at": datetime.utcnow()},
+            )
+    return pre
+
+
+class AutoincrementMigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="backoffice-m011-")
+        self.engine = _pre_011_engine(os.path.join(self.tmp, "pre011.db"))
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _schema(self, conn, type_):
+        return {
+            r[0]
+            for r in conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = :t AND name NOT LIKE 'sqlite_%'"), {"t": type_}
+            )
+        }
+
+    def _counts(self, conn):
+        return {t: conn.execute(text(f"SELECT COUNT(*) FROM {t}")).scalar() for t in ARCHIVED_TABLES}
+
+    def test_ids_are_never_reused(self):
+        with Session(self.engine) as db:
+            boutique = models.Boutique(nom="Pré-011", email="pre011@example.com")
+            db.add(boutique)
+            db.flush()
+            devis = [models.Devis(boutique_id=boutique.id, numero_boutique=i, prix_total=10) for i in (1, 2, 3)]
+            db.add_all(devis)
+            db.flush()
+            db.add(models.LigneDevis(devis_id=devis[0].id, description="Veste", quantite=1, prix_unitaire=10))
+            bon = models.BonCommande(devis_id=devis[0].id)
+            db.add(bon)
+            db.flush()
+            create_event(db, bon.id, "BOUTIQUE", None, "BC_SOUMIS")
+            db.commit()
+            boutique_id, last_id = boutique.id, devis[-1].id
+
+        # Sans AUTOINCREMENT, l'id du devis archivé serait réattribué
+        with self.engine.begin() as conn:
+            archive_devis(conn, [last_id])
+            self.assertEqual(conn.execute(text("SELECT max(id) FROM devis")).scalar(), last_id - 1)
+            before = self._counts(conn)
+            indexes, triggers = self._schema(conn, "index"), self._schema(conn, "trigger")
+            self.assertTrue(triggers)
+
+        self.assertEqual([name for name, _ in MIGRATIONS[10:]], run_migrations(self.engine))
+
+        with self.engine.connect() as conn:
+            for table in ARCHIVED_TABLES:
+                sql = conn.execute(
+                    text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :t"), {"t": table}
+                ).scalar()
+                self.assertIn("AUTOINCREMENT", sql.upper(), table)
+            seq = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'devis'")).scalar()
+            self.assertGreaterEqual(seq, last_id)
+            self.assertEqual(self._counts(conn), before)
+            self.assertLessEqual(indexes, self._schema(conn, "index"))
+            self.assertEqual(triggers, self._schema(conn, "trigger"))
+            self.assertEqual(conn.exec_driver_sql("PRAGMA foreign_key_check").all(), [])
+            self.assertEqual(conn.exec_driver_sql("PRAGMA integrity_check").scalar(), "ok")
+
+        # Nouveau devis : id neuf, compteurs toujours tenus par les triggers
+        with Session(self.engine) as db:
+            devis = models.Devis(boutique_id=boutique_id, numero_boutique=4, prix_total=10)
+            db.add(devis)
+            db.commit()
+            self.assertGreater(devis.id, last_id)
+            self.assertEqual(db.get(models.BoutiqueStats, boutique_id).nb_devis, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
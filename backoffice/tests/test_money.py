@@ -0,0 +1,55 @@
+"""
+Montants en centimes (app.money).
+
+    cd backoffice && python -m unittest discover tests
+"""
+import unittest
+from decimal import Decimal
+
+from app.money import Money, format_cents, format_eur, from_cents, round_eur, to_cents
+
+
+class CentsTest(unittest.TestCase):
+    def test_half_up(self):
+        # En binaire, 1.005 vaut 1.00499999... : l'arrondi passe par la représentation décimale
+        self.assertEqual(to_cents(1.005), 101)
+        self.assertEqual(to_cents(2.675), 268)
+        self.assertEqual(to_cents(12.345), 1235)
+        self.assertEqual(to_cents(12.344), 1234)
+        self.assertEqual(to_cents(Decimal("0.125")), 13)
+
+    def test_negative_rounds_away_from_zero(self):
+        self.assertEqual(to_cents(-1.005), -101)
+        self.assertEqual(to_cents(-0.004), 0)
+
+    def test_none_and_integers(self):
+        self.assertEqual(to_cents(None), 0)
+        self.assertEqual(to_cents(7), 700)
+        self.assertEqual(from_cents(None), 0)
+        self.assertEqual(from_cents(1235), 12.35)
+
+    def test_sum_is_exact(self):
+        # 0.1 + 0.2 != 0.3 en flottant ; en centimes, si
+        self.assertEqual(sum(to_cents(v) for v in (0.1, 0.2)), to_cents(0.3))
+        self.assertEqual(round_eur(0.1 + 0.2), 0.3)
+
+    def test_format(self):
+        self.assertEqual(format_cents(1235), "12.35")
+        self.assertEqual(format_cents(5), "0.05")
+        self.assertEqual(format_cents(-5), "-0.05")
+        self.assertEqual(format_cents(None), "0.00")
+        self.assertEqual(format_eur(1.005), "1.01")
+        self.assertEqual(format_eur(1234567.8), "1234567.80")
+
+    def test_money_type_round_trip(self):
+        money = Money()
+        self.assertEqual(money.process_bind_param(19.999, None), 2000)
+        self.assertEqual(money.process_result_value(2000, None), 20.0)
+        self.assertIsNone(money.process_bind_param(None, None))
+        self.assertIsNone(money.process_result_value(None, None))
+        # Valeur REAL héritée d'avant la migration 003
+        self.assertEqual(money.process_result_value(1234.9999999, None), 12.35)
+
+
+if __name__ == "__main__":
+    unittest.main()
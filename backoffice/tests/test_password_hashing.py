@@ -0,0 +1,63 @@
+"""
+Pool de hachage des mots de passe (app.password_hashing).
+
+    cd backoffice && python -m unittest discover tests
+"""
+import threading
+import unittest
+
+from app.password_hashing import PasswordHasher, PasswordHasherBusy
+
+
+class PasswordHasherBusyTest(unittest.TestCase):
+    def setUp(self):
+        self.hasher = PasswordHasher(max_workers=1, max_pending=1)
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.hasher._executor.shutdown(wait=True)
+
+    def _occupy(self):
+        """Occupe l'unique place du pool jusqu'à self.release."""
+        def slow():
+            self.started.set()
+            self.release.wait(5)
+            return "ok"
+
+        result = {}
+        thread = threading.Thread(target=lambda: result.setdefault("value", self.hasher._run(slow)))
+        thread.start()
+        self.assertTrue(self.started.wait(5))
+        return thread, result
+
+    def test_full_pool_answers_503(self):
+        thread, result = self._occupy()
+
+        with self.assertRaises(PasswordHasherBusy) as ctx:
+            self.hasher.hash("secret")
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(ctx.exception.headers["Retry-After"], "2")
+        self.assertEqual(self.hasher.stats()["rejected"], 1)
+
+        self.release.set()
+        thread.join(5)
+        self.assertEqual(result["value"], "ok")
+
+    def test_slot_is_released_after_completion(self):
+        thread, _ = self._occupy()
+        self.release.set()
+        thread.join(5)
+
+        # La place libérée, le calcul suivant passe
+        hashed = self.hasher.hash("secret")
+        self.assertTrue(self.hasher.verify("secret", hashed))
+        stats = self.hasher.stats()
+        self.assertEqual(stats["rejected"], 0)
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertEqual(stats["max_in_flight"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
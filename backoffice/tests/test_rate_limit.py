@@ -0,0 +1,102 @@
+"""
+Limitation des tentatives de login (app.rate_limit) : quotas et IP client.
+
+    cd backoffice && python -m unittest discover tests
+"""
+import unittest
+from unittest import mock
+
+from starlette.requests import Request
+
+from app import rate_limit
+from app.rate_limit import LoginRateLimiter, MemoryBackend, TooManyLoginAttempts
+
+
+def _request(peer="10.0.0.1", forwarded=None):
+    headers = []
+    if forwarded is not None:
+        headers.append((b"x-forwarded-for", forwarded.encode()))
+    return Request({"type": "http", "headers": headers, "client": (peer, 1234)})
+
+
+class LoginRateLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.limiter = LoginRateLimiter(MemoryBackend(100), 60, {"ip": 5, "email": 3})
+
+    def test_email_quota(self):
+        keys = LoginRateLimiter.keys_for("1.2.3.4", " Boutique@Example.com ")
+        self.assertEqual(keys["email"], "email:boutique@example.com")
+        for _ in range(2):
+            self.limiter.record_failure(keys)
+        self.limiter.check(keys)  # 2 échecs < 3 : encore autorisé
+
+        self.limiter.record_failure(keys)
+        with self.assertRaises(TooManyLoginAttempts) as ctx:
+            self.limiter.check(keys)
+        self.assertEqual(ctx.exception.status_code, 429)
+        self.assertTrue(1 <= ctx.exception.retry_after <= 60)
+        self.assertEqual(self.limiter.rejected, 1)
+
+    def test_ip_quota_spans_emails(self):
+        for i in range(4):
+            self.limiter.record_failure(LoginRateLimiter.keys_for("1.2.3.4", f"u{i}@example.com"))
+        self.limiter.check(LoginRateLimiter.keys_for("1.2.3.4", "autre@example.com"))
+
+        self.limiter.record_failure(LoginRateLimiter.keys_for("1.2.3.4", "u4@example.com"))
+        with self.assertRaises(TooManyLoginAttempts):
+            self.limiter.check(LoginRateLimiter.keys_for("1.2.3.4", "autre@example.com"))
+        # Une autre IP n'est pas concernée
+        self.limiter.check(LoginRateLimiter.keys_for("5.6.7.8", "autre@example.com"))
+
+    def test_success_resets_email_but_not_ip(self):
+        keys = LoginRateLimiter.keys_for("1.2.3.4", "a@example.com")
+        for _ in range(3):
+            self.limiter.record_failure(keys)
+        self.limiter.record_success(keys)
+        self.assertEqual(self.limiter.backend.count(keys["email"], 60)[0], 0)
+        self.assertEqual(self.limiter.backend.count(keys["ip"], 60)[0], 3)
+
+    def test_window_expiry(self):
+        keys = LoginRateLimiter.keys_for(None, "a@example.com")
+        with mock.patch("app.rate_limit.time.time", return_value=1000.0):
+            for _ in range(3):
+                self.limiter.record_failure(keys)
+        with mock.patch("app.rate_limit.time.time", return_value=1061.0):
+            self.limiter.check(keys)
+
+    def test_memory_backend_evicts_lru(self):
+        backend = MemoryBackend(2)
+        for key in ("a", "b", "c"):
+            backend.add(key, 60)
+        self.assertEqual(len(backend), 2)
+        self.assertEqual(backend.count("a", 60)[0], 0)
+
+
+class ClientIpTest(unittest.TestCase):
+    def test_header_ignored_by_default(self):
+        with mock.patch.object(rate_limit, "TRUST_FORWARDED_FOR", False):
+            self.assertEqual(rate_limit.client_ip(_request(forwarded="6.6.6.6")), "10.0.0.1")
+
+    def test_single_proxy_takes_rightmost_entry(self):
+        with mock.patch.object(rate_limit, "TRUST_FORWARDED_FOR", True), \
+                mock.patch.object(rate_limit, "TRUSTED_PROXY_HOPS", 1):
+            # "6.6.6.6" est fourni par le client, "1.2.3.4" ajouté par notre proxy
+            self.assertEqual(rate_limit.client_ip(_request(forwarded="6.6.6.6, 1.2.3.4")), "1.2.3.4")
+
+    def test_two_proxies(self):
+        with mock.patch.object(rate_limit, "TRUST_FORWARDED_FOR", True), \
+                mock.patch.object(rate_limit, "TRUSTED_PROXY_HOPS", 2):
+            self.assertEqual(
+                rate_limit.client_ip(_request(forwarded="6.6.6.6, 1.2.3.4, 10.0.0.2")),
+                "1.2.3.4",
+            )
+            # Moins d'entrées que de proxys : la plus à gauche
+            self.assertEqual(rate_limit.client_ip(_request(forwarded="1.2.3.4")), "1.2.3.4")
+
+    def test_empty_header_falls_back_to_peer(self):
+        with mock.patch.object(rate_limit, "TRUST_FORWARDED_FOR", True):
+            self.assertEqual(rate_limit.client_ip(_request(forwarded=" , ")), "10.0.0.1")
+
+
+if __name__ == "__main__":
+    unittest.main()